@@ -1,6 +1,15 @@
 from .api.asr import create_asr_manager
-from .api.llm import call_ai, call_ai_async, generate, generate_async
+from .api.llm import (
+    call_ai,
+    call_ai_async,
+    call_ai_batch_async,
+    call_ai_multiplex_async,
+    call_ai_stream_async,
+    generate,
+    generate_async,
+)
 from .api.messages import Message, MessageBuilder
+from .api.tokens import count_tokens
 from .api.tts import create_tts_manager
 from .api.video_gen import (
     download_video,
@@ -14,11 +23,17 @@ from .parsing import (
     pydantic_to_yaml,
     pydantic_to_yaml_example,
     yaml_extract_validate_repair,
+    yaml_extract_validate_repair_async,
+    yaml_extract_validate_repair_batch,
 )
 
 __all__ = [
     "call_ai",
     "call_ai_async",
+    "call_ai_batch_async",
+    "call_ai_multiplex_async",
+    "call_ai_stream_async",
+    "count_tokens",
     "Message",
     "MessageBuilder",
     "pydantic_to_yaml_example",
@@ -34,4 +49,6 @@ __all__ = [
     "wait_for_video_completion",
     "download_video",
     "yaml_extract_validate_repair",
+    "yaml_extract_validate_repair_async",
+    "yaml_extract_validate_repair_batch",
 ]
@@ -5,10 +5,14 @@ from .llm import (
     OpenAIProvider,
     call_ai,
     call_ai_async,
+    call_ai_batch_async,
+    call_ai_multiplex_async,
+    call_ai_stream_async,
     generate,
     generate_async,
 )
 from .messages import Message, MessageBuilder
+from .tokens import count_tokens
 from .video_gen import (
     PixVerseProvider,
     generate_video_from_text,
@@ -21,6 +25,10 @@ from .video_gen import (
 __all__ = [
     "call_ai",
     "call_ai_async",
+    "call_ai_batch_async",
+    "call_ai_multiplex_async",
+    "call_ai_stream_async",
+    "count_tokens",
     "generate",
     "generate_async",
     "AnthropicProvider",
@@ -3,6 +3,7 @@ import os
 from pathlib import Path
 from typing import Dict, List, Optional
 
+import numpy as np
 from deepgram import DeepgramClient
 from dotenv import load_dotenv
 from openai import OpenAI
@@ -33,43 +34,47 @@ class ASRResult:
 
     def to_elevenlabs_alignment(self) -> Dict:
         """Convert ASR result to ElevenLabs-style alignment format"""
-        characters = []
-        char_starts = []
-        char_ends = []
-
-        # Process each word and its characters
-        pos = 0
-        for word_info in self.words:
-            word = word_info["word"]
-            word_start = word_info["start"]
-            word_end = word_info["end"]
-            word_duration = word_end - word_start
-
-            # Calculate time per character within this word
-            char_duration = word_duration / len(word)
-
-            for i, char in enumerate(word):
-                characters.append(char)
-                char_start = word_start + (i * char_duration)
-                char_end = char_start + char_duration
-                char_starts.append(char_start)
-                char_ends.append(char_end)
-
-            # Add space after word (except for last word)
-            if pos < len(self.words) - 1:
-                next_word_start = self.words[pos + 1]["start"]
-                space_duration = next_word_start - word_end
-
-                characters.append(" ")
-                char_starts.append(word_end)
-                char_ends.append(word_end + space_duration)
-
-            pos += 1
+        if not self.words:
+            return {
+                "characters": [],
+                "character_start_times_seconds": [],
+                "character_end_times_seconds": [],
+            }
+
+        words = [word_info["word"] for word_info in self.words]
+        word_starts = np.array([w["start"] for w in self.words], dtype=np.float64)
+        word_ends = np.array([w["end"] for w in self.words], dtype=np.float64)
+        lengths = np.array([len(word) for word in words])
+
+        # Each word's characters split its duration evenly, vectorized over
+        # every character of the transcript at once
+        with np.errstate(divide="ignore", invalid="ignore"):
+            char_durations = (word_ends - word_starts) / lengths
+        word_of_char = np.repeat(np.arange(len(words)), lengths)
+        index_in_word = np.arange(len(word_of_char)) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        starts = (
+            word_starts[word_of_char] + index_in_word * char_durations[word_of_char]
+        )
+        ends = starts + char_durations[word_of_char]
+
+        # Words are separated by a space lasting until the next word starts
+        offsets = np.cumsum(lengths + 1) - (lengths + 1)
+        char_starts = np.empty(lengths.sum() + len(words) - 1)
+        char_ends = np.empty_like(char_starts)
+        is_char = np.ones(len(char_starts), dtype=bool)
+        spaces = (offsets + lengths)[:-1]
+        is_char[spaces] = False
+        char_starts[is_char] = starts
+        char_ends[is_char] = ends
+        char_starts[spaces] = word_ends[:-1]
+        char_ends[spaces] = word_ends[:-1] + (word_starts[1:] - word_ends[:-1])
 
         return {
-            "characters": characters,
-            "character_start_times_seconds": char_starts,
-            "character_end_times_seconds": char_ends,
+            "characters": list(" ".join(words)),
+            "character_start_times_seconds": char_starts.tolist(),
+            "character_end_times_seconds": char_ends.tolist(),
         }
 
 
@@ -0,0 +1,216 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def _is_text_only(messages: List[Dict[str, Any]]) -> bool:
+    """Whether messages only carry text (images/video may change on disk)."""
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            if any(
+                not isinstance(item, dict) or item.get("type") != "text"
+                for item in content
+            ):
+                return False
+        elif not isinstance(content, str):
+            return False
+    return True
+
+
+def make_cache_key(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float,
+    max_tokens: int,
+    kwargs: Dict[str, Any],
+) -> Optional[bytes]:
+    """
+    Hash a request into a 16-byte key.
+
+    Returns:
+        The key, or None when the request is not cacheable (non-zero
+        temperature, media content, or arguments that aren't JSON serializable).
+    """
+    if temperature != 0 or not _is_text_only(messages):
+        return None
+    try:
+        payload = json.dumps(
+            [model, temperature, max_tokens, messages, kwargs], sort_keys=True
+        )
+    except (TypeError, ValueError):
+        return None
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of LLM responses with an optional TTL in seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 3600.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: bytes, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def cached_response(cache: ResponseCache, semantic_cache=None):
+    """
+    Cache ``(response, cost)`` results of a ``*_with_retry`` style function.
+
+    The wrapped function must take ``(ai_manager, messages, temperature,
+    max_tokens, model, **kwargs)``. Pass ``nocache=True`` to bypass the cache
+    for a single call. When a ``semantic_cache`` is given, calls made with
+    ``semantic_cache=True`` also consult it after an exact-match miss.
+    Cache hits report a cost of 0.0.
+
+    Async callers that miss while an identical request is already in flight
+    on the same event loop await its result instead of making their own call
+    (also at a cost of 0.0).
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            # (event loop, cache key) -> future of the call in progress
+            inflight = {}
+
+            async def single_flight(key, call):
+                loop = asyncio.get_running_loop()
+                flight_key = (loop, key)
+                while True:
+                    pending = inflight.get(flight_key)
+                    if pending is None:
+                        break
+                    try:
+                        return await asyncio.shield(pending), 0.0
+                    except asyncio.CancelledError:
+                        # The leading call was cancelled, not us: take over
+                        if not pending.cancelled():
+                            raise
+
+                future = loop.create_future()
+                # Don't warn about failures nobody else was waiting for
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                inflight[flight_key] = future
+                try:
+                    response, cost = await call()
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    future.set_exception(e)
+                    raise
+                finally:
+                    inflight.pop(flight_key, None)
+                future.set_result(response)
+                return response, cost
+
+            @functools.wraps(func)
+            async def async_wrapper(
+                ai_manager, messages, temperature, max_tokens, model, **kwargs
+            ):
+                nocache = kwargs.pop("nocache", False)
+                use_semantic = (
+                    kwargs.pop("semantic_cache", False) and semantic_cache is not None
+                )
+                key = None
+                if not nocache:
+                    key = make_cache_key(
+                        model, messages, temperature, max_tokens, kwargs
+                    )
+                if key is not None:
+                    cached = cache.get(key)
+                    if cached is not None:
+                        return cached, 0.0
+                    if use_semantic:
+                        # Embedding is CPU bound, keep it off the event loop
+                        cached = await asyncio.to_thread(
+                            semantic_cache.get, model, messages, max_tokens, kwargs
+                        )
+                        if cached is not None:
+                            return cached, 0.0
+                if key is None:
+                    return await func(
+                        ai_manager, messages, temperature, max_tokens, model, **kwargs
+                    )
+
+                async def call_and_store():
+                    response, cost = await func(
+                        ai_manager, messages, temperature, max_tokens, model, **kwargs
+                    )
+                    cache.set(key, response)
+                    if use_semantic:
+                        await asyncio.to_thread(
+                            semantic_cache.set,
+                            model,
+                            messages,
+                            max_tokens,
+                            kwargs,
+                            response,
+                        )
+                    return response, cost
+
+                return await single_flight(key, call_and_store)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(ai_manager, messages, temperature, max_tokens, model, **kwargs):
+            nocache = kwargs.pop("nocache", False)
+            use_semantic = (
+                kwargs.pop("semantic_cache", False) and semantic_cache is not None
+            )
+            key = None
+            if not nocache:
+                key = make_cache_key(model, messages, temperature, max_tokens, kwargs)
+            if key is not None:
+                cached = cache.get(key)
+                if cached is not None:
+                    return cached, 0.0
+                if use_semantic:
+                    cached = semantic_cache.get(model, messages, max_tokens, kwargs)
+                    if cached is not None:
+                        return cached, 0.0
+            response, cost = func(
+                ai_manager, messages, temperature, max_tokens, model, **kwargs
+            )
+            if key is not None:
+                cache.set(key, response)
+                if use_semantic:
+                    semantic_cache.set(model, messages, max_tokens, kwargs, response)
+            return response, cost
+
+        return wrapper
+
+    return decorator
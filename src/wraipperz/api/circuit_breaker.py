@@ -0,0 +1,70 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Track consecutive failures of one provider to skip it during outages.
+
+    After ``threshold`` consecutive failures the breaker opens and
+    allow_request() returns False for ``cooldown`` seconds. It then
+    half-opens: a single probe request is let through, closing the breaker
+    on success or reopening it for another cooldown on failure.
+    """
+
+    def __init__(self, name: str, threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def is_open(self) -> bool:
+        return not self.allow_request()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                print(f"Circuit for {self.name} half-open, probing")
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                print(f"Circuit for {self.name} closed")
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Let another request probe after one ended without a verdict, e.g. cancelled."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or (
+                self.opened_at is None and self.failures >= self.threshold
+            ):
+                print(
+                    f"Circuit for {self.name} opened after {self.failures} "
+                    f"consecutive failures, cooling down for {self.cooldown}s"
+                )
+                self.opened_at = time.monotonic()
+                self._probing = False
@@ -0,0 +1,111 @@
+import gzip
+import os
+from typing import Iterable, Optional
+
+import httpx
+
+# zstd compresses prompts faster and smaller than gzip when available
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+# Bodies below this many bytes go out uncompressed
+COMPRESS_MIN_SIZE = 4096
+
+
+def compress_hosts_from_env() -> frozenset:
+    """Hosts from WRAIPPERZ_COMPRESS_HOSTS (comma separated) that accept compressed bodies."""
+    hosts = os.getenv("WRAIPPERZ_COMPRESS_HOSTS", "")
+    return frozenset(host.strip() for host in hosts.split(",") if host.strip())
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    return gzip.compress(body, compresslevel=5)
+
+
+def _maybe_compress(
+    request: httpx.Request, hosts: frozenset, min_size: int, encoding: str
+) -> httpx.Request:
+    if (
+        request.method != "POST"
+        or request.url.host not in hosts
+        or "content-encoding" in request.headers
+    ):
+        return request
+    try:
+        body = request.content
+    except httpx.RequestNotRead:
+        # Streaming uploads are passed through untouched
+        return request
+    if len(body) < min_size:
+        return request
+
+    headers = request.headers.copy()
+    headers["content-encoding"] = encoding
+    # Recomputed by httpx from the compressed body
+    del headers["content-length"]
+    return httpx.Request(
+        request.method,
+        request.url,
+        headers=headers,
+        content=_compress(body, encoding),
+        extensions=request.extensions,
+    )
+
+
+class CompressingTransport(httpx.BaseTransport):
+    """
+    Compress large POST bodies to hosts known to accept Content-Encoding.
+
+    Most LLM APIs reject compressed request bodies, so nothing is compressed
+    unless its host is listed in ``hosts``. Responses are decompressed by
+    httpx as usual.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        hosts: Iterable[str],
+        min_size: int = COMPRESS_MIN_SIZE,
+        encoding: Optional[str] = None,
+    ) -> None:
+        self._transport = transport
+        self.hosts = frozenset(hosts)
+        self.min_size = min_size
+        self.encoding = encoding or ("zstd" if ZSTD_AVAILABLE else "gzip")
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request = _maybe_compress(request, self.hosts, self.min_size, self.encoding)
+        return self._transport.handle_request(request)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncCompressingTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of CompressingTransport."""
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        hosts: Iterable[str],
+        min_size: int = COMPRESS_MIN_SIZE,
+        encoding: Optional[str] = None,
+    ) -> None:
+        self._transport = transport
+        self.hosts = frozenset(hosts)
+        self.min_size = min_size
+        self.encoding = encoding or ("zstd" if ZSTD_AVAILABLE else "gzip")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request = _maybe_compress(request, self.hosts, self.min_size, self.encoding)
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
@@ -0,0 +1,34 @@
+import asyncio
+import os
+import sys
+
+
+def fast_event_loop_requested() -> bool:
+    """Whether to use uvloop/winloop; on by default, WRAIPPERZ_USE_UVLOOP=0 opts out."""
+    return os.getenv("WRAIPPERZ_USE_UVLOOP", "1").lower() not in ("0", "false", "no")
+
+
+def install_fast_event_loop() -> bool:
+    """
+    Install uvloop (winloop on Windows) as the asyncio event loop policy.
+
+    Only the policy for loops created afterwards changes, so code already
+    running inside an event loop (Jupyter, FastAPI, ...) is unaffected. A
+    custom policy installed by the application is left alone.
+
+    Returns:
+        True if a faster event loop policy was installed, False if the
+        package is not available or another policy is already in place.
+    """
+    if type(asyncio.get_event_loop_policy()) is not asyncio.DefaultEventLoopPolicy:
+        return False
+    try:
+        if sys.platform == "win32":
+            import winloop as loop_impl
+        else:
+            import uvloop as loop_impl
+    except ImportError:
+        return False
+
+    asyncio.set_event_loop_policy(loop_impl.EventLoopPolicy())
+    return True
@@ -1,37 +1,53 @@
 import abc
+import asyncio
+import atexit
 import base64
+import bisect
+import email.utils
+import functools
+import hashlib
 import io
 import json
 import mimetypes
+import mmap
 import os
+import random
+import re
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # from tokencost import calculate_prompt_cost, calculate_completion_cost
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from urllib.parse import urlsplit
 
 import anthropic
+import httpx
 import requests
 from dotenv import load_dotenv
 
 # import google.generativeai as genai
 from google import genai
 from google.api_core import exceptions as google_exceptions
+from google.genai import errors as genai_errors
 from google.genai import types
 from openai import (
     APIConnectionError,
     APIStatusError,
-    APITimeoutError,
     AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
     OpenAI,
-    RateLimitError,
 )
 from PIL import Image
 from tenacity import (
+    AsyncRetrying,
     retry,
-    retry_if_exception_type,
+    retry_if_exception,
     stop_after_attempt,
+    stop_after_delay,
     wait_exponential,
 )
 
@@ -56,12 +72,325 @@ except ImportError:
     VERTEX_AVAILABLE = False
     AnthropicVertex = None
 
+# pybase64 provides a SIMD base64 codec, fall back to the stdlib when missing
+try:
+    import pybase64 as base64_codec
+
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    base64_codec = base64
+    PYBASE64_AVAILABLE = False
+
+# orjson serializes request bodies several times faster than the stdlib
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# HTTP/2 for the shared connection pool needs the optional h2 package
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+from .cache import ResponseCache, cached_response
+from .circuit_breaker import CircuitBreaker
+from .compression import (
+    AsyncCompressingTransport,
+    CompressingTransport,
+    compress_hosts_from_env,
+)
+from .event_loop import fast_event_loop_requested, install_fast_event_loop
 from .messages import Message
+from .rate_limit import RateLimiter
+from .router import ModelRouter
+from .tokens import check_context_window, count_tokens
+from .semantic_cache import SemanticCache
 
 load_dotenv(override=True)
 
+# Swap the asyncio loop for uvloop/winloop when installed, unless WRAIPPERZ_USE_UVLOOP=0
+if fast_event_loop_requested():
+    install_fast_event_loop()
+
+
+# Larger files are encoded on every call rather than kept resident in the caches
+MAX_CACHED_FILE_SIZE = 8 * 1024 * 1024
+
+
+def _encode_file(path_str):
+    """Base64-encode a file straight from an mmap."""
+    with open(path_str, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return base64_codec.b64encode(memoryview(mm))
+        finally:
+            mm.close()
+
+
+@functools.lru_cache(maxsize=128)
+def _encode_file_cached(path_str, mtime_ns, size):
+    """Encode a file once per (path, mtime, size); edits produce a new key."""
+    return _encode_file(path_str)
+
+
+def _b64encode_file(path):
+    """Base64-encode a file, reusing cached results unless it is large."""
+    stat = os.stat(path)
+    if stat.st_size > MAX_CACHED_FILE_SIZE:
+        return _encode_file(str(path))
+    return _encode_file_cached(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+# Connection pool for SDK clients, raised above the httpx default of 100
+DEFAULT_HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=100)
+
+
+# Pool shared by every provider registered through AIManagerSingleton
+SHARED_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+
+def _http_client_kwargs(http_limits=None, timeout=None):
+    """Keyword arguments for the httpx clients handed to the provider SDKs."""
+    kwargs = {"limits": http_limits or DEFAULT_HTTP_LIMITS}
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return kwargs
+
+
+@functools.lru_cache(maxsize=1024)
+def _guess_mime(path, default="image/jpeg"):
+    """Cached mimetypes lookup, falling back to ``default`` for unknown types."""
+    mime_type, _ = mimetypes.guess_type(path)
+    return mime_type or default
+
+
+def _guess_url_mime(url):
+    """Mime type implied by a URL's path extension, or None if unknown."""
+    return _guess_mime(urlsplit(url).path, default=None)
+
+
+@functools.lru_cache(maxsize=256)
+def _strip_prefix(model):
+    """Drop the provider prefix from a model id, e.g. openai/gpt-4o -> gpt-4o."""
+    return model.rsplit("/", 1)[-1]
+
+
+# Per-thread scratch buffer so repeated PIL encodes don't reallocate MBs each time
+_pil_buffers = threading.local()
+
+
+def _b64encode_pil(image, img_format="PNG", max_size=None):
+    """
+    Save a PIL image and base64-encode it straight from the buffer's memory.
+
+    Returns None when ``max_size`` is given and the saved image is larger.
+    """
+    buffer = getattr(_pil_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _pil_buffers.buffer = io.BytesIO()
+    try:
+        image.save(buffer, format=img_format)
+        if max_size is not None and buffer.tell() > max_size:
+            return None
+        with buffer.getbuffer() as view:
+            return base64_codec.b64encode(view)
+    finally:
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _data_url(mime_type, b64_data):
+    """Build a base64 data URL from already-encoded bytes, decoding only once."""
+    return (b"data:%b;base64,%b" % (mime_type.encode("ascii"), b64_data)).decode(
+        "ascii"
+    )
+
+
+def _split_data_url(url):
+    """(mime_type, base64 payload) of a base64 data: URL."""
+    header, sep, payload = url.partition(",")
+    if not sep or not header.endswith(";base64"):
+        raise ValueError("Only base64 data: URLs are supported")
+    return header[len("data:") : -len(";base64")] or "application/octet-stream", payload
+
+
+@functools.lru_cache(maxsize=256)
+def _file_data_url_cached(path_str, mtime_ns, size, mime_type):
+    # Only the URL string is kept; the base64 bytes are dropped once it is built
+    return _data_url(mime_type, _encode_file(path_str))
+
+
+def _media_url(url, mime_type=None):
+    """
+    URL to send for an image/PDF reference.
+
+    data: and http(s) URLs are passed through as references; local files are
+    inlined as data URLs cached per (path, mtime, size), so repeated calls with
+    the same file skip the read, the encode and the string building. Files
+    over MAX_CACHED_FILE_SIZE are encoded on every call instead.
+    """
+    if isinstance(url, Path):
+        url = str(url)
+    elif url.startswith(("data:", "http://", "https://")):
+        return url
+    try:
+        stat = os.stat(url)
+    except OSError:
+        raise ValueError(f"File not found: {url}")
+    mime_type = mime_type or _guess_mime(url)
+    if stat.st_size > MAX_CACHED_FILE_SIZE:
+        return _data_url(mime_type, _encode_file(url))
+    return _file_data_url_cached(url, stat.st_mtime_ns, stat.st_size, mime_type)
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _dumps_json(payload):
+    """Serialize a request body to bytes, numpy arrays included when orjson is present."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(payload).encode("utf-8")
+
+
+class PreparedRequest:
+    """
+    A provider call built once and replayed as-is by every retry attempt.
+
+    ``params`` holds the ready-made SDK call arguments (prepared messages,
+    encoded images) for providers that support it; the others fall back to
+    calling call_ai with the original arguments.
+    """
+
+    def __init__(
+        self, provider, model, messages, temperature, max_tokens, kwargs, params=None
+    ):
+        self.provider = provider
+        self.model = model
+        self.messages = messages
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.kwargs = kwargs
+        self.params = params
+        # Messages before provider-specific rewrites, used to re-route
+        self.source_messages = messages
+
 
 class AIProvider(abc.ABC):
+    # Model name prefixes routed to the provider besides supported_models
+    model_prefixes: Tuple[str, ...] = ()
+
+    def close(self) -> None:
+        """Close the synchronous HTTP connection pool owned by the provider."""
+        http_client = getattr(self, "_http_client", None)
+        # Pools handed in by AIManager are shared and closed by the manager
+        if http_client is not None and getattr(self, "_owns_http_client", True):
+            http_client.close()
+
+    async def call_ai_batch(
+        self,
+        list_of_messages: List[List[Message]],
+        temperature: float,
+        max_tokens: int,
+        model: str,
+        concurrency: int = 32,
+        **kwargs: Dict[str, Any],
+    ) -> List[Any]:
+        """
+        Run call_ai_async over many conversations with bounded concurrency.
+
+        Args:
+            list_of_messages: One message list per request
+            concurrency: Maximum number of requests in flight at once
+
+        Returns:
+            Responses in input order; a failed request yields its exception
+            instead of a string.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one(messages):
+            async with semaphore:
+                return await self.call_ai_async(
+                    messages, temperature, max_tokens, model, **kwargs
+                )
+
+        return await asyncio.gather(
+            *(_one(messages) for messages in list_of_messages),
+            return_exceptions=True,
+        )
+
+    def _warmup_url(self):
+        sdk_client = getattr(self, "sync_client", None)
+        base_url = getattr(sdk_client, "base_url", None) or getattr(
+            self, "base_url", None
+        )
+        return str(base_url) if base_url else None
+
+    def warmup(self, n: int = 4) -> int:
+        """
+        Pre-open keep-alive connections to the provider's API host.
+
+        Fires ``n`` concurrent HEAD requests at the SDK base URL so the first
+        real calls skip the TCP/TLS handshake. Errors are ignored.
+
+        Returns:
+            The number of connections that were opened successfully.
+        """
+        http_client = getattr(self, "_http_client", None)
+        base_url = self._warmup_url()
+        if http_client is None or base_url is None:
+            return 0
+
+        def _head(_):
+            try:
+                http_client.head(base_url, timeout=10.0)
+                return True
+            except httpx.HTTPError:
+                return False
+
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            return sum(executor.map(_head, range(n)))
+
+    async def warmup_async(self, n: int = 4) -> int:
+        """Async counterpart of warmup() for the provider's async connection pool."""
+        async_http_client = getattr(self, "_http_async_client", None)
+        base_url = self._warmup_url()
+        if async_http_client is None or base_url is None:
+            return 0
+
+        async def _head():
+            try:
+                await async_http_client.head(base_url, timeout=10.0)
+                return True
+            except httpx.HTTPError:
+                return False
+
+        return sum(await asyncio.gather(*(_head() for _ in range(n))))
+
+    def refresh_models(self) -> List[str]:
+        """Fetch the live model list; providers without one keep the static list."""
+        return self.supported_models
+
+    async def aclose(self) -> None:
+        """Close both the synchronous and asynchronous connection pools."""
+        self.close()
+        async_http_client = getattr(self, "_http_async_client", None)
+        if async_http_client is not None and getattr(
+            self, "_owns_http_async_client", True
+        ):
+            await async_http_client.aclose()
+
     @abc.abstractmethod
     def call_ai(
         self,
@@ -84,6 +413,48 @@ class AIProvider(abc.ABC):
     ) -> str:
         pass
 
+    def prepare_request(
+        self,
+        messages: List[Message],
+        temperature: float,
+        max_tokens: int,
+        model: str,
+        **kwargs: Dict[str, Any],
+    ) -> PreparedRequest:
+        """Build the request once; by default all work is left to call_ai."""
+        return PreparedRequest(self, model, messages, temperature, max_tokens, kwargs)
+
+    def call_prepared(self, prepared: PreparedRequest) -> str:
+        return self.call_ai(
+            prepared.messages,
+            prepared.temperature,
+            prepared.max_tokens,
+            prepared.model,
+            **prepared.kwargs,
+        )
+
+    async def call_prepared_async(self, prepared: PreparedRequest) -> str:
+        return await self.call_ai_async(
+            prepared.messages,
+            prepared.temperature,
+            prepared.max_tokens,
+            prepared.model,
+            **prepared.kwargs,
+        )
+
+    async def call_ai_stream_async(
+        self,
+        messages: List[Message],
+        temperature: float,
+        max_tokens: int,
+        model: str,
+        **kwargs: Dict[str, Any],
+    ) -> AsyncIterator[str]:
+        """Yield the response as text deltas; without native streaming, in one piece."""
+        yield await self.call_ai_async(
+            messages, temperature, max_tokens, model, **kwargs
+        )
+
     @abc.abstractmethod
     def generate(
         self,
@@ -110,23 +481,39 @@ class AIProvider(abc.ABC):
 class LMStudioProvider(AIProvider):
     supported_models = ["lmstudio"]
 
-    def __init__(self, ip_address="localhost", port=1234):
+    def __init__(
+        self,
+        ip_address="localhost",
+        port=1234,
+        http_client=None,
+        http_async_client=None,
+    ):
         self.base_url = f"http://{ip_address}:{port}/v1"
+        self._owns_http_client = http_client is None
+        self._owns_http_async_client = http_async_client is None
+        self._http_client = http_client or httpx.Client(timeout=60.0)
+        self._http_async_client = http_async_client
+
+    def _build_payload(self, messages, temperature, max_tokens, model, **kwargs):
+        data = {
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            **kwargs,
+        }
+        if model:
+            data["model"] = model
+        return data
 
     def call_ai(self, messages, temperature, max_tokens, model=None, **kwargs):
         try:
-            headers = {"Content-Type": "application/json"}
-            data = {
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                **kwargs,
-            }
-            if model:
-                data["model"] = model
-
-            response = requests.post(
-                f"{self.base_url}/chat/completions", headers=headers, json=data
+            data = self._build_payload(
+                messages, temperature, max_tokens, model, **kwargs
+            )
+            response = self._http_client.post(
+                f"{self.base_url}/chat/completions",
+                content=_dumps_json(data),
+                headers=_JSON_HEADERS,
             )
             response.raise_for_status()
             return response.json()["choices"][0]["message"]["content"]
@@ -136,9 +523,53 @@ class LMStudioProvider(AIProvider):
     async def call_ai_async(
         self, messages, temperature, max_tokens, model=None, **kwargs
     ):
-        # For simplicity, we'll use the synchronous version in an async context
-        # In a real-world scenario, you might want to use an async HTTP client
-        return self.call_ai(messages, temperature, max_tokens, model, **kwargs)
+        try:
+            if self._http_async_client is None:
+                self._http_async_client = httpx.AsyncClient(
+                    timeout=60.0,
+                    limits=httpx.Limits(max_keepalive_connections=16),
+                )
+            data = self._build_payload(
+                messages, temperature, max_tokens, model, **kwargs
+            )
+            response = await self._http_async_client.post(
+                f"{self.base_url}/chat/completions",
+                content=_dumps_json(data),
+                headers=_JSON_HEADERS,
+            )
+            response.raise_for_status()
+            return response.json()["choices"][0]["message"]["content"]
+        except Exception as e:
+            raise e
+
+    async def call_ai_stream_async(
+        self, messages, temperature, max_tokens, model=None, **kwargs
+    ):
+        if self._http_async_client is None:
+            self._http_async_client = httpx.AsyncClient(
+                timeout=60.0,
+                limits=httpx.Limits(max_keepalive_connections=16),
+            )
+        data = self._build_payload(
+            messages, temperature, max_tokens, model, stream=True, **kwargs
+        )
+        async with self._http_async_client.stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            content=_dumps_json(data),
+            headers=_JSON_HEADERS,
+        ) as response:
+            response.raise_for_status()
+            # OpenAI-compatible server-sent events
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                payload = line[len("data: ") :]
+                if payload == "[DONE]":
+                    break
+                choices = json.loads(payload).get("choices")
+                if choices and choices[0].get("delta", {}).get("content"):
+                    yield choices[0]["delta"]["content"]
 
     def generate(self, messages, temperature, max_tokens, model=None, **kwargs):
         raise NotImplementedError("This provider does not support image generation")
@@ -197,10 +628,33 @@ class OpenAIProvider(AIProvider):
         "openai/o4-mini-2025-04-16",
     ]
 
-    def __init__(self, api_key=None):
-        self.sync_client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
-        self.async_client = AsyncOpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        api_key=None,
+        http_limits=None,
+        timeout=None,
+        http_client=None,
+        http_async_client=None,
+    ):
+        http_kwargs = _http_client_kwargs(http_limits, timeout)
+        # One pool per mode, owned by the provider unless a shared one is given
+        self._owns_http_client = http_client is None
+        self._owns_http_async_client = http_async_client is None
+        self._http_client = http_client or DefaultHttpxClient(**http_kwargs)
+        self._http_async_client = http_async_client or DefaultAsyncHttpxClient(
+            **http_kwargs
+        )
+        self.sync_client = OpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            http_client=self._http_client,
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            http_client=self._http_async_client,
+        )
 
+    def refresh_models(self):
+        """Add the chat models listed by the OpenAI API to supported_models."""
         try:
             # Get models from API - only include chat/text generation models
             api_models = []
@@ -242,32 +696,50 @@ class OpenAIProvider(AIProvider):
             if api_models:
                 existing_models = set(self.supported_models)
                 new_models = [m for m in api_models if m not in existing_models]
-                self.supported_models.extend(new_models)
+                self.supported_models = self.supported_models + new_models
 
         except Exception as e:
-            print(f"Warning: Could not fetch OpenAI models from API: {e}")
             # Continue with hardcoded list as fallback
+            print(f"Warning: Could not fetch OpenAI models from API: {e}")
+        return self.supported_models
+
+    def _chat_params(self, messages, temperature, max_tokens, model, **kwargs):
+        """chat.completions.create() parameters for sync, async and streaming calls."""
+        # Check if this is a reasoning model and handle accordingly
+        if self._is_reasoning_model(model):
+            return self._prepare_reasoning_params(
+                messages, temperature, max_tokens, model, **kwargs
+            )
+        # Standard model handling
+        return {
+            "model": _strip_prefix(model),
+            "messages": self._prepare_messages(messages),
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            **kwargs,
+        }
+
+    def prepare_request(self, messages, temperature, max_tokens, model, **kwargs):
+        params = self._chat_params(messages, temperature, max_tokens, model, **kwargs)
+        return PreparedRequest(
+            self, model, messages, temperature, max_tokens, kwargs, params
+        )
+
+    def call_prepared(self, prepared):
+        response = self.sync_client.chat.completions.create(**prepared.params)
+        return response.choices[0].message.content
+
+    async def call_prepared_async(self, prepared):
+        response = await self.async_client.chat.completions.create(**prepared.params)
+        return response.choices[0].message.content
 
     def call_ai(
         self, messages, temperature, max_tokens, model="openai/gpt-4o", **kwargs
     ):
         try:
-            # Check if this is a reasoning model and handle accordingly
-            if self._is_reasoning_model(model):
-                api_params = self._prepare_reasoning_params(
-                    messages, temperature, max_tokens, model, **kwargs
-                )
-                response = self.sync_client.chat.completions.create(**api_params)
-            else:
-                # Standard model handling
-                prepared_messages = self._prepare_messages(messages)
-                response = self.sync_client.chat.completions.create(
-                    model=model.split("/")[-1],
-                    messages=prepared_messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    **kwargs,
-                )
+            response = self.sync_client.chat.completions.create(
+                **self._chat_params(messages, temperature, max_tokens, model, **kwargs)
+            )
             return response.choices[0].message.content
         except Exception as e:
             raise e
@@ -276,26 +748,26 @@ class OpenAIProvider(AIProvider):
         self, messages, temperature, max_tokens, model="openai/gpt-4o", **kwargs
     ):
         try:
-            # Check if this is a reasoning model and handle accordingly
-            if self._is_reasoning_model(model):
-                api_params = self._prepare_reasoning_params(
-                    messages, temperature, max_tokens, model, **kwargs
-                )
-                response = await self.async_client.chat.completions.create(**api_params)
-            else:
-                # Standard model handling
-                prepared_messages = self._prepare_messages(messages)
-                response = await self.async_client.chat.completions.create(
-                    model=model.split("/")[-1],
-                    messages=prepared_messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    **kwargs,
-                )
+            response = await self.async_client.chat.completions.create(
+                **self._chat_params(messages, temperature, max_tokens, model, **kwargs)
+            )
             return response.choices[0].message.content
         except Exception as e:
             raise e
 
+    async def call_ai_stream_async(
+        self, messages, temperature, max_tokens, model="openai/gpt-4o", **kwargs
+    ):
+        stream = await self.async_client.chat.completions.create(
+            **self._chat_params(messages, temperature, max_tokens, model, **kwargs),
+            stream=True,
+        )
+        # Closes the response even when the stream fails or is abandoned
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
     def generate(self, messages, temperature, max_tokens, model=None, **kwargs):
         raise NotImplementedError("This provider does not support image generation")
 
@@ -306,7 +778,7 @@ class OpenAIProvider(AIProvider):
 
     def _is_reasoning_model(self, model):
         """Check if the model is a reasoning model (o1, o3 series)"""
-        model_name = model.split("/")[-1].lower()
+        model_name = _strip_prefix(model).lower()
         reasoning_models = [
             "o1",
             "o1-mini",
@@ -325,7 +797,7 @@ class OpenAIProvider(AIProvider):
         self, messages, temperature, max_tokens, model, **kwargs
     ):
         """Prepare parameters for reasoning models with their special requirements"""
-        model_name = model.split("/")[-1]
+        model_name = _strip_prefix(model)
 
         # Handle system/developer messages based on model capabilities
         prepared_messages = []
@@ -353,16 +825,11 @@ class OpenAIProvider(AIProvider):
                     prepared_message = {"role": message["role"], "content": []}
                     for item in message["content"]:
                         if isinstance(item, dict) and item.get("type") == "image_url":
-                            image_data = self._process_media(item["image_url"]["url"])
-                            mime_type, _ = mimetypes.guess_type(
-                                item["image_url"]["url"]
-                            )
-                            mime_type = mime_type or "image/jpeg"
                             prepared_message["content"].append(
                                 {
                                     "type": "image_url",
                                     "image_url": {
-                                        "url": f"data:{mime_type};base64,{image_data}"
+                                        "url": _media_url(item["image_url"]["url"])
                                     },
                                 }
                             )
@@ -409,12 +876,12 @@ class OpenAIProvider(AIProvider):
         if isinstance(media_path, (str, Path)):
             path = Path(media_path)
             if path.is_file():
-                with open(path, "rb") as media_file:
-                    return base64.b64encode(media_file.read()).decode("utf-8")
+                # Audio and video are too large to keep cached
+                return _encode_file(str(path))
             else:
                 raise ValueError(f"File not found: {media_path}")
         elif isinstance(media_path, bytes):
-            return base64.b64encode(media_path).decode("utf-8")
+            return base64_codec.b64encode(media_path)
         else:
             raise ValueError(f"Unsupported media format: {type(media_path)}")
 
@@ -423,22 +890,26 @@ class OpenAIProvider(AIProvider):
             # Handle both string paths and Path objects
             path = Path(image_path)
             if path.is_file():
-                with open(image_path, "rb") as image_file:
-                    return base64.b64encode(image_file.read()).decode("utf-8")
+                return _b64encode_file(path)
             else:
                 raise ValueError(f"File not found: {image_path}")
         elif isinstance(image_path, bytes):
             # Assume it's image data
-            return base64.b64encode(image_path).decode("utf-8")
+            return base64_codec.b64encode(image_path)
         elif isinstance(image_path, Image.Image):
             # It's a PIL Image
-            buffered = io.BytesIO()
-            image_path.save(buffered, format="PNG")
-            return base64.b64encode(buffered.getvalue()).decode("utf-8")
+            return _b64encode_pil(image_path, "PNG")
         else:
             raise ValueError(f"Unsupported image format: {type(image_path)}")
 
     def _prepare_messages(self, messages):
+        # Plain-text chats are already in API shape, nothing to rebuild
+        if all(
+            len(message) == 2 and isinstance(message["content"], str)
+            for message in messages
+        ):
+            return messages
+
         prepared_messages = []
         for message in messages:
             content = message["content"]
@@ -448,38 +919,26 @@ class OpenAIProvider(AIProvider):
                 prepared_content = []
                 for item in content:
                     if isinstance(item, dict) and item.get("type") == "image_url":
-                        image_data = self._process_media(item["image_url"]["url"])
-                        mime_type, _ = mimetypes.guess_type(item["image_url"]["url"])
-                        # Default to jpeg if we can't determine the type
-                        mime_type = mime_type or "image/jpeg"
+                        # Local files default to jpeg if we can't determine the type
                         prepared_content.append(
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:{mime_type};base64,{image_data}"
+                                    "url": _media_url(item["image_url"]["url"])
                                 },
                             }
                         )
                     elif isinstance(item, dict) and item.get("type") == "input_url":
-                        # Handle PDF files
+                        # Handle PDF files; data: and http(s) URLs pass through
                         pdf_url = item["input_url"]["url"]
-                        if pdf_url.startswith("data:"):
-                            # Already base64 encoded
-                            prepared_content.append(item)
-                        elif pdf_url.startswith(("http://", "https://")):
-                            # URL - OpenAI can handle these directly
-                            prepared_content.append(item)
-                        else:
-                            # Local file - need to encode
-                            pdf_data = self._process_media(pdf_url)
-                            prepared_content.append(
-                                {
-                                    "type": "input_url",
-                                    "input_url": {
-                                        "url": f"data:application/pdf;base64,{pdf_data}"
-                                    },
-                                }
-                            )
+                        prepared_content.append(
+                            {
+                                "type": "input_url",
+                                "input_url": {
+                                    "url": _media_url(pdf_url, "application/pdf")
+                                },
+                            }
+                        )
                     elif isinstance(item, dict) and item.get("type") in [
                         "video_url",
                         "audio_url",
@@ -510,6 +969,9 @@ class AzureOpenAIProvider(AIProvider):
     - AZURE_OPENAI_DEPLOYMENTS: Comma-separated list of deployment names
     """
 
+    # Any deployment name is accepted
+    model_prefixes = ("azure/",)
+
     def __init__(self, endpoint=None, api_key=None, api_version=None):
         endpoint = endpoint or os.getenv("AZURE_OPENAI_ENDPOINT")
         api_key = api_key or os.getenv("AZURE_OPENAI_API_KEY")
@@ -610,18 +1072,10 @@ class AzureOpenAIProvider(AIProvider):
                             prepared_content.append(item)
                         else:
                             # Local file - need to encode
-                            with open(image_url, "rb") as img_file:
-                                image_data = base64.b64encode(img_file.read()).decode(
-                                    "utf-8"
-                                )
-                            mime_type, _ = mimetypes.guess_type(image_url)
-                            mime_type = mime_type or "image/jpeg"
                             prepared_content.append(
                                 {
                                     "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:{mime_type};base64,{image_data}"
-                                    },
+                                    "image_url": {"url": _media_url(image_url)},
                                 }
                             )
                     elif isinstance(item, dict) and item.get("type") == "input_url":
@@ -635,15 +1089,11 @@ class AzureOpenAIProvider(AIProvider):
                             prepared_content.append(item)
                         else:
                             # Local file - need to encode
-                            with open(pdf_url, "rb") as pdf_file:
-                                pdf_data = base64.b64encode(pdf_file.read()).decode(
-                                    "utf-8"
-                                )
                             prepared_content.append(
                                 {
                                     "type": "input_url",
                                     "input_url": {
-                                        "url": f"data:application/pdf;base64,{pdf_data}"
+                                        "url": _media_url(pdf_url, "application/pdf")
                                     },
                                 }
                             )
@@ -699,17 +1149,47 @@ class AnthropicProvider(AIProvider):
         "anthropic/claude-opus-4-5-20251101",
     ]
 
-    def __init__(self, api_key=None):
+    def __init__(
+        self,
+        api_key=None,
+        http_limits=None,
+        timeout=None,
+        http_client=None,
+        http_async_client=None,
+    ):
+        http_kwargs = _http_client_kwargs(http_limits, timeout)
+        # The sync pool is shared by the SDK client and remote image downloads
+        self._owns_http_client = http_client is None
+        self._owns_http_async_client = http_async_client is None
+        self._http_client = http_client or anthropic.DefaultHttpxClient(**http_kwargs)
+        self._http_async_client = (
+            http_async_client or anthropic.DefaultAsyncHttpxClient(**http_kwargs)
+        )
         self.sync_client = anthropic.Anthropic(
-            api_key=api_key or os.getenv("ANTHROPIC_API_KEY")
+            api_key=api_key or os.getenv("ANTHROPIC_API_KEY"),
+            http_client=self._http_client,
         )
         self.async_client = anthropic.AsyncAnthropic(
-            api_key=api_key or os.getenv("ANTHROPIC_API_KEY")
+            api_key=api_key or os.getenv("ANTHROPIC_API_KEY"),
+            http_client=self._http_async_client,
         )
+        # Content types seen while downloading images, saves a HEAD request
+        self._url_media_types = OrderedDict()
 
-        self.supported_models = [
-            f"anthropic/{model.id}" for model in self.sync_client.models.list(limit=30)
-        ]
+    def refresh_models(self):
+        """Add the models listed by the Anthropic API to supported_models."""
+        try:
+            api_models = [
+                f"anthropic/{model.id}"
+                for model in self.sync_client.models.list(limit=30)
+            ]
+            existing_models = set(self.supported_models)
+            self.supported_models = self.supported_models + [
+                m for m in api_models if m not in existing_models
+            ]
+        except Exception as e:
+            print(f"Warning: Could not fetch Anthropic models from API: {e}")
+        return self.supported_models
 
     def supports_extended_thinking(self, model):
         """Check if a model supports extended thinking (reasoning capabilities)"""
@@ -721,6 +1201,22 @@ class AnthropicProvider(AIProvider):
 
     def _prepare_messages(self, messages):
         """Prepare messages for Claude API, handling both text, images, and caching."""
+        # Without list content there are no images to encode, split and return
+        if not any(isinstance(message["content"], list) for message in messages):
+            system_content = []
+            for message in messages:
+                if message["role"] == "system":
+                    system_msg = {"type": "text", "text": message["content"]}
+                    if "cache_control" in message:
+                        system_msg["cache_control"] = message["cache_control"]
+                    system_content.append(system_msg)
+            user_messages = [
+                {"role": message["role"], "content": message["content"]}
+                for message in messages
+                if message["role"] != "system" and isinstance(message["content"], str)
+            ]
+            return system_content, user_messages
+
         system_content = []
         user_messages = []
 
@@ -741,9 +1237,11 @@ class AnthropicProvider(AIProvider):
                     for item in message["content"]:
                         if isinstance(item, dict):
                             if item.get("type") == "text":
-                                prepared_content.append(
-                                    {"type": "text", "text": item["text"]}
-                                )
+                                text_block = {"type": "text", "text": item["text"]}
+                                # Keep prompt caching breakpoints on text blocks
+                                if "cache_control" in item:
+                                    text_block["cache_control"] = item["cache_control"]
+                                prepared_content.append(text_block)
                             elif item.get("type") == "image_url":
                                 # Handle both local files and URLs
                                 image_url = item["image_url"]["url"]
@@ -754,6 +1252,19 @@ class AnthropicProvider(AIProvider):
                                             "source": {"type": "url", "url": image_url},
                                         }
                                     )
+                                elif image_url.startswith("data:"):
+                                    # Already encoded, sent as is
+                                    media_type, image_data = _split_data_url(image_url)
+                                    prepared_content.append(
+                                        {
+                                            "type": "image",
+                                            "source": {
+                                                "type": "base64",
+                                                "media_type": media_type,
+                                                "data": image_data,
+                                            },
+                                        }
+                                    )
                                 else:
                                     # For local files, use base64
                                     image_data = self._process_image(image_url)
@@ -765,7 +1276,7 @@ class AnthropicProvider(AIProvider):
                                                 "media_type": self._get_media_type(
                                                     image_url
                                                 ),
-                                                "data": image_data,
+                                                "data": image_data.decode("ascii"),
                                             },
                                         }
                                     )
@@ -781,6 +1292,10 @@ class AnthropicProvider(AIProvider):
         if isinstance(image_path, (str, Path)):
             path = Path(image_path)
             if path.is_file():
+                # Small enough files are encoded straight from disk
+                if path.stat().st_size <= MAX_IMAGE_SIZE:
+                    return _b64encode_file(path)
+
                 # Read the image file
                 with open(path, "rb") as image_file:
                     image_data = image_file.read()
@@ -813,15 +1328,18 @@ class AnthropicProvider(AIProvider):
                         img_resized.save(buffer, format=img_format)
                         resized_data = buffer.getvalue()
 
-                    return base64.b64encode(resized_data).decode("utf-8")
+                    return base64_codec.b64encode(resized_data)
 
                 # If image is already small enough, just return the encoded data
-                return base64.b64encode(image_data).decode("utf-8")
+                return base64_codec.b64encode(image_data)
             # Add URL handling
             elif str(image_path).startswith(("http://", "https://")):
-                response = requests.get(str(image_path))
+                response = self._http_client.get(str(image_path), timeout=30.0)
                 response.raise_for_status()
                 image_data = response.content
+                content_type = response.headers.get("content-type")
+                if content_type:
+                    self._remember_media_type(str(image_path), content_type)
 
                 # Check if image needs resizing
                 if len(image_data) > MAX_IMAGE_SIZE:
@@ -850,9 +1368,9 @@ class AnthropicProvider(AIProvider):
                         img_resized.save(buffer, format=img_format)
                         resized_data = buffer.getvalue()
 
-                    return base64.b64encode(resized_data).decode("utf-8")
+                    return base64_codec.b64encode(resized_data)
 
-                return base64.b64encode(image_data).decode("utf-8")
+                return base64_codec.b64encode(image_data)
             else:
                 raise ValueError(f"File not found: {image_path}")
         elif isinstance(image_path, bytes):
@@ -885,54 +1403,64 @@ class AnthropicProvider(AIProvider):
                     img_resized.save(buffer, format=img_format)
                     resized_data = buffer.getvalue()
 
-                return base64.b64encode(resized_data).decode("utf-8")
+                return base64_codec.b64encode(resized_data)
 
-            return base64.b64encode(image_data).decode("utf-8")
+            return base64_codec.b64encode(image_data)
         elif isinstance(image_path, Image.Image):
             img = image_path
             # Preserve original format if possible, fallback to PNG
             img_format = getattr(img, "format", "PNG") or "PNG"
 
             # First try with original size
+            encoded = _b64encode_pil(img, img_format, max_size=MAX_IMAGE_SIZE)
+            if encoded is not None:
+                return encoded
+
+            # Too large, resize until it fits
+            # Start with 0.5 scaling
+            scale = 0.5
+            img_resized = img.resize((int(img.width * scale), int(img.height * scale)))
+
+            # Keep resizing if still too large
             buffer = io.BytesIO()
-            img.save(buffer, format=img_format)
-            image_data = buffer.getvalue()
+            img_resized.save(buffer, format=img_format)
+            resized_data = buffer.getvalue()
 
-            # Check if image needs resizing
-            if len(image_data) > MAX_IMAGE_SIZE:
-                # Start with 0.5 scaling
-                scale = 0.5
+            while len(resized_data) > MAX_IMAGE_SIZE and scale > 0.1:
+                # Reduce scale further if still too large
+                scale *= 0.8
                 img_resized = img.resize(
                     (int(img.width * scale), int(img.height * scale))
                 )
-
-                # Keep resizing if still too large
                 buffer = io.BytesIO()
                 img_resized.save(buffer, format=img_format)
                 resized_data = buffer.getvalue()
 
-                while len(resized_data) > MAX_IMAGE_SIZE and scale > 0.1:
-                    # Reduce scale further if still too large
-                    scale *= 0.8
-                    img_resized = img.resize(
-                        (int(img.width * scale), int(img.height * scale))
-                    )
-                    buffer = io.BytesIO()
-                    img_resized.save(buffer, format=img_format)
-                    resized_data = buffer.getvalue()
-
-                return base64.b64encode(resized_data).decode("utf-8")
-
-            return base64.b64encode(image_data).decode("utf-8")
+            return base64_codec.b64encode(resized_data)
         else:
             raise ValueError(f"Unsupported image format: {type(image_path)}")
 
+    # Image URLs whose content type is remembered, least recently used dropped
+    max_url_media_types = 256
+
+    def _remember_media_type(self, url, media_type):
+        self._url_media_types[url] = media_type
+        self._url_media_types.move_to_end(url)
+        while len(self._url_media_types) > self.max_url_media_types:
+            self._url_media_types.popitem(last=False)
+
     def _get_media_type(self, file_path):
         if isinstance(file_path, str) and file_path.startswith(("http://", "https://")):
-            response = requests.head(file_path)
-            return response.headers.get("content-type", "image/jpeg")
-        mime_type, _ = mimetypes.guess_type(file_path)
-        return mime_type or "image/jpeg"
+            media_type = self._url_media_types.get(file_path)
+            if media_type is None:
+                # Only ask the server when the extension doesn't tell us
+                media_type = _guess_url_mime(file_path)
+                if media_type is None:
+                    response = self._http_client.head(file_path, timeout=30.0)
+                    media_type = response.headers.get("content-type", "image/jpeg")
+            self._remember_media_type(file_path, media_type)
+            return media_type
+        return _guess_mime(file_path)
 
     def generate(self, messages, temperature, max_tokens, model=None, **kwargs):
         raise NotImplementedError("This provider does not support image generation")
@@ -942,91 +1470,100 @@ class AnthropicProvider(AIProvider):
     ):
         raise NotImplementedError("This provider does not support image generation")
 
-    def call_ai(
-        self,
-        messages,
-        temperature,
-        max_tokens,
-        model="anthropic/claude-3-5-sonnet-20240620",
-        **kwargs,
-    ):
-        try:
-            system_content, user_messages = self._prepare_messages(messages)
+    def _build_api_params(self, messages, temperature, max_tokens, model, kwargs):
+        """Build the messages.create() parameters shared by sync and async calls."""
+        system_content, user_messages = self._prepare_messages(messages)
 
-            # Extract thinking parameter if provided in kwargs
-            thinking = kwargs.pop("thinking", None)
+        # Extract thinking parameter if provided in kwargs
+        thinking = kwargs.pop("thinking", None)
 
-            # If thinking is True (boolean), convert to proper format
-            if thinking is True:
-                # According to docs: minimum budget is 1,024 tokens
-                # Budget MUST be less than max_tokens
-                min_budget = 1024
+        # If thinking is True (boolean), convert to proper format
+        if thinking is True:
+            # According to docs: minimum budget is 1,024 tokens
+            # Budget MUST be less than max_tokens
+            min_budget = 1024
 
-                # Ensure we have room for both thinking and response
-                if max_tokens <= min_budget:
-                    # If max_tokens is too small, use a smaller budget
-                    budget_tokens = max(256, max_tokens - 100)
-                else:
-                    # Standard calculation with safety margin
-                    max_budget = max_tokens - 100  # Leave room for response
-                    budget_tokens = max(min_budget, min(max_budget, max_tokens // 2))
+            # Ensure we have room for both thinking and response
+            if max_tokens <= min_budget:
+                # If max_tokens is too small, use a smaller budget
+                budget_tokens = max(256, max_tokens - 100)
+            else:
+                # Standard calculation with safety margin
+                max_budget = max_tokens - 100  # Leave room for response
+                budget_tokens = max(min_budget, min(max_budget, max_tokens // 2))
+
+            thinking = {"type": "enabled", "budget_tokens": budget_tokens}
+
+        # Handle thinking parameter compatibility constraints BEFORE creating api_params
+        if thinking:
+            # Adjust top_p if needed
+            if "top_p" in kwargs and kwargs["top_p"] < 0.95:
+                # Docs say top_p can be set between 0.95 and 1 when thinking is enabled
+                kwargs["top_p"] = max(kwargs["top_p"], 0.95)
+
+            # Remove unsupported parameters for thinking
+            thinking_incompatible = ["top_k"]
+            for param in thinking_incompatible:
+                if param in kwargs:
+                    kwargs.pop(param)
+
+        # Create API call parameters
+        api_params = {
+            "model": _strip_prefix(model),
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "system": system_content,
+            "messages": user_messages
+            if user_messages
+            else [{"role": "user", "content": "Follow the system prompt."}],
+            **kwargs,
+        }
 
-                thinking = {"type": "enabled", "budget_tokens": budget_tokens}
+        # Add thinking parameter only if it's provided
+        if thinking:
+            # Temperature MUST be set to 1 when thinking is enabled
+            api_params["temperature"] = 1
+            api_params["thinking"] = thinking
 
-            # Handle thinking parameter compatibility constraints BEFORE creating api_params
-            if thinking:
-                # Adjust top_p if needed
-                if "top_p" in kwargs and kwargs["top_p"] < 0.95:
-                    # Docs say top_p can be set between 0.95 and 1 when thinking is enabled
-                    kwargs["top_p"] = max(kwargs["top_p"], 0.95)
+        return api_params
 
-                # Remove unsupported parameters for thinking
-                thinking_incompatible = ["top_k"]
-                for param in thinking_incompatible:
-                    if param in kwargs:
-                        kwargs.pop(param)
+    def _extract_text(self, response):
+        """Return the first text block, skipping thinking / redacted_thinking."""
+        for block in getattr(response, "content", None) or ():
+            if block.type == "text":
+                return block.text
+        return ""
+
+    def prepare_request(self, messages, temperature, max_tokens, model, **kwargs):
+        # _build_api_params pops from kwargs, keep the caller's copy intact
+        params = self._build_api_params(
+            messages, temperature, max_tokens, model, dict(kwargs)
+        )
+        return PreparedRequest(
+            self, model, messages, temperature, max_tokens, kwargs, params
+        )
 
-            # Create API call parameters
-            api_params = {
-                "model": model.split("/")[-1],
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "system": system_content,
-                "messages": user_messages
-                if user_messages
-                else [{"role": "user", "content": "Follow the system prompt."}],
-                **kwargs,
-            }
+    def call_prepared(self, prepared):
+        return self._extract_text(self.sync_client.messages.create(**prepared.params))
 
-            # Add thinking parameter only if it's provided
-            if thinking:
-                # Temperature MUST be set to 1 when thinking is enabled
-                api_params["temperature"] = 1
-                api_params["thinking"] = thinking
+    async def call_prepared_async(self, prepared):
+        response = await self.async_client.messages.create(**prepared.params)
+        return self._extract_text(response)
 
+    def call_ai(
+        self,
+        messages,
+        temperature,
+        max_tokens,
+        model="anthropic/claude-3-5-sonnet-20240620",
+        **kwargs,
+    ):
+        try:
+            api_params = self._build_api_params(
+                messages, temperature, max_tokens, model, kwargs
+            )
             response = self.sync_client.messages.create(**api_params)
-
-            # Handle thinking content if present
-            if hasattr(response, "content") and len(response.content) > 1:
-                # Check if any content block is of type "thinking" or "redacted_thinking"
-                thinking_blocks = [
-                    block
-                    for block in response.content
-                    if getattr(block, "type", None) in ["thinking", "redacted_thinking"]
-                ]
-                if thinking_blocks:
-                    # You can log or process thinking blocks separately if needed
-                    # For now, we'll just return the final text response
-                    text_blocks = [
-                        block
-                        for block in response.content
-                        if getattr(block, "type", None) == "text"
-                    ]
-                    if text_blocks:
-                        return text_blocks[0].text
-
-            # Default return for normal responses
-            return response.content[0].text
+            return self._extract_text(response)
         except Exception as e:
             raise e
 
@@ -1039,85 +1576,30 @@ class AnthropicProvider(AIProvider):
         **kwargs,
     ):
         try:
-            system_content, user_messages = self._prepare_messages(messages)
-
-            # Extract thinking parameter if provided in kwargs
-            thinking = kwargs.pop("thinking", None)
-
-            # If thinking is True (boolean), convert to proper format
-            if thinking is True:
-                # According to docs: minimum budget is 1,024 tokens
-                # Budget MUST be less than max_tokens
-                min_budget = 1024
-
-                # Ensure we have room for both thinking and response
-                if max_tokens <= min_budget:
-                    # If max_tokens is too small, use a smaller budget
-                    budget_tokens = max(256, max_tokens - 100)
-                else:
-                    # Standard calculation with safety margin
-                    max_budget = max_tokens - 100  # Leave room for response
-                    budget_tokens = max(min_budget, min(max_budget, max_tokens // 2))
-
-                thinking = {"type": "enabled", "budget_tokens": budget_tokens}
-
-            # Handle thinking parameter compatibility constraints BEFORE creating api_params
-            if thinking:
-                # Adjust top_p if needed
-                if "top_p" in kwargs and kwargs["top_p"] < 0.95:
-                    # Docs say top_p can be set between 0.95 and 1 when thinking is enabled
-                    kwargs["top_p"] = max(kwargs["top_p"], 0.95)
-
-                # Remove unsupported parameters for thinking
-                thinking_incompatible = ["top_k"]
-                for param in thinking_incompatible:
-                    if param in kwargs:
-                        kwargs.pop(param)
-
-            # Create API call parameters
-            api_params = {
-                "model": model.split("/")[-1],
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "system": system_content,
-                "messages": user_messages
-                if user_messages
-                else [{"role": "user", "content": "Follow the system prompt."}],
-                **kwargs,
-            }
-
-            # Add thinking parameter only if it's provided
-            if thinking:
-                # Temperature MUST be set to 1 when thinking is enabled
-                api_params["temperature"] = 1
-                api_params["thinking"] = thinking
-
+            api_params = self._build_api_params(
+                messages, temperature, max_tokens, model, kwargs
+            )
             response = await self.async_client.messages.create(**api_params)
-
-            # Handle thinking content if present
-            if hasattr(response, "content") and len(response.content) > 1:
-                # Check if any content block is of type "thinking" or "redacted_thinking"
-                thinking_blocks = [
-                    block
-                    for block in response.content
-                    if getattr(block, "type", None) in ["thinking", "redacted_thinking"]
-                ]
-                if thinking_blocks:
-                    # You can log or process thinking blocks separately if needed
-                    # For now, we'll just return the final text response
-                    text_blocks = [
-                        block
-                        for block in response.content
-                        if getattr(block, "type", None) == "text"
-                    ]
-                    if text_blocks:
-                        return text_blocks[0].text
-
-            # Default return for normal responses
-            return response.content[0].text
+            return self._extract_text(response)
         except Exception as e:
             raise e
 
+    async def call_ai_stream_async(
+        self,
+        messages,
+        temperature,
+        max_tokens,
+        model="anthropic/claude-3-5-sonnet-20240620",
+        **kwargs,
+    ):
+        api_params = self._build_api_params(
+            messages, temperature, max_tokens, model, kwargs
+        )
+        async with self.async_client.messages.stream(**api_params) as stream:
+            # text_stream skips thinking deltas
+            async for text in stream.text_stream:
+                yield text
+
 
 class VertexAIProvider(AIProvider):
     """
@@ -1185,9 +1667,11 @@ class VertexAIProvider(AIProvider):
                     for item in message["content"]:
                         if isinstance(item, dict):
                             if item.get("type") == "text":
-                                prepared_content.append(
-                                    {"type": "text", "text": item["text"]}
-                                )
+                                text_block = {"type": "text", "text": item["text"]}
+                                # Keep prompt caching breakpoints on text blocks
+                                if "cache_control" in item:
+                                    text_block["cache_control"] = item["cache_control"]
+                                prepared_content.append(text_block)
                             elif item.get("type") == "image_url":
                                 # Handle both local files and URLs
                                 image_url = item["image_url"]["url"]
@@ -1357,10 +1841,12 @@ class VertexAIProvider(AIProvider):
     def _get_media_type(self, file_path):
         """Get media type for image files."""
         if isinstance(file_path, str) and file_path.startswith(("http://", "https://")):
+            media_type = _guess_url_mime(file_path)
+            if media_type is not None:
+                return media_type
             response = requests.head(file_path)
             return response.headers.get("content-type", "image/jpeg")
-        mime_type, _ = mimetypes.guess_type(file_path)
-        return mime_type or "image/jpeg"
+        return _guess_mime(file_path)
 
     def call_ai(
         self,
@@ -1375,7 +1861,7 @@ class VertexAIProvider(AIProvider):
 
             # Create API call parameters
             api_params = {
-                "model": model.split("/")[-1],  # Remove vertex/ prefix
+                "model": _strip_prefix(model),  # Remove vertex/ prefix
                 "max_tokens": max_tokens,
                 "temperature": temperature,
                 "system": system_content,
@@ -1403,7 +1889,7 @@ class VertexAIProvider(AIProvider):
 
             # Create API call parameters
             api_params = {
-                "model": model.split("/")[-1],  # Remove vertex/ prefix
+                "model": _strip_prefix(model),  # Remove vertex/ prefix
                 "max_tokens": max_tokens,
                 "temperature": temperature,
                 "system": system_content,
@@ -1427,6 +1913,58 @@ class VertexAIProvider(AIProvider):
         raise NotImplementedError("This provider does not support image generation")
 
 
+# Safety filters are disabled on every Gemini request; built once at import
+_GEMINI_SAFETY_SETTINGS = tuple(
+    types.SafetySetting(category=category, threshold="BLOCK_NONE")
+    for category in (
+        "HARM_CATEGORY_HATE_SPEECH",
+        "HARM_CATEGORY_CIVIC_INTEGRITY",
+        "HARM_CATEGORY_HARASSMENT",
+        "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "HARM_CATEGORY_DANGEROUS_CONTENT",
+    )
+)
+
+
+# Decoded data: URL parts by URL digest, least recently used dropped first
+_data_url_parts = OrderedDict()
+_data_url_parts_lock = threading.Lock()
+_MAX_DATA_URL_PARTS = 32
+
+
+def _load_data_url_part(url):
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+    with _data_url_parts_lock:
+        part = _data_url_parts.get(digest)
+        if part is not None:
+            _data_url_parts.move_to_end(digest)
+            return part
+    mime_type, payload = _split_data_url(url)
+    part = types.Part.from_bytes(
+        data=base64_codec.b64decode(payload), mime_type=mime_type
+    )
+    with _data_url_parts_lock:
+        _data_url_parts[digest] = part
+        while len(_data_url_parts) > _MAX_DATA_URL_PARTS:
+            _data_url_parts.popitem(last=False)
+    return part
+
+
+def _load_image_part(image_path):
+    """Gemini image part for a local file or data: URL, decoded once per revision."""
+    if isinstance(image_path, str) and image_path.startswith("data:"):
+        return _load_data_url_part(image_path)
+    stat = os.stat(image_path)
+    return _load_image_part_cached(str(image_path), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=128)
+def _load_image_part_cached(path_str, mtime_ns, size):
+    with open(path_str, "rb") as f:
+        image_data = f.read()
+    return types.Part.from_bytes(data=image_data, mime_type=_guess_mime(path_str))
+
+
 class GeminiProvider(AIProvider):
     supported_models = [
         "gemini/gemini-1.0-pro-vision-latest",
@@ -1564,8 +2102,29 @@ class GeminiProvider(AIProvider):
         "genai/gemini-3.0-deep-think",
     ]
 
-    def __init__(self, api_key=None):
-        self.client = genai.Client(api_key=api_key or os.getenv("GOOGLE_API_KEY"))
+    def __init__(
+        self,
+        api_key=None,
+        http_limits=None,
+        timeout=None,
+        http_client=None,
+        http_async_client=None,
+    ):
+        http_options = types.HttpOptions(
+            client_args={"limits": http_limits or DEFAULT_HTTP_LIMITS},
+            async_client_args={"limits": http_limits or DEFAULT_HTTP_LIMITS},
+            # Shared pools take precedence over client_args when given
+            httpx_client=http_client,
+            httpx_async_client=http_async_client,
+            # google-genai expects the timeout in milliseconds
+            timeout=int(timeout * 1000) if timeout is not None else None,
+        )
+        self.client = genai.Client(
+            api_key=api_key or os.getenv("GOOGLE_API_KEY"), http_options=http_options
+        )
+
+    def refresh_models(self):
+        """Add the generateContent models listed by the Gemini API."""
         try:
             # Get models from API
             api_models = []
@@ -1593,9 +2152,135 @@ class GeminiProvider(AIProvider):
 
             # Add the API models to our supported models
             if api_models:
-                self.supported_models.extend(api_models)
+                self.supported_models = self.supported_models + api_models
         except Exception as e:
-            print(f"Error initializing GeminiProvider: {e}")
+            print(f"Warning: Could not fetch Gemini models from API: {e}")
+        return self.supported_models
+
+    def _build_contents(self, messages):
+        """Split off the system instruction and build Gemini contents."""
+        # Extract system message if present
+        system_instruction = next(
+            (msg["content"] for msg in messages if msg["role"] == "system"), None
+        )
+
+        # Get the user messages
+        user_messages = [msg for msg in messages if msg["role"] != "system"]
+
+        # Convert messages to content
+        if not user_messages:
+            contents = "Follow the system instructions."
+        elif len(user_messages) == 1 and isinstance(user_messages[0]["content"], str):
+            contents = user_messages[0]["content"]
+        else:
+            # Handle multiple messages or messages with images and videos
+            contents = []
+            for message in user_messages:
+                if isinstance(message["content"], str):
+                    contents.append(message["content"])
+                elif isinstance(message["content"], list):
+                    text_parts = []
+                    media_parts = []
+                    for item in message["content"]:
+                        if item.get("type") == "text":
+                            text_parts.append(item["text"])
+                        elif item.get("type") == "image_url":
+                            image_path = item["image_url"]["url"]
+                            media_parts.append(_load_image_part(image_path))
+                        elif item.get("type") == "video_url":
+                            # Support video processing
+                            video_path = item["video_url"]["url"]
+                            video_file = self.process_video(video_path)
+                            media_parts.append(video_file)
+
+                    # Always ensure there's text content
+                    if not text_parts:
+                        text_parts.append("Consider this media in your response.")
+
+                    # Combine text parts into a single string
+                    contents.append(" ".join(text_parts))
+                    # Add media parts after text
+                    contents.extend(media_parts)
+
+        return system_instruction, contents
+
+    def _content_params(self, messages, temperature, max_tokens, model, kwargs):
+        """generate_content() parameters shared by sync, async and streaming calls."""
+        # Handle different model name formats
+        if "/" in model:
+            model_parts = model.split("/")
+            if model_parts[0] in ["gemini", "genai", "models"]:
+                # Extract just the model name without prefixes
+                model_name = model_parts[-1]
+            else:
+                model_name = model
+        else:
+            model_name = model
+
+        system_instruction, contents = self._build_contents(messages)
+
+        # Extract thinking configuration from kwargs
+        thinking_config = kwargs.pop("thinking_config", None)
+        thinking_budget = kwargs.pop("thinking_budget", None)
+
+        # Handle thinking configuration
+        config_kwargs = {}
+        if thinking_config:
+            config_kwargs["thinking_config"] = thinking_config
+        elif thinking_budget:
+            config_kwargs["thinking_config"] = types.ThinkingConfig(
+                thinking_budget=thinking_budget
+            )
+
+        return {
+            "model": model_name,
+            "contents": contents,
+            "config": types.GenerateContentConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+                system_instruction=system_instruction,
+                safety_settings=_GEMINI_SAFETY_SETTINGS,
+                **config_kwargs,
+            ),
+        }
+
+    def _response_text(self, response):
+        if response.text:
+            return response.text
+
+        # If no text, check why
+        if response.candidates:
+            candidate = response.candidates[0]
+            if candidate.finish_reason:
+                # Raise a helpful error about why it stopped
+                raise ValueError(
+                    f"Gemini refused response. Finish Reason: {candidate.finish_reason}"
+                )
+
+        return ""  # Or raise an error if empty is unacceptable
+
+    def prepare_request(self, messages, temperature, max_tokens, model, **kwargs):
+        # Images are loaded and wrapped into Parts once per logical call
+        params = self._content_params(
+            messages, temperature, max_tokens, model, dict(kwargs)
+        )
+        return PreparedRequest(
+            self, model, messages, temperature, max_tokens, kwargs, params
+        )
+
+    def call_prepared(self, prepared):
+        return self._response_text(self._generate_content(**prepared.params))
+
+    async def call_prepared_async(self, prepared):
+        response = await self._generate_content_async(**prepared.params)
+        return self._response_text(response)
+
+    # 429s are retried by the shared call_ai policy, honoring Retry-After
+    def _generate_content(self, **kwargs):
+        return self.client.models.generate_content(**kwargs)
+
+    async def _generate_content_async(self, **kwargs):
+        return await self.client.aio.models.generate_content(**kwargs)
 
     def call_ai(
         self,
@@ -1606,124 +2291,10 @@ class GeminiProvider(AIProvider):
         **kwargs,
     ):
         try:
-            # Handle different model name formats
-            if "/" in model:
-                model_parts = model.split("/")
-                if model_parts[0] in ["gemini", "genai", "models"]:
-                    # Extract just the model name without prefixes
-                    model_name = model_parts[-1]
-                else:
-                    model_name = model
-            else:
-                model_name = model
-
-            # Extract system message if present
-            system_instruction = next(
-                (msg["content"] for msg in messages if msg["role"] == "system"), None
+            response = self._generate_content(
+                **self._content_params(messages, temperature, max_tokens, model, kwargs)
             )
-
-            # Get the user messages
-            user_messages = [msg for msg in messages if msg["role"] != "system"]
-
-            # Convert messages to content
-            if not user_messages:
-                contents = "Follow the system instructions."
-            elif len(user_messages) == 1 and isinstance(
-                user_messages[0]["content"], str
-            ):
-                contents = user_messages[0]["content"]
-            else:
-                # Handle multiple messages or messages with images and videos
-                contents = []
-                for message in user_messages:
-                    if isinstance(message["content"], str):
-                        contents.append(message["content"])
-                    elif isinstance(message["content"], list):
-                        text_parts = []
-                        media_parts = []
-                        for item in message["content"]:
-                            if item.get("type") == "text":
-                                text_parts.append(item["text"])
-                            elif item.get("type") == "image_url":
-                                image_path = item["image_url"]["url"]
-                                with open(image_path, "rb") as f:
-                                    image_data = f.read()
-                                media_parts.append(
-                                    types.Part.from_bytes(
-                                        data=image_data, mime_type="image/jpeg"
-                                    )
-                                )
-                            elif item.get("type") == "video_url":
-                                # Support video processing
-                                video_path = item["video_url"]["url"]
-                                video_file = self.process_video(video_path)
-                                media_parts.append(video_file)
-
-                        # Always ensure there's text content
-                        if not text_parts:
-                            text_parts.append("Consider this media in your response.")
-
-                        # Combine text parts into a single string
-                        contents.append(" ".join(text_parts))
-                        # Add media parts after text
-                        contents.extend(media_parts)
-
-            # Extract thinking configuration from kwargs
-            thinking_config = kwargs.pop("thinking_config", None)
-            thinking_budget = kwargs.pop("thinking_budget", None)
-
-            # Handle thinking configuration
-            config_kwargs = {}
-            if thinking_config:
-                config_kwargs["thinking_config"] = thinking_config
-            elif thinking_budget:
-                config_kwargs["thinking_config"] = types.ThinkingConfig(
-                    thinking_budget=thinking_budget
-                )
-
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    temperature=temperature,
-                    max_output_tokens=max_tokens,
-                    system_instruction=system_instruction,
-                    safety_settings=[
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_NONE"
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_CIVIC_INTEGRITY",
-                            threshold="BLOCK_NONE",
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_NONE"
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                            threshold="BLOCK_NONE",
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                            threshold="BLOCK_NONE",
-                        ),
-                    ],
-                    **config_kwargs,
-                ),
-            )
-            if response.text:
-                return response.text
-
-            # If no text, check why
-            if response.candidates:
-                candidate = response.candidates[0]
-                if candidate.finish_reason:
-                    # Raise a helpful error about why it stopped
-                    raise ValueError(
-                        f"Gemini refused response. Finish Reason: {candidate.finish_reason}"
-                    )
-
-            return ""  # Or raise an error if empty is unacceptable
+            return self._response_text(response)
         except Exception as e:
             raise e
 
@@ -1736,126 +2307,28 @@ class GeminiProvider(AIProvider):
         **kwargs,
     ):
         try:
-            if "/" in model:
-                model_parts = model.split("/")
-                if model_parts[0] in ["gemini", "genai", "models"]:
-                    # Extract just the model name without prefixes
-                    model_name = model_parts[-1]
-                else:
-                    model_name = model
-            else:
-                model_name = model
-
-            # Extract system message if present
-            system_instruction = next(
-                (msg["content"] for msg in messages if msg["role"] == "system"), None
-            )
-
-            # Get the user messages
-            user_messages = [msg for msg in messages if msg["role"] != "system"]
-
-            if not user_messages:
-                contents = "Follow the system instructions."
-            elif len(user_messages) == 1 and isinstance(
-                user_messages[0]["content"], str
-            ):
-                contents = user_messages[0]["content"]
-            else:
-                # Handle multiple messages or messages with images and videos
-                contents = []
-                for message in user_messages:
-                    if isinstance(message["content"], str):
-                        contents.append(message["content"])
-                    elif isinstance(message["content"], list):
-                        text_parts = []
-                        media_parts = []
-                        for item in message["content"]:
-                            if item.get("type") == "text":
-                                text_parts.append(item["text"])
-                            elif item.get("type") == "image_url":
-                                image_path = item["image_url"]["url"]
-                                with open(image_path, "rb") as f:
-                                    image_data = f.read()
-                                media_parts.append(
-                                    types.Part.from_bytes(
-                                        data=image_data, mime_type="image/jpeg"
-                                    )
-                                )
-                            elif item.get("type") == "video_url":
-                                # Support video processing
-                                video_path = item["video_url"]["url"]
-                                video_file = self.process_video(video_path)
-                                media_parts.append(video_file)
-
-                        # Always ensure there's text content
-                        if not text_parts:
-                            text_parts.append("Consider this media in your response.")
-
-                        # Combine text parts into a single string
-                        contents.append(" ".join(text_parts))
-                        # Add media parts after text
-                        contents.extend(media_parts)
-
-            # Extract thinking configuration from kwargs
-            thinking_config = kwargs.pop("thinking_config", None)
-            thinking_budget = kwargs.pop("thinking_budget", None)
-
-            # Handle thinking configuration
-            config_kwargs = {}
-            if thinking_config:
-                config_kwargs["thinking_config"] = thinking_config
-            elif thinking_budget:
-                config_kwargs["thinking_config"] = types.ThinkingConfig(
-                    thinking_budget=thinking_budget
-                )
-
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    temperature=temperature,
-                    max_output_tokens=max_tokens,
-                    system_instruction=system_instruction,
-                    safety_settings=[
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_NONE"
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_NONE"
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                            threshold="BLOCK_NONE",
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_CIVIC_INTEGRITY",
-                            threshold="BLOCK_NONE",
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                            threshold="BLOCK_NONE",
-                        ),
-                    ],
-                    **config_kwargs,
-                ),
+            response = await self._generate_content_async(
+                **self._content_params(messages, temperature, max_tokens, model, kwargs)
             )
-
-            if response.text:
-                return response.text
-
-            # If no text, check why
-            if response.candidates:
-                candidate = response.candidates[0]
-                if candidate.finish_reason:
-                    # Raise a helpful error about why it stopped
-                    raise ValueError(
-                        f"Gemini refused response. Finish Reason: {candidate.finish_reason}"
-                    )
-
-            return ""  # Or raise an error if empty is unacceptable
+            return self._response_text(response)
         except Exception as e:
             raise e
 
+    async def call_ai_stream_async(
+        self,
+        messages,
+        temperature,
+        max_tokens,
+        model="gemini/gemini-2.0-flash-exp",
+        **kwargs,
+    ):
+        stream = await self.client.aio.models.generate_content_stream(
+            **self._content_params(messages, temperature, max_tokens, model, kwargs)
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
     def process_video(self, video_path):
         """
         Public method to process and upload video files to Gemini.
@@ -1891,56 +2364,9 @@ class GeminiProvider(AIProvider):
         **kwargs,
     ):
         try:
-            # Extract system message if present
-            system_instruction = next(
-                (msg["content"] for msg in messages if msg["role"] == "system"), None
-            )
-
-            # Get the user messages
-            user_messages = [msg for msg in messages if msg["role"] != "system"]
-
-            # Convert messages to content
-            if not user_messages:
-                contents = "Follow the system instructions."
-            elif len(user_messages) == 1 and isinstance(
-                user_messages[0]["content"], str
-            ):
-                contents = [user_messages[0]["content"]]
-            else:
-                # Handle multiple messages or messages with images and videos
-                contents = []
-                for message in user_messages:
-                    if isinstance(message["content"], str):
-                        contents.append(message["content"])
-                    elif isinstance(message["content"], list):
-                        text_parts = []
-                        media_parts = []
-                        for item in message["content"]:
-                            if item.get("type") == "text":
-                                text_parts.append(item["text"])
-                            elif item.get("type") == "image_url":
-                                image_path = item["image_url"]["url"]
-                                with open(image_path, "rb") as f:
-                                    image_data = f.read()
-                                media_parts.append(
-                                    types.Part.from_bytes(
-                                        data=image_data, mime_type="image/jpeg"
-                                    )
-                                )
-                            elif item.get("type") == "video_url":
-                                # Support video processing
-                                video_path = item["video_url"]["url"]
-                                video_file = self.process_video(video_path)
-                                media_parts.append(video_file)
-
-                        # Always ensure there's text content
-                        if not text_parts:
-                            text_parts.append("Consider this media in your response.")
-
-                        # Combine text parts into a single string
-                        contents.append(" ".join(text_parts))
-                        # Add media parts after text
-                        contents.extend(media_parts)
+            system_instruction, contents = self._build_contents(messages)
+            if isinstance(contents, str):
+                contents = [contents]
 
             # Configure response modalities to include both text and image
             config = types.GenerateContentConfig(
@@ -1948,30 +2374,11 @@ class GeminiProvider(AIProvider):
                 max_output_tokens=max_tokens,
                 system_instruction=system_instruction,
                 response_modalities=["Text", "Image"],
-                safety_settings=[
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_CIVIC_INTEGRITY",
-                        threshold="BLOCK_NONE",
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        threshold="BLOCK_NONE",
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                        threshold="BLOCK_NONE",
-                    ),
-                ],
+                safety_settings=_GEMINI_SAFETY_SETTINGS,
             )
 
             response = self.client.models.generate_content(
-                model=model.split("/")[-1],
+                model=_strip_prefix(model),
                 contents=contents,
                 config=config,
             )
@@ -2008,14 +2415,30 @@ class GeminiProvider(AIProvider):
 class DeepSeekProvider(AIProvider):
     supported_models = ["deepseek-chat", "deepseek-reasoner"]
 
-    def __init__(self, api_key=None):
+    def __init__(
+        self,
+        api_key=None,
+        http_limits=None,
+        timeout=None,
+        http_client=None,
+        http_async_client=None,
+    ):
+        http_kwargs = _http_client_kwargs(http_limits, timeout)
+        self._owns_http_client = http_client is None
+        self._owns_http_async_client = http_async_client is None
+        self._http_client = http_client or DefaultHttpxClient(**http_kwargs)
+        self._http_async_client = http_async_client or DefaultAsyncHttpxClient(
+            **http_kwargs
+        )
         self.sync_client = OpenAI(
             api_key=api_key or os.getenv("DEEPSEEK_API_KEY"),
             base_url="https://api.deepseek.com",
+            http_client=self._http_client,
         )
         self.async_client = AsyncOpenAI(
             api_key=api_key or os.getenv("DEEPSEEK_API_KEY"),
             base_url="https://api.deepseek.com",
+            http_client=self._http_async_client,
         )
 
     def generate(self, messages, temperature, max_tokens, model=None, **kwargs):
@@ -2026,6 +2449,26 @@ class DeepSeekProvider(AIProvider):
     ):
         raise NotImplementedError("This provider does not support image generation")
 
+    def prepare_request(self, messages, temperature, max_tokens, model, **kwargs):
+        params = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            **kwargs,
+        }
+        return PreparedRequest(
+            self, model, messages, temperature, max_tokens, kwargs, params
+        )
+
+    def call_prepared(self, prepared):
+        response = self.sync_client.chat.completions.create(**prepared.params)
+        return response.choices[0].message.content
+
+    async def call_prepared_async(self, prepared):
+        response = await self.async_client.chat.completions.create(**prepared.params)
+        return response.choices[0].message.content
+
     def call_ai(
         self, messages, temperature, max_tokens, model="deepseek-chat", **kwargs
     ):
@@ -2056,10 +2499,30 @@ class DeepSeekProvider(AIProvider):
         except Exception as e:
             raise e
 
+    async def call_ai_stream_async(
+        self, messages, temperature, max_tokens, model="deepseek-chat", **kwargs
+    ):
+        stream = await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            **kwargs,
+        )
+        # Closes the response even when the stream fails or is abandoned
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
 
 class BedrockProvider(AIProvider):
     """AWS Bedrock provider supporting multiple model families"""
 
+    # ARN-based inference profiles
+    model_prefixes = ("bedrock/arn:aws:bedrock:",)
+
     supported_models = [
         # Anthropic Claude Models - Direct IDs
         "bedrock/anthropic.claude-3-haiku-20240307-v1:0",
@@ -2500,9 +2963,11 @@ class BedrockProvider(AIProvider):
         model="bedrock/anthropic.claude-3-5-sonnet-20240620-v1:0",
         **kwargs,
     ):
-        # AWS Bedrock doesn't have native async support in boto3, so we'll use the sync version
-        # In a production environment, you might want to use asyncio.run_in_executor
-        return self.call_ai(messages, temperature, max_tokens, model, **kwargs)
+        # boto3 has no async client; run it in a worker thread so it doesn't
+        # block the event loop
+        return await asyncio.to_thread(
+            self.call_ai, messages, temperature, max_tokens, model, **kwargs
+        )
 
     def generate(self, messages, temperature, max_tokens, model=None, **kwargs):
         # Check if model supports image generation
@@ -2522,110 +2987,465 @@ class BedrockProvider(AIProvider):
         return self.generate(messages, temperature, max_tokens, model, **kwargs)
 
 
+# Anthropic ignores cache breakpoints on prefixes shorter than ~1024 tokens
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+
+def _estimate_tokens(text):
+    return len(text) // 4
+
+
+def _message_text(message):
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            item.get("text", "") for item in content if isinstance(item, dict)
+        )
+    return ""
+
+
+def _apply_prompt_caching(provider, messages, cache_breakpoints=True):
+    """
+    Make prompts friendly to provider-side prefix caching.
+
+    Anthropic (and Claude on Vertex) only caches up to explicit breakpoints, so
+    ``cache_control`` markers are added to the last system message and to the
+    largest user message when they are long enough to be cached. OpenAI caches
+    stable prefixes automatically; trailing whitespace is stripped from system
+    messages so the prefix stays byte-identical between calls.
+
+    Args:
+        cache_breakpoints: True to place breakpoints automatically, False to
+            leave messages untouched, or a list of message indices to mark.
+
+    Returns:
+        A new message list, the input list is not modified.
+    """
+    if not cache_breakpoints:
+        return messages
+
+    if isinstance(provider, (OpenAIProvider, AzureOpenAIProvider, DeepSeekProvider)):
+        return [
+            {**message, "content": message["content"].rstrip()}
+            if message["role"] == "system" and isinstance(message["content"], str)
+            else message
+            for message in messages
+        ]
+
+    if not isinstance(provider, (AnthropicProvider, VertexAIProvider)):
+        return messages
+
+    if cache_breakpoints is True:
+        indices = []
+        system_indices = [
+            i for i, message in enumerate(messages) if message["role"] == "system"
+        ]
+        if system_indices and (
+            sum(_estimate_tokens(_message_text(messages[i])) for i in system_indices)
+            >= PROMPT_CACHE_MIN_TOKENS
+        ):
+            indices.append(system_indices[-1])
+
+        user_sizes = [
+            (_estimate_tokens(_message_text(message)), i)
+            for i, message in enumerate(messages)
+            if message["role"] == "user"
+        ]
+        if user_sizes:
+            size, index = max(user_sizes)
+            if size >= PROMPT_CACHE_MIN_TOKENS:
+                indices.append(index)
+    else:
+        indices = list(cache_breakpoints)
+
+    marker = {"type": "ephemeral"}
+    prepared = list(messages)
+    for index in indices:
+        message = prepared[index]
+        if message["role"] == "system":
+            prepared[index] = {**message, "cache_control": marker}
+            continue
+
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        text_positions = [
+            i
+            for i, item in enumerate(content)
+            if isinstance(item, dict) and item.get("type") == "text"
+        ]
+        if not text_positions:
+            continue
+        content = list(content)
+        content[text_positions[-1]] = {
+            **content[text_positions[-1]],
+            "cache_control": marker,
+        }
+        prepared[index] = {**message, "content": content}
+
+    return prepared
+
+
 class AIManager:
-    def __init__(self):
+    def __init__(self, compress_hosts=None):
         self.providers = {}
+        # Flat model -> provider lookup, first registered provider wins
+        self._model_index = {}
+        # Sorted model_prefixes with their providers, searched with bisect
+        self._prefix_keys = []
+        self._prefix_providers = []
+        # Providers whose live model list was already fetched
+        self._refreshed_providers = set()
+        # Used for models no registered provider claims
+        self.fallback_provider = None
+        # Resolves model="auto" by prompt complexity and price
+        self.router = ModelRouter()
+        # Per-provider breakers, send calls to fallback_provider during outages
+        self._breakers = {}
+        # Per-provider RPM/TPM limits from {NAME}_RPM / {NAME}_TPM env vars
+        self._limiters = {}
+        # name -> (factory, supported models, model prefixes), see register_factory
+        self._factories = {}
+        self._factory_lock = threading.RLock()
+        # Long-lived pools that providers can share to reuse keep-alive
+        # connections (and HTTP/2 multiplexing when h2 is installed)
+        shared_http_kwargs = _http_client_kwargs(SHARED_HTTP_LIMITS)
+        # Large POST bodies to these hosts are sent compressed
+        if compress_hosts is None:
+            compress_hosts = compress_hosts_from_env()
+        if compress_hosts:
+            shared_http_kwargs["transport"] = CompressingTransport(
+                httpx.HTTPTransport(limits=SHARED_HTTP_LIMITS, http2=HTTP2_AVAILABLE),
+                compress_hosts,
+            )
+        self._http_client = DefaultHttpxClient(
+            http2=HTTP2_AVAILABLE, **shared_http_kwargs
+        )
+        if compress_hosts:
+            shared_http_kwargs["transport"] = AsyncCompressingTransport(
+                httpx.AsyncHTTPTransport(
+                    limits=SHARED_HTTP_LIMITS, http2=HTTP2_AVAILABLE
+                ),
+                compress_hosts,
+            )
+        self._ahttp_client = DefaultAsyncHttpxClient(
+            http2=HTTP2_AVAILABLE, **shared_http_kwargs
+        )
+        # Loop the async pool's connections belong to, where close() closes it
+        self._ahttp_loop = None
+
+    def shared_http_clients(self):
+        """Keyword arguments that plug a provider into the shared pools."""
+        return {
+            "http_client": self._http_client,
+            "http_async_client": self._ahttp_client,
+        }
 
-    def add_provider(self, provider):
+    def add_provider(self, provider, warmup=False):
         self.providers[provider.__class__.__name__] = provider
+        self._factories.pop(provider.__class__.__name__, None)
+        self._breakers[provider.__class__.__name__] = CircuitBreaker(
+            provider.__class__.__name__
+        )
+        self._limiters[provider.__class__.__name__] = RateLimiter.from_env(
+            provider.__class__.__name__
+        )
+        if warmup:
+            provider.warmup()
+        self._refreshed_providers.discard(provider.__class__.__name__)
+        self._rebuild_model_index()
+
+    def _rebuild_model_index(self):
+        self._model_index = {}
+        prefixes = {}
+        for provider in self.providers.values():
+            for model in provider.supported_models:
+                self._model_index.setdefault(model, provider)
+            for prefix in provider.model_prefixes:
+                prefixes.setdefault(prefix, provider)
+        self._prefix_keys = sorted(prefixes)
+        self._prefix_providers = [prefixes[prefix] for prefix in self._prefix_keys]
+
+    def _prefix_match(self, model):
+        """Provider with the longest registered prefix of ``model``, or None."""
+        # Every prefix of model sorts at or before it, longer prefixes last
+        i = bisect.bisect_right(self._prefix_keys, model)
+        while i:
+            i -= 1
+            prefix = self._prefix_keys[i]
+            if model.startswith(prefix):
+                return self._prefix_providers[i]
+            if prefix[:1] != model[:1]:
+                break
+        return None
+
+    def register_factory(self, name, factory, supported_models=(), model_prefixes=()):
+        """
+        Register a provider that is only constructed when one of its models is used.
 
-    def get_provider(self, model):
+        Args:
+            name: Provider name, the class name for the built-in providers
+            factory: Zero-argument callable returning the provider
+            supported_models: Models that trigger construction
+            model_prefixes: Model name prefixes that trigger construction
+        """
+        self._factories[name] = (
+            factory,
+            frozenset(supported_models),
+            tuple(model_prefixes),
+        )
+
+    def _instantiate(self, name):
+        # Double-checked so concurrent first calls construct the provider once
+        with self._factory_lock:
+            entry = self._factories.pop(name, None)
+            if entry is None:
+                return self.providers.get(name)
+            try:
+                provider = entry[0]()
+            except Exception as e:
+                print(f"Error adding {name}: {e}")
+                return None
+            self.add_provider(provider)
+            return provider
+
+    def _provider_from_factory(self, model):
+        with self._factory_lock:
+            # A concurrent first call may have just built it
+            provider = self._model_index.get(model) or self._prefix_match(model)
+            if provider is not None:
+                return provider
+            for name, (_, models, prefixes) in list(self._factories.items()):
+                if model in models or (prefixes and model.startswith(prefixes)):
+                    return self._instantiate(name)
+        return None
+
+    def _routable_models(self):
+        models = set(self._model_index)
+        for _, factory_models, _ in self._factories.values():
+            models.update(factory_models)
+        return models
+
+    def set_fallback_provider(self, provider):
+        """Route models that no registered provider supports to ``provider``."""
+        self.fallback_provider = provider
+
+    def close(self):
+        """Close the HTTP connection pools of every registered provider."""
+        for provider in self.providers.values():
+            provider.close()
+        self._http_client.close()
+        self._close_ahttp_client()
+
+    async def aclose(self):
+        """close() for async users, run on the loop that made the async calls."""
         for provider in self.providers.values():
-            if model in provider.supported_models:
+            await provider.aclose()
+        self._http_client.close()
+        await self._ahttp_client.aclose()
+
+    def _close_ahttp_client(self):
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        loop = self._ahttp_loop
+        if loop is None or loop.is_closed():
+            loop = current
+        if loop is None:
+            try:
+                asyncio.run(self._ahttp_client.aclose())
+            except RuntimeError:
+                # Connections of a loop that is already closed can't be shut
+                # down cleanly any more; their sockets go with the client
+                pass
+        elif loop is current:
+            # Keep a reference so the task isn't collected before it runs
+            self._ahttp_closing = loop.create_task(self._ahttp_client.aclose())
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._ahttp_client.aclose(), loop).result()
+        else:
+            loop.run_until_complete(self._ahttp_client.aclose())
+
+    def get_provider(self, model):
+        provider = self._model_index.get(model)
+        if provider is not None:
+            return provider
+
+        # Dynamic model names, e.g. Azure deployments or Bedrock profile ARNs
+        provider = self._prefix_match(model)
+        if provider is not None:
+            return provider
+
+        # Providers registered with register_factory are built on first use
+        provider = self._provider_from_factory(model)
+        if provider is not None:
+            return provider
+
+        # Unknown model: fetch live model lists once, from matching providers only
+        if self._refresh_models_for(model):
+            provider = self._model_index.get(model)
+            if provider is not None:
                 return provider
 
-            # Special handling for dynamic model providers
-            if hasattr(provider, "__class__"):
-                # Handle Azure OpenAI with dynamic deployments
-                if (
-                    provider.__class__.__name__ == "AzureOpenAIProvider"
-                    and model.startswith("azure/")
-                ):
-                    return provider
-                # Handle BedrockProvider with ARN-based inference profiles
-                elif (
-                    provider.__class__.__name__ == "BedrockProvider"
-                    and model.startswith("bedrock/arn:aws:bedrock:")
-                ):
-                    return provider
+        if self.fallback_provider is not None:
+            return self.fallback_provider
 
         raise ValueError(f"No provider found for model: {model}")
 
-    def call_ai(self, messages, temperature, max_tokens, model, **kwargs):
+    def _refresh_models_for(self, model):
+        prefix = model.split("/", 1)[0] + "/"
+        # Unbuilt providers serving the same namespace may list the model live
+        for name, (_, models, _) in list(self._factories.items()):
+            if any(m.startswith(prefix) for m in models):
+                self._instantiate(name)
+        refreshed = False
+        for name, provider in self.providers.items():
+            if name in self._refreshed_providers:
+                continue
+            if any(m.startswith(prefix) for m in provider.supported_models):
+                self._refreshed_providers.add(name)
+                provider.refresh_models()
+                refreshed = True
+        if refreshed:
+            self._rebuild_model_index()
+        return refreshed
+
+    def _route(self, messages, max_tokens, kwargs):
+        """Resolve model="auto" to the cheapest registered model that fits."""
+        return self.router.route(
+            messages,
+            kwargs.pop("budget_quality", "fast"),
+            available_models=self._routable_models(),
+            max_tokens=max_tokens,
+            structured="response_format" in kwargs or "json_schema" in kwargs,
+        )
+
+    def prepare_request(self, messages, temperature, max_tokens, model, **kwargs):
+        """Resolve the provider and build its request once, for reuse by retries."""
+        if model == "auto":
+            model = self._route(messages, max_tokens, kwargs)
         provider = self.get_provider(model)
-        if provider:
-            """
-            text_messages = [
-                {
-                    "role": msg["role"],
-                    "content": msg["content"]
-                    if isinstance(msg["content"], str)
-                    else "",
-                }
-                for msg in messages
-            ]
-            """
-            # Calculate prompt cost estimate
-            try:
-                # prompt_cost = float(calculate_prompt_cost(text_messages, model))
-                prompt_cost = 0.0
-            except Exception:
-                prompt_cost = 0.0
+        check_context_window(messages, model, max_tokens)
+        return self._prepare_for(
+            provider, messages, temperature, max_tokens, model, kwargs
+        )
 
-            response = provider.call_ai(
-                messages, temperature, max_tokens, model, **kwargs
-            )
+    def _prepare_for(self, provider, messages, temperature, max_tokens, model, kwargs):
+        cache_breakpoints = kwargs.pop("cache_breakpoints", True)
+        prepared = provider.prepare_request(
+            _apply_prompt_caching(provider, messages, cache_breakpoints),
+            temperature,
+            max_tokens,
+            model,
+            **kwargs,
+        )
+        prepared.source_messages = messages
+        return prepared
 
-            # Calculate completion cost estimate
-            try:
-                # completion_cost = float(calculate_completion_cost(response, model))
-                completion_cost = 0.0
-            except Exception:
-                completion_cost = 0.0
+    def _guarded(self, prepared):
+        """The request to send and its breaker, re-prepared for the fallback while open."""
+        breaker = self._breakers.get(prepared.provider.__class__.__name__)
+        if (
+            breaker is None
+            or breaker.allow_request()
+            # Nothing to route to, keep trying the provider
+            or self.fallback_provider is None
+        ):
+            return prepared, breaker
+        fallback = self._prepare_for(
+            self.fallback_provider,
+            prepared.source_messages,
+            prepared.temperature,
+            prepared.max_tokens,
+            prepared.model,
+            dict(prepared.kwargs),
+        )
+        return fallback, None
+
+    def _rate_limit(self, prepared):
+        """The provider's limiter and the tokens the request will use."""
+        limiter = self._limiters.get(prepared.provider.__class__.__name__)
+        if limiter is None or limiter.tokens is None:
+            return limiter, 0
+        messages = prepared.source_messages or prepared.messages
+        return limiter, count_tokens(messages, prepared.model) + prepared.max_tokens
+
+    @staticmethod
+    def _record_failure(breaker, exception):
+        """Count outages (5xx, 429, connection errors) against the breaker."""
+        if breaker is None:
+            return
+        if isinstance(exception, Exception) and _is_transient_error(exception):
+            breaker.record_failure()
+        else:
+            # Client errors and cancellations say nothing about the provider,
+            # but must not leave a half-open probe slot taken
+            breaker.release_probe()
 
-            total_cost = prompt_cost + completion_cost
+    def send(self, prepared):
+        """Send a PreparedRequest, returning (response, cost)."""
+        prepared, breaker = self._guarded(prepared)
+        try:
+            limiter, tokens = self._rate_limit(prepared)
+            if limiter is not None:
+                limiter.acquire(tokens)
+            response = prepared.provider.call_prepared(prepared)
+        except BaseException as e:
+            self._record_failure(breaker, e)
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return response, 0.0
+
+    async def send_async(self, prepared):
+        self._ahttp_loop = asyncio.get_running_loop()
+        prepared, breaker = self._guarded(prepared)
+        try:
+            limiter, tokens = self._rate_limit(prepared)
+            if limiter is not None:
+                await limiter.acquire_async(tokens)
+            response = await prepared.provider.call_prepared_async(prepared)
+        except BaseException as e:
+            self._record_failure(breaker, e)
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return response, 0.0
 
-            return response, total_cost
-        else:
-            raise ValueError(f"No provider found for model: {model}")
+    def call_ai(self, messages, temperature, max_tokens, model, **kwargs):
+        return self.send(
+            self.prepare_request(messages, temperature, max_tokens, model, **kwargs)
+        )
 
     # TODO shouldn't be 0 when no model...
     async def call_ai_async(self, messages, temperature, max_tokens, model, **kwargs):
-        provider = self.get_provider(model)
-        if provider:
-            """
-            text_messages = [
-                {
-                    "role": msg["role"],
-                    "content": msg["content"]
-                    if isinstance(msg["content"], str)
-                    else "",
-                }
-                for msg in messages
-            ]
-            """
-            # Calculate cost estimate
-            try:
-                # prompt_cost = float(calculate_prompt_cost(text_messages, model))
-                prompt_cost = 0.0
-            except Exception:
-                prompt_cost = 0.0
+        return await self.send_async(
+            self.prepare_request(messages, temperature, max_tokens, model, **kwargs)
+        )
 
-            response = await provider.call_ai_async(
-                messages, temperature, max_tokens, model, **kwargs
+    async def call_ai_stream_async(
+        self, messages, temperature, max_tokens, model, **kwargs
+    ):
+        self._ahttp_loop = asyncio.get_running_loop()
+        if model == "auto":
+            model = self._route(messages, max_tokens, kwargs)
+        provider = self.get_provider(model)
+        check_context_window(messages, model, max_tokens)
+        limiter = self._limiters.get(provider.__class__.__name__)
+        if limiter is not None:
+            await limiter.acquire_async(
+                count_tokens(messages, model) + max_tokens if limiter.tokens else 0
             )
-
-            try:
-                # completion_cost = float(calculate_completion_cost(response, model))
-                completion_cost = 0.0
-            except Exception:
-                completion_cost = 0.0
-
-            total_cost = prompt_cost + completion_cost
-
-            return response, total_cost
-        else:
-            raise ValueError(f"No provider found for model: {model}")
+        messages = _apply_prompt_caching(
+            provider, messages, kwargs.pop("cache_breakpoints", True)
+        )
+        async for delta in provider.call_ai_stream_async(
+            messages, temperature, max_tokens, model, **kwargs
+        ):
+            yield delta
 
     def generate(self, messages, temperature, max_tokens, model, **kwargs):
         provider = self.get_provider(model)
@@ -2647,6 +3467,7 @@ class AIManager:
             raise ValueError(f"No provider found for model: {model}")
 
     async def generate_async(self, messages, temperature, max_tokens, model, **kwargs):
+        self._ahttp_loop = asyncio.get_running_loop()
         provider = self.get_provider(model)
         if provider:
             try:
@@ -2666,98 +3487,161 @@ class AIManager:
             raise ValueError(f"No provider found for model: {model}")
 
 
-@retry(
-    retry=(
-        retry_if_exception_type(APITimeoutError)
-        | retry_if_exception_type(APIConnectionError)
-        | retry_if_exception_type(RateLimitError)
-        | retry_if_exception_type(APIStatusError)
-        | retry_if_exception_type(google_exceptions.DeadlineExceeded)
-        | retry_if_exception_type(google_exceptions.ServiceUnavailable)
-        | retry_if_exception_type(google_exceptions.ResourceExhausted)
-        | retry_if_exception_type(anthropic.InternalServerError)
-        | retry_if_exception_type(
-            anthropic.APIStatusError
-        )  # Catches HTTP 529 overloaded errors
-        | retry_if_exception_type(anthropic.APITimeoutError)
-        | retry_if_exception_type(anthropic.APIConnectionError)
-        | retry_if_exception_type(anthropic.RateLimitError)
-        | retry_if_exception_type(
-            ClientError
-        )  # AWS Bedrock errors including ThrottlingException
-        | retry_if_exception_type(BotoCoreError)
-    ),
+def _retry_after_seconds(exception):
+    """Seconds to wait according to the Retry-After header of a failed request."""
+    headers = getattr(getattr(exception, "response", None), "headers", None)
+    if not headers:
+        return None
+    # OpenAI also sends a millisecond-precision variant
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+_exponential_wait = wait_exponential(multiplier=2, min=2, max=120)
+
+# Seconds call_ai keeps retrying transient failures before giving up
+RETRY_BUDGET = 60.0
+
+
+def wait_retry_after(retry_state):
+    """
+    Honor the server's Retry-After, falling back to exponential backoff + jitter.
+
+    The wait never exceeds what is left of RETRY_BUDGET, so a single long
+    Retry-After can't outlast the whole retry policy.
+    """
+    exception = retry_state.outcome.exception()
+    wait = _retry_after_seconds(exception)
+    if wait is None:
+        wait = _exponential_wait(retry_state) + random.uniform(0, 1)
+    elapsed = getattr(retry_state, "seconds_since_start", None) or 0.0
+    return min(wait, max(0.0, RETRY_BUDGET - elapsed))
+
+
+# Transient API failures worth another attempt, checked with one isinstance call.
+# Subclasses are covered too: RateLimitError and Anthropic's 529 overloaded
+# errors are APIStatusErrors, timeouts are APIConnectionErrors.
+RETRYABLE_EXCEPTIONS = (
+    APIConnectionError,
+    APIStatusError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.ResourceExhausted,
+    anthropic.APIConnectionError,
+    anthropic.APIStatusError,
+    genai_errors.APIError,  # google-genai, used by GeminiProvider
+    httpx.HTTPStatusError,  # LMStudio
+    httpx.TransportError,
+    requests.exceptions.HTTPError,  # VertexAIProvider
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    ClientError,  # AWS Bedrock errors including ThrottlingException
+    BotoCoreError,
+)
+
+# Bedrock error codes for throttling and capacity, whatever their HTTP status
+_BEDROCK_TRANSIENT_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+}
+
+
+def _is_transient_error(exception):
+    """
+    True for failures another attempt may fix: connection errors, timeouts,
+    429 and 5xx responses. Other 4xx errors (bad request, bad key, unknown
+    model) fail the same way every time and are raised immediately.
+    """
+    if isinstance(exception, (APIStatusError, anthropic.APIStatusError)):
+        return exception.status_code == 429 or exception.status_code >= 500
+    if isinstance(exception, genai_errors.APIError):
+        return exception.code == 429 or exception.code >= 500
+    if isinstance(exception, (httpx.HTTPStatusError, requests.exceptions.HTTPError)):
+        response = exception.response
+        if response is None:
+            return False
+        return response.status_code == 429 or response.status_code >= 500
+    if BEDROCK_AVAILABLE and isinstance(exception, ClientError):
+        if exception.response.get("Error", {}).get("Code") in _BEDROCK_TRANSIENT_CODES:
+            return True
+        status = exception.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return status is None or status == 429 or status >= 500
+    return isinstance(exception, RETRYABLE_EXCEPTIONS)
+
+
+_retry_on_api_errors = retry_if_exception(_is_transient_error)
+
+# Shared decorators; tenacity copies the policy per call so concurrent calls
+# never share retry state
+_call_ai_retry = retry(
+    retry=_retry_on_api_errors,
+    wait=wait_retry_after,
+    stop=stop_after_delay(RETRY_BUDGET),
+    reraise=True,
+)
+_generate_retry = retry(
+    retry=_retry_on_api_errors,
     wait=wait_exponential(multiplier=2, min=2, max=120),
     stop=stop_after_attempt(3),
     reraise=True,
 )
+
+# Exact-match cache for deterministic (temperature == 0) text-only calls
+_response_cache = ResponseCache(maxsize=1024, ttl=3600.0)
+# Opt-in per call with semantic_cache=True, persisted when the env var is set
+_semantic_cache = SemanticCache(path=os.getenv("WRAIPPERZ_SEMANTIC_CACHE_PATH"))
+
+
+@_call_ai_retry
+def _send_with_retry(ai_manager, prepared):
+    return ai_manager.send(prepared)
+
+
+@_call_ai_retry
+async def _send_async_with_retry(ai_manager, prepared):
+    return await ai_manager.send_async(prepared)
+
+
+@cached_response(_response_cache, _semantic_cache)
 def call_ai_with_retry(ai_manager, messages, temperature, max_tokens, model, **kwargs):
-    response, cost = ai_manager.call_ai(
-        messages, temperature, max_tokens, model=model, **kwargs
+    # Prepare once (messages, images, SDK params); retries only resend it
+    prepared = ai_manager.prepare_request(
+        messages, temperature, max_tokens, model, **kwargs
     )
-    return response, cost
+    return _send_with_retry(ai_manager, prepared)
 
 
-@retry(
-    retry=(
-        retry_if_exception_type(APITimeoutError)
-        | retry_if_exception_type(APIConnectionError)
-        | retry_if_exception_type(RateLimitError)
-        | retry_if_exception_type(APIStatusError)
-        | retry_if_exception_type(google_exceptions.DeadlineExceeded)
-        | retry_if_exception_type(google_exceptions.ServiceUnavailable)
-        | retry_if_exception_type(google_exceptions.ResourceExhausted)
-        | retry_if_exception_type(anthropic.InternalServerError)
-        | retry_if_exception_type(
-            anthropic.APIStatusError
-        )  # Catches HTTP 529 overloaded errors
-        | retry_if_exception_type(anthropic.APITimeoutError)
-        | retry_if_exception_type(anthropic.APIConnectionError)
-        | retry_if_exception_type(anthropic.RateLimitError)
-        | retry_if_exception_type(
-            ClientError
-        )  # AWS Bedrock errors including ThrottlingException
-        | retry_if_exception_type(BotoCoreError)
-    ),
-    wait=wait_exponential(multiplier=2, min=2, max=120),
-    stop=stop_after_attempt(3),
-    reraise=True,
-)
+@cached_response(_response_cache, _semantic_cache)
 async def call_ai_async_with_retry(
     ai_manager, messages, temperature, max_tokens, model, **kwargs
 ):
-    response, cost = await ai_manager.call_ai_async(
-        messages, temperature, max_tokens, model=model, **kwargs
+    prepared = ai_manager.prepare_request(
+        messages, temperature, max_tokens, model, **kwargs
     )
-    return response, cost
+    return await _send_async_with_retry(ai_manager, prepared)
 
 
 # Add retry wrapper functions
-@retry(
-    retry=(
-        retry_if_exception_type(APITimeoutError)
-        | retry_if_exception_type(APIConnectionError)
-        | retry_if_exception_type(RateLimitError)
-        | retry_if_exception_type(APIStatusError)
-        | retry_if_exception_type(google_exceptions.DeadlineExceeded)
-        | retry_if_exception_type(google_exceptions.ServiceUnavailable)
-        | retry_if_exception_type(google_exceptions.ResourceExhausted)
-        | retry_if_exception_type(anthropic.InternalServerError)
-        | retry_if_exception_type(
-            anthropic.APIStatusError
-        )  # Catches HTTP 529 overloaded errors
-        | retry_if_exception_type(anthropic.APITimeoutError)
-        | retry_if_exception_type(anthropic.APIConnectionError)
-        | retry_if_exception_type(anthropic.RateLimitError)
-        | retry_if_exception_type(
-            ClientError
-        )  # AWS Bedrock errors including ThrottlingException
-        | retry_if_exception_type(BotoCoreError)
-    ),
-    wait=wait_exponential(multiplier=2, min=2, max=120),
-    stop=stop_after_attempt(3),
-    reraise=True,
-)
+@_generate_retry
 def generate_with_retry(ai_manager, messages, temperature, max_tokens, model, **kwargs):
     response, cost = ai_manager.generate(
         messages, temperature, max_tokens, model=model, **kwargs
@@ -2765,31 +3649,7 @@ def generate_with_retry(ai_manager, messages, temperature, max_tokens, model, **
     return response, cost
 
 
-@retry(
-    retry=(
-        retry_if_exception_type(APITimeoutError)
-        | retry_if_exception_type(APIConnectionError)
-        | retry_if_exception_type(RateLimitError)
-        | retry_if_exception_type(APIStatusError)
-        | retry_if_exception_type(google_exceptions.DeadlineExceeded)
-        | retry_if_exception_type(google_exceptions.ServiceUnavailable)
-        | retry_if_exception_type(google_exceptions.ResourceExhausted)
-        | retry_if_exception_type(anthropic.InternalServerError)
-        | retry_if_exception_type(
-            anthropic.APIStatusError
-        )  # Catches HTTP 529 overloaded errors
-        | retry_if_exception_type(anthropic.APITimeoutError)
-        | retry_if_exception_type(anthropic.APIConnectionError)
-        | retry_if_exception_type(anthropic.RateLimitError)
-        | retry_if_exception_type(
-            ClientError
-        )  # AWS Bedrock errors including ThrottlingException
-        | retry_if_exception_type(BotoCoreError)
-    ),
-    wait=wait_exponential(multiplier=2, min=2, max=120),
-    stop=stop_after_attempt(3),
-    reraise=True,
-)
+@_generate_retry
 async def generate_async_with_retry(
     ai_manager, messages, temperature, max_tokens, model, **kwargs
 ):
@@ -2809,27 +3669,32 @@ class AIManagerSingleton:
             with cls._lock:
                 if cls._instance is None:
                     instance = AIManager()
-                    # Initialize providers only when needed
+                    atexit.register(instance.close)
+                    shared_http = instance.shared_http_clients()
+                    # Providers are only constructed on first use of one of their models
                     if os.getenv("OPENAI_API_KEY"):
-                        try:
-                            instance.add_provider(OpenAIProvider())
-                        except Exception as e:
-                            print(f"Error adding OpenAI provider: {e}")
+                        instance.register_factory(
+                            "OpenAIProvider",
+                            lambda: OpenAIProvider(**shared_http),
+                            OpenAIProvider.supported_models,
+                        )
 
                     # Add Azure OpenAI provider
                     if os.getenv("AZURE_OPENAI_ENDPOINT") and os.getenv(
                         "AZURE_OPENAI_API_KEY"
                     ):
-                        try:
-                            instance.add_provider(AzureOpenAIProvider())
-                        except Exception as e:
-                            print(f"Error adding Azure OpenAI provider: {e}")
+                        instance.register_factory(
+                            "AzureOpenAIProvider",
+                            AzureOpenAIProvider,
+                            model_prefixes=AzureOpenAIProvider.model_prefixes,
+                        )
 
                     if os.getenv("ANTHROPIC_API_KEY"):
-                        try:
-                            instance.add_provider(AnthropicProvider())
-                        except Exception as e:
-                            print(f"Error adding Anthropic provider: {e}")
+                        instance.register_factory(
+                            "AnthropicProvider",
+                            lambda: AnthropicProvider(**shared_http),
+                            AnthropicProvider.supported_models,
+                        )
 
                     # Add Vertex AI provider if required environment variables are set
                     if (
@@ -2837,21 +3702,24 @@ class AIManagerSingleton:
                         and os.getenv("VERTEX_PROJECT_ID")
                         and os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
                     ):
-                        try:
-                            instance.add_provider(VertexAIProvider())
-                        except Exception as e:
-                            print(f"Error adding Vertex AI provider: {e}")
+                        instance.register_factory(
+                            "VertexAIProvider",
+                            VertexAIProvider,
+                            VertexAIProvider.supported_models,
+                        )
 
                     if os.getenv("GOOGLE_API_KEY"):
-                        try:
-                            instance.add_provider(GeminiProvider())
-                        except Exception as e:
-                            print(f"Error adding Gemini provider: {e}")
+                        instance.register_factory(
+                            "GeminiProvider",
+                            lambda: GeminiProvider(**shared_http),
+                            GeminiProvider.supported_models,
+                        )
                     if os.getenv("DEEPSEEK_API_KEY"):
-                        try:
-                            instance.add_provider(DeepSeekProvider())
-                        except Exception as e:
-                            print(f"Error adding DeepSeek provider: {e}")
+                        instance.register_factory(
+                            "DeepSeekProvider",
+                            lambda: DeepSeekProvider(**shared_http),
+                            DeepSeekProvider.supported_models,
+                        )
 
                     # Add Bedrock provider if boto3 is available and AWS credentials are set
                     if BEDROCK_AVAILABLE and (
@@ -2862,28 +3730,25 @@ class AIManagerSingleton:
                         or os.getenv("AWS_PROFILE")
                         or os.getenv("AWS_DEFAULT_REGION")
                     ):
-                        try:
-                            bedrock_region = os.getenv(
-                                "AWS_DEFAULT_REGION", "us-east-1"
-                            )
-                            instance.add_provider(
-                                BedrockProvider(region_name=bedrock_region)
-                            )
-                        except Exception as e:
-                            print(f"Error adding Bedrock provider: {e}")
+                        instance.register_factory(
+                            "BedrockProvider",
+                            lambda: BedrockProvider(
+                                region_name=os.getenv("AWS_DEFAULT_REGION", "us-east-1")
+                            ),
+                            BedrockProvider.supported_models,
+                            BedrockProvider.model_prefixes,
+                        )
 
                     if os.getenv("LMSTUDIO_IP") and os.getenv("LMSTUDIO_PORT"):
-                        try:
-                            instance.add_provider(
-                                LMStudioProvider(
-                                    ip_address=os.getenv(
-                                        "LMSTUDIO_IP", "192.168.11.34"
-                                    ),
-                                    port=int(os.getenv("LMSTUDIO_PORT", "1234")),
-                                )
-                            )
-                        except Exception as e:
-                            print(f"Error adding LMStudio provider: {e}")
+                        instance.register_factory(
+                            "LMStudioProvider",
+                            lambda: LMStudioProvider(
+                                ip_address=os.getenv("LMSTUDIO_IP", "192.168.11.34"),
+                                port=int(os.getenv("LMSTUDIO_PORT", "1234")),
+                                **shared_http,
+                            ),
+                            LMStudioProvider.supported_models,
+                        )
 
                     cls._instance = instance
 
@@ -2916,6 +3781,250 @@ def call_ai_async(
     )
 
 
+async def call_ai_stream_async(
+    model: str,
+    messages: List[Message],
+    temperature: float = 0.1,
+    max_tokens: int = 4096,
+    **kwargs: Dict[str, Any],
+) -> AsyncIterator[str]:
+    """
+    Stream the response as text deltas as soon as the provider produces them.
+
+    Only opening the stream (up to the first delta) is retried; a failure
+    mid-stream is raised to the caller, who has already seen partial output.
+    """
+    ai_manager = AIManagerSingleton.get_instance()
+    async for attempt in AsyncRetrying(
+        retry=_retry_on_api_errors,
+        wait=wait_retry_after,
+        stop=stop_after_delay(RETRY_BUDGET),
+        reraise=True,
+    ):
+        with attempt:
+            stream = ai_manager.call_ai_stream_async(
+                messages, temperature, max_tokens, model, **kwargs
+            )
+            try:
+                first_delta = await stream.__anext__()
+            except StopAsyncIteration:
+                return
+            except BaseException:
+                # Release the failed attempt's response before the next one
+                await stream.aclose()
+                raise
+    try:
+        yield first_delta
+        async for delta in stream:
+            yield delta
+    finally:
+        await stream.aclose()
+
+
+def call_ai_batch_async(
+    messages_list: List[List[Message]],
+    model: str,
+    temperature: float = 0.1,
+    max_tokens: int = 4096,
+    max_concurrency: int = 16,
+    as_completed: bool = False,
+    **kwargs: Dict[str, Any],
+):
+    """
+    Fan out many call_ai_async requests with bounded concurrency.
+
+    Args:
+        messages_list: One message list per request
+        max_concurrency: Maximum number of requests in flight at once
+        as_completed: Yield results as soon as they finish instead of in order
+
+    Returns:
+        With ``as_completed=False``, a coroutine resolving to a list of
+        ``(response, cost)`` tuples in input order. With ``as_completed=True``,
+        an async iterator of ``(index, (response, cost))``. Failed requests
+        produce their exception in place of the tuple.
+    """
+    ai_manager = AIManagerSingleton.get_instance()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _one(index, messages):
+        async with semaphore:
+            try:
+                result = await call_ai_async_with_retry(
+                    ai_manager, messages, temperature, max_tokens, model, **kwargs
+                )
+            except Exception as e:
+                result = e
+            return index, result
+
+    async def _gather():
+        results = await asyncio.gather(
+            *(_one(i, messages) for i, messages in enumerate(messages_list))
+        )
+        return [result for _, result in results]
+
+    async def _iter_as_completed():
+        tasks = [
+            asyncio.ensure_future(_one(i, messages))
+            for i, messages in enumerate(messages_list)
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    if as_completed:
+        return _iter_as_completed()
+    return _gather()
+
+
+# Fenced ```json blocks some models wrap their JSON answers in
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+def _multiplex_messages(items, instructions, schema):
+    """One request answering every item, with the fixed instructions as system prompt."""
+    system = (
+        f"{instructions}\n\n"
+        "Answer every input independently. Respond with only a JSON object "
+        '{"results": [...]} whose results array has one entry per input, in '
+        "input order, each matching this JSON schema:\n"
+        f"{json.dumps(schema)}"
+    )
+    inputs = "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1))
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": f"Inputs ({len(items)}):\n{inputs}"},
+    ]
+
+
+def _parse_multiplexed(response, count):
+    """The ``count`` results of a multiplexed answer, or None if malformed."""
+    if not isinstance(response, str):
+        return None
+    fenced = _JSON_FENCE.search(response)
+    try:
+        data = json.loads(fenced.group(1) if fenced else response)
+    except ValueError:
+        return None
+    if isinstance(data, dict):
+        data = data.get("results")
+    if not isinstance(data, list) or len(data) != count:
+        return None
+    return data
+
+
+def _multiplex_groups(items, model, max_items, max_prompt_tokens):
+    """Split items into groups within the item and prompt token limits."""
+    groups, group, group_tokens = [], [], 0
+    for item in items:
+        tokens = count_tokens([{"role": "user", "content": item}], model)
+        if group and (
+            len(group) >= max_items or group_tokens + tokens > max_prompt_tokens
+        ):
+            groups.append(group)
+            group, group_tokens = [], 0
+        group.append(item)
+        group_tokens += tokens
+    if group:
+        groups.append(group)
+    return groups
+
+
+async def call_ai_multiplex_async(
+    items: List[str],
+    instructions: str,
+    schema: Dict[str, Any],
+    model: str,
+    temperature: float = 0.1,
+    max_tokens: int = 4096,
+    max_items: int = 32,
+    max_prompt_tokens: int = 8000,
+    max_concurrency: int = 16,
+    **kwargs: Dict[str, Any],
+) -> Tuple[List[Any], float]:
+    """
+    Answer many small classify/extract inputs with a few combined requests.
+
+    The inputs are packed into groups of at most ``max_items`` inputs and
+    ``max_prompt_tokens`` prompt tokens, and each group is sent as one
+    request whose answer is a JSON array, so the instructions are only paid
+    for once per group. Groups whose answer can't be parsed are retried one
+    input per request.
+
+    Args:
+        items: The inputs, e.g. support tickets to classify
+        instructions: Task description shared by every input
+        schema: JSON schema of the answer to a single input
+        max_items: Maximum inputs per request
+        max_prompt_tokens: Budget for the inputs of one request
+        max_concurrency: Maximum number of requests in flight at once
+
+    Returns:
+        Tuple of (parsed answers in input order, total cost)
+
+    Raises:
+        ValueError: If a single input still gets an unparseable answer
+    """
+    if model.startswith("openai/") and "response_format" not in kwargs:
+        # Strict structured outputs need an object at the root
+        kwargs["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "multiplexed_results",
+                "schema": {
+                    "type": "object",
+                    "properties": {"results": {"type": "array", "items": schema}},
+                    "required": ["results"],
+                    "additionalProperties": False,
+                },
+            },
+        }
+
+    async def _send(groups):
+        replies = await call_ai_batch_async(
+            [_multiplex_messages(group, instructions, schema) for group in groups],
+            model,
+            temperature,
+            max_tokens,
+            max_concurrency=max_concurrency,
+            **kwargs,
+        )
+        for reply in replies:
+            if isinstance(reply, Exception):
+                raise reply
+        return replies
+
+    groups = _multiplex_groups(items, model, max_items, max_prompt_tokens)
+    results, total_cost, retry = [], 0.0, []
+    for group, (response, cost) in zip(groups, await _send(groups)):
+        total_cost += cost
+        parsed = _parse_multiplexed(response, len(group))
+        if parsed is None:
+            # Mark the group's slots for individual calls
+            retry.extend(range(len(results), len(results) + len(group)))
+            parsed = [None] * len(group)
+        results.extend(parsed)
+
+    if retry:
+        replies = await _send([[items[index]] for index in retry])
+        for index, (response, cost) in zip(retry, replies):
+            total_cost += cost
+            parsed = _parse_multiplexed(response, 1)
+            if parsed is None:
+                raise ValueError(
+                    f"Could not parse the answer to input {index}: {response!r}"
+                )
+            results[index] = parsed[0]
+    return results, total_cost
+
+
+call_ai.cache_clear = _response_cache.clear
+call_ai_async.cache_clear = _response_cache.clear
+
+
 def generate(
     model: str,
     messages: List[Message],
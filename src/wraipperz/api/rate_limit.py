@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by sync and async callers.
+
+    acquire(n) reserves ``n`` tokens immediately and then sleeps until the
+    bucket has refilled enough to cover them, so waiters are served in
+    arrival order and a burst never overshoots the configured rate.
+    """
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, n: float) -> float:
+        """Take ``n`` tokens, returning how long the caller must wait for them."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self._updated) * self.refill_per_sec,
+            )
+            self._updated = now
+            self.tokens -= n
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.refill_per_sec
+
+    def _refund(self, n: float) -> None:
+        """Give back ``n`` reserved tokens that will not be used."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + n)
+
+    def acquire(self, n: float = 1) -> None:
+        wait = self._reserve(n)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, n: float = 1) -> None:
+        wait = self._reserve(n)
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # The cancelled request will never be sent
+                self._refund(n)
+                raise
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one provider."""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm, rpm / 60) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm / 60) if tpm else None
+
+    @classmethod
+    def from_env(cls, name: str) -> Optional["RateLimiter"]:
+        """
+        Limiter configured by ``{NAME}_RPM`` / ``{NAME}_TPM``, or None if unset.
+
+        ``name`` is the provider name without "Provider", e.g. OPENAI_RPM=500
+        and OPENAI_TPM=90000 for OpenAIProvider.
+        """
+        prefix = name.removesuffix("Provider").upper()
+        rpm = os.getenv(f"{prefix}_RPM")
+        tpm = os.getenv(f"{prefix}_TPM")
+        if not rpm and not tpm:
+            return None
+        return cls(float(rpm) if rpm else None, float(tpm) if tpm else None)
+
+    def acquire(self, tokens: int = 0) -> None:
+        if self.requests is not None:
+            self.requests.acquire()
+        if self.tokens is not None and tokens:
+            self.tokens.acquire(tokens)
+
+    async def acquire_async(self, tokens: int = 0) -> None:
+        if self.requests is not None:
+            await self.requests.acquire_async()
+        if self.tokens is not None and tokens:
+            try:
+                await self.tokens.acquire_async(tokens)
+            except asyncio.CancelledError:
+                if self.requests is not None:
+                    self.requests._refund(1)
+                raise
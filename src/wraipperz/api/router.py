@@ -0,0 +1,134 @@
+from typing import Any, Dict, Iterable, List, Literal, Optional
+
+from .tokens import count_tokens
+
+Quality = Literal["fast", "balanced", "best"]
+
+TIERS = ("fast", "balanced", "best")
+
+# (input, output) USD per 1M tokens, grouped by the quality tier they serve
+MODEL_PRICES = {
+    "fast": {
+        "gemini/gemini-2.0-flash-lite": (0.075, 0.30),
+        "gemini/gemini-2.0-flash": (0.10, 0.40),
+        "openai/gpt-4o-mini": (0.15, 0.60),
+        "deepseek-chat": (0.27, 1.10),
+        "anthropic/claude-3-5-haiku-20241022": (0.80, 4.00),
+    },
+    "balanced": {
+        "gemini/gemini-1.5-pro": (1.25, 5.00),
+        "openai/gpt-4.1": (2.00, 8.00),
+        "openai/gpt-4o": (2.50, 10.00),
+        "anthropic/claude-sonnet-4-20250514": (3.00, 15.00),
+    },
+    "best": {
+        "openai/gpt-5.1": (1.25, 10.00),
+        "anthropic/claude-opus-4-5-20251101": (5.00, 25.00),
+    },
+}
+
+# Providers whose APIs enforce a JSON schema natively
+STRUCTURED_OUTPUT_PREFIXES = ("openai/", "gemini/")
+
+# Providers that accept image or video content
+MEDIA_PREFIXES = ("openai/", "gemini/", "anthropic/")
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(
+                item.get("text", "")
+                for item in content
+                if isinstance(item, dict) and item.get("type") == "text"
+            )
+    return "\n".join(parts)
+
+
+def _has_media(messages: List[Dict[str, Any]]) -> bool:
+    return any(
+        isinstance(message.get("content"), list)
+        and any(
+            isinstance(item, dict) and item.get("type") != "text"
+            for item in message["content"]
+        )
+        for message in messages
+    )
+
+
+class ModelRouter:
+    """
+    Pick the cheapest available model whose quality tier fits the prompt.
+
+    Short prompts without code go to the "fast" tier; code blocks or
+    prompts over ``short_prompt_tokens`` need at least "balanced".
+    ``budget_quality`` sets the minimum tier the caller will accept.
+    """
+
+    def __init__(
+        self,
+        prices: Optional[Dict[str, Dict[str, tuple]]] = None,
+        short_prompt_tokens: int = 500,
+    ) -> None:
+        self.prices = prices or MODEL_PRICES
+        self.short_prompt_tokens = short_prompt_tokens
+
+    def required_tier(
+        self,
+        messages: List[Dict[str, Any]],
+        budget_quality: Quality = "fast",
+        prompt_tokens: Optional[int] = None,
+    ) -> Quality:
+        if prompt_tokens is None:
+            prompt_tokens = count_tokens(messages, "openai/gpt-4o")
+        tier = budget_quality
+        if "```" in _prompt_text(messages) or prompt_tokens >= self.short_prompt_tokens:
+            tier = max(tier, "balanced", key=TIERS.index)
+        return tier
+
+    def route(
+        self,
+        messages: List[Dict[str, Any]],
+        budget_quality: Quality = "fast",
+        available_models: Optional[Iterable[str]] = None,
+        max_tokens: int = 1024,
+        structured: bool = False,
+    ) -> str:
+        """
+        Choose a model for ``messages``.
+
+        Args:
+            budget_quality: Minimum quality tier ("fast", "balanced", "best")
+            available_models: Models with a registered provider; all if None
+            max_tokens: Expected completion length, used for the cost estimate
+            structured: Only consider models with native structured outputs
+
+        Returns:
+            The model name to call
+        """
+        if budget_quality not in TIERS:
+            raise ValueError(
+                f"budget_quality must be one of {TIERS}, got {budget_quality!r}"
+            )
+        available = set(available_models) if available_models is not None else None
+        prompt_tokens = count_tokens(messages, "openai/gpt-4o")
+        needs_media = _has_media(messages)
+
+        required = self.required_tier(messages, budget_quality, prompt_tokens)
+        # Escalate to a better tier when nothing suitable is registered
+        for tier in TIERS[TIERS.index(required) :]:
+            candidates = [
+                (input_price * prompt_tokens + output_price * max_tokens, model)
+                for model, (input_price, output_price) in self.prices[tier].items()
+                if (available is None or model in available)
+                and (not structured or model.startswith(STRUCTURED_OUTPUT_PREFIXES))
+                and (not needs_media or model.startswith(MEDIA_PREFIXES))
+            ]
+            if candidates:
+                return min(candidates)[1]
+
+        raise ValueError("No registered provider can serve model='auto'")
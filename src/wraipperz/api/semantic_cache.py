@@ -0,0 +1,238 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Local embedding model for the default embedder
+try:
+    from sentence_transformers import SentenceTransformer
+
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SentenceTransformer = None
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+DEFAULT_EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+
+
+def _split_query(
+    messages: List[Dict[str, Any]],
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """Split messages into (context, text of the final user message)."""
+    if not messages or messages[-1].get("role") != "user":
+        return None, None
+    content = messages[-1].get("content")
+    if isinstance(content, list):
+        content = "\n".join(
+            item.get("text", "")
+            for item in content
+            if isinstance(item, dict) and item.get("type") == "text"
+        )
+    if not isinstance(content, str) or not content:
+        return None, None
+    return messages[:-1], content
+
+
+class _Partition:
+    """Unit embeddings of one context, in a buffer grown geometrically."""
+
+    def __init__(self, dim: int) -> None:
+        self._buffer = np.empty((16, dim), dtype=np.float32)
+        self._responses: List[Optional[str]] = []
+        self._start = 0
+        self._stop = 0
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def append(self, embedding: "np.ndarray", response: str) -> None:
+        if self._stop == len(self._buffer):
+            live = len(self)
+            # Compact in place while at most half full, otherwise double
+            buffer = self._buffer
+            if live * 2 > len(buffer):
+                buffer = np.empty((len(buffer) * 2, buffer.shape[1]), np.float32)
+            buffer[:live] = self._buffer[self._start : self._stop]
+            self._buffer = buffer
+            self._responses = self._responses[self._start :]
+            self._start, self._stop = 0, live
+        self._buffer[self._stop] = embedding
+        self._responses.append(response)
+        self._stop += 1
+
+    def popleft(self) -> None:
+        self._responses[self._start] = None
+        self._start += 1
+
+    def best(self, embedding: "np.ndarray") -> Tuple[float, str]:
+        """The highest cosine similarity and its response."""
+        scores = self._buffer[self._start : self._stop] @ embedding
+        best = int(np.argmax(scores))
+        return float(scores[best]), self._responses[self._start + best]
+
+
+class SemanticCache:
+    """
+    Embedding-based response cache that catches paraphrased prompts.
+
+    Only the final user message is compared by cosine similarity; the model,
+    max_tokens, extra kwargs and every earlier message must match exactly.
+    Entries can be persisted to a SQLite file so other processes reuse them.
+
+    Args:
+        embed_fn: Maps a string to a 1-D vector. Defaults to a local
+            sentence-transformers model.
+        threshold: Minimum cosine similarity for a hit
+        maxsize: Maximum entries kept in total, oldest dropped first
+        path: Optional SQLite file to load from and persist to
+    """
+
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[str], Any]] = None,
+        threshold: float = 0.95,
+        maxsize: int = 10000,
+        path: Optional[str] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._embed_fn = embed_fn
+        self._entries: Dict[bytes, _Partition] = {}
+        # Partition of every entry, oldest first, for eviction across contexts
+        self._order: Deque[bytes] = deque()
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            if not NUMPY_AVAILABLE:
+                raise ImportError("The semantic cache needs numpy. Install it.")
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(partition BLOB, embedding BLOB, response TEXT)"
+            )
+            rows = self._db.execute(
+                "SELECT rowid, partition, embedding, response FROM "
+                "(SELECT rowid, * FROM entries ORDER BY rowid DESC LIMIT ?) ORDER BY rowid",
+                (maxsize,),
+            ).fetchall()
+            for _, partition, embedding, response in rows:
+                self._append(
+                    partition, np.frombuffer(embedding, dtype=np.float32), response
+                )
+            if rows:
+                # Drop whatever fell past maxsize since the file was written
+                self._db.execute("DELETE FROM entries WHERE rowid < ?", (rows[0][0],))
+                self._db.commit()
+
+    def _embed(self, text: str) -> "np.ndarray":
+        if not NUMPY_AVAILABLE:
+            raise ImportError("The semantic cache needs numpy. Install it.")
+        if self._embed_fn is None:
+            if not SENTENCE_TRANSFORMERS_AVAILABLE:
+                raise ImportError(
+                    "The default semantic cache embedder needs sentence-transformers. "
+                    "Install it or pass embed_fn to SemanticCache."
+                )
+            model = SentenceTransformer(DEFAULT_EMBEDDING_MODEL)
+            self._embed_fn = model.encode
+        vector = np.asarray(self._embed_fn(text), dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _partition(model, context, max_tokens, kwargs) -> Optional[bytes]:
+        try:
+            payload = json.dumps([model, max_tokens, context, kwargs], sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+    def _append(self, partition: bytes, embedding: "np.ndarray", response: str) -> int:
+        """Add an entry, returning how many of the oldest were evicted."""
+        if partition not in self._entries:
+            self._entries[partition] = _Partition(embedding.shape[0])
+        self._entries[partition].append(embedding, response)
+        self._order.append(partition)
+        evicted = 0
+        while len(self._order) > self.maxsize:
+            oldest = self._order.popleft()
+            self._entries[oldest].popleft()
+            if not len(self._entries[oldest]):
+                del self._entries[oldest]
+            evicted += 1
+        return evicted
+
+    def get(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        kwargs: Dict[str, Any],
+    ) -> Optional[str]:
+        """Return the cached response of the most similar prompt, if close enough."""
+        context, query = _split_query(messages)
+        if query is None:
+            return None
+        partition = self._partition(model, context, max_tokens, kwargs)
+        if partition is None or partition not in self._entries:
+            return None
+        embedding = self._embed(query)
+        with self._lock:
+            entries = self._entries.get(partition)
+            if entries is None:
+                return None
+            score, response = entries.best(embedding)
+            if score >= self.threshold:
+                return response
+        return None
+
+    def set(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        kwargs: Dict[str, Any],
+        response: str,
+    ) -> None:
+        context, query = _split_query(messages)
+        if query is None or not isinstance(response, str):
+            return
+        partition = self._partition(model, context, max_tokens, kwargs)
+        if partition is None:
+            return
+        embedding = self._embed(query)
+        with self._lock:
+            evicted = self._append(partition, embedding, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO entries VALUES (?, ?, ?)",
+                    (partition, embedding.tobytes(), response),
+                )
+                if evicted:
+                    self._db.execute(
+                        "DELETE FROM entries WHERE rowid IN "
+                        "(SELECT rowid FROM entries ORDER BY rowid LIMIT ?)",
+                        (evicted,),
+                    )
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._order.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._order)
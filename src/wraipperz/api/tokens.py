@@ -0,0 +1,95 @@
+import functools
+import os
+from typing import Any, Dict, List, Optional
+
+# tiktoken gives exact OpenAI token counts, fall back to ~4 chars per token
+try:
+    import tiktoken
+
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+# Context window per model prefix, longest prefix wins; unknown models are unchecked
+CONTEXT_WINDOWS = {
+    "openai/gpt-3.5-turbo": 16385,
+    "openai/gpt-4o": 128000,
+    "openai/gpt-4-turbo": 128000,
+    "openai/gpt-4.1": 1047576,
+    "openai/gpt-5": 400000,
+    "openai/o1": 200000,
+    "openai/o3": 200000,
+    "openai/o4": 200000,
+    "anthropic/claude": 200000,
+    "gemini/gemini-1.5": 1048576,
+    "gemini/gemini-2": 1048576,
+    "deepseek-": 128000,
+}
+
+
+@functools.lru_cache(maxsize=32)
+def _enc(model: str):
+    """tiktoken encoder for ``model``, loaded once per model name."""
+    try:
+        return tiktoken.encoding_for_model(model.rsplit("/", 1)[-1])
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def _message_texts(messages: List[Dict[str, Any]]) -> List[str]:
+    texts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            texts.extend(
+                item.get("text", "")
+                for item in content
+                if isinstance(item, dict) and item.get("type") == "text"
+            )
+    return texts
+
+
+def count_tokens(messages: List[Dict[str, Any]], model: str) -> int:
+    """
+    Count the text tokens of ``messages`` for ``model``.
+
+    Uses tiktoken when installed (non-OpenAI models are approximated with
+    cl100k_base), otherwise estimates ~4 characters per token. Image and
+    video parts are not counted.
+    """
+    texts = _message_texts(messages)
+    if not TIKTOKEN_AVAILABLE:
+        return sum(len(text) for text in texts) // 4
+    encoded = _enc(model).encode_batch(
+        texts, num_threads=os.cpu_count() or 1, disallowed_special=()
+    )
+    return sum(len(tokens) for tokens in encoded)
+
+
+def context_window(model: str) -> Optional[int]:
+    """Known context window of ``model`` in tokens, or None."""
+    matches = [prefix for prefix in CONTEXT_WINDOWS if model.startswith(prefix)]
+    return CONTEXT_WINDOWS[max(matches, key=len)] if matches else None
+
+
+def check_context_window(
+    messages: List[Dict[str, Any]], model: str, max_tokens: int
+) -> None:
+    """Raise ValueError when prompt + max_tokens can't fit in the model's window."""
+    window = context_window(model)
+    if window is None:
+        return
+    # A token is at least one UTF-8 byte (at most 4 per character), so short
+    # prompts can be cleared without tokenizing
+    characters = sum(len(text) for text in _message_texts(messages))
+    if 4 * characters + max_tokens <= window:
+        return
+    prompt_tokens = count_tokens(messages, model)
+    if prompt_tokens + max_tokens > window:
+        raise ValueError(
+            f"Prompt of ~{prompt_tokens} tokens plus max_tokens={max_tokens} "
+            f"exceeds the {window} token context window of {model}"
+        )
@@ -1,29 +1,40 @@
 import abc
 import asyncio
 import base64
+import binascii
+import functools
+import hashlib
+import inspect
 import json
 import mimetypes
 import os
+import re
 import shutil
 import struct
 import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Union
+from typing import BinaryIO, Optional, Union
 
+import httpx
 import numpy as np
 import requests
 import requests.exceptions
 import soundfile as sf
 import websockets
 import websockets.exceptions
-from cartesia import Cartesia
+from cartesia import AsyncCartesia, Cartesia
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types as genai_types
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from requests.adapters import HTTPAdapter
 from tenacity import (
     retry,
-    retry_if_exception_type,
+    retry_if_exception,
     stop_after_attempt,
     wait_exponential,
 )
@@ -31,6 +42,34 @@ from websockets.exceptions import WebSocketException
 
 from .asr import create_asr_manager
 
+# orjson parses the realtime API's frames several times faster than the stdlib
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _json_loads(data: Union[str, bytes]):
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_text(payload) -> str:
+    """Serialize ``payload`` for a websocket text frame."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload)
+
+
+def _json_bytes(payload) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
 
 class TTSError(Exception):
     """Base exception for TTS-related errors"""
@@ -44,7 +83,189 @@ class TTSRateLimitError(TTSError):
     pass
 
 
+async def _bounded_gather(calls, max_concurrency: int) -> list:
+    """Await each zero-argument coroutine function, at most max_concurrency at a time."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _one(call):
+        async with semaphore:
+            try:
+                return await call()
+            except Exception as e:
+                return e
+
+    return await asyncio.gather(*(_one(call) for call in calls))
+
+
+def _pooled_session() -> requests.Session:
+    """Session keeping TLS connections alive across calls and worker threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class _MultipartFile:
+    """
+    multipart/form-data body that streams one file from disk or a stream.
+
+    requests sends an iterable with a length as-is, with that length as
+    Content-Length, so the file is read in chunks instead of being buffered
+    whole by the default multipart encoder. A stream of unknown size is sent
+    chunked by iterating ``iter(body)`` instead.
+    """
+
+    chunk_size = 65536
+
+    def __init__(
+        self,
+        field: str,
+        source: Union[str, Path, BinaryIO],
+        fields: dict,
+        filename: Optional[str] = None,
+        size: Optional[int] = None,
+    ):
+        if isinstance(source, (str, Path)):
+            self.path, self._stream = Path(source), None
+            filename = filename or self.path.name
+            size = self.path.stat().st_size
+        else:
+            self.path, self._stream = None, source
+            filename = filename or "file"
+        self.boundary = binascii.hexlify(os.urandom(16)).decode()
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        parts = [
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"'
+            f"\r\n\r\n{value}\r\n"
+            for name, value in fields.items()
+        ]
+        mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        parts.append(
+            f"--{self.boundary}\r\nContent-Disposition: form-data; "
+            f'name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {mime_type}\r\n\r\n"
+        )
+        self._head = "".join(parts).encode("utf-8")
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self._length = (
+            None if size is None else len(self._head) + size + len(self._tail)
+        )
+
+    def __len__(self) -> int:
+        if self._length is None:
+            raise TypeError("The size of a streamed multipart body is unknown")
+        return self._length
+
+    def __iter__(self):
+        yield self._head
+        if self._stream is not None:
+            while chunk := self._stream.read(self.chunk_size):
+                yield chunk
+        else:
+            with open(self.path, "rb") as f:
+                while chunk := f.read(self.chunk_size):
+                    yield chunk
+        yield self._tail
+
+
+# ASR manager shared by every provider, created on the first alignment request
+_asr_manager = None
+_asr_manager_lock = threading.Lock()
+
+
+def _shared_asr_manager():
+    global _asr_manager
+    with _asr_manager_lock:
+        if _asr_manager is None:
+            _asr_manager = create_asr_manager()
+    return _asr_manager
+
+
 class TTSProvider(abc.ABC):
+    @property
+    def asr_manager(self):
+        """ASR manager used for return_alignment, shared unless one is assigned"""
+        return self.__dict__.get("_asr_manager") or _shared_asr_manager()
+
+    @asr_manager.setter
+    def asr_manager(self, manager):
+        self._asr_manager = manager
+
+    # Seconds a fetched voice list is reused before list_voices() refetches it
+    voices_ttl = 3600.0
+
+    def _voices_cache_path(self) -> Optional[Path]:
+        """
+        On-disk voice list for this provider and API key.
+
+        Lives in WRAIPPERZ_VOICE_CACHE_DIR (~/.cache/wraipperz by default);
+        setting it to an empty string keeps the cache in memory only.
+        """
+        directory = os.getenv(
+            "WRAIPPERZ_VOICE_CACHE_DIR", str(Path.home() / ".cache" / "wraipperz")
+        )
+        api_key = getattr(self, "api_key", None)
+        if not directory or not api_key:
+            return None
+        # Hashed so several accounts don't collide and the key isn't on disk
+        key = hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+        name = type(self).__name__.removesuffix("TTSProvider").lower()
+        return Path(directory) / f"voices_{name}_{key}.json"
+
+    def _load_voices(self, path: Optional[Path]) -> Optional[list[dict]]:
+        if path is None:
+            return None
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age >= self.voices_ttl:
+                return None
+            with open(path, "rb") as f:
+                voices = _json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+        self._available_voices = (time.monotonic() - age, tuple(voices))
+        return voices
+
+    def _store_voices(self, path: Optional[Path], voices: list[dict]) -> None:
+        if path is None:
+            return
+        partial = path.with_suffix(".part")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial.write_bytes(_json_bytes(voices))
+            os.replace(partial, path)
+        except (OSError, TypeError) as e:
+            print(f"Could not cache voices to {path}: {e}")
+            partial.unlink(missing_ok=True)
+
+    def _cached_voices(self, fetch) -> list[dict]:
+        """
+        Voices from ``fetch()``, reused for ``voices_ttl`` seconds once non-empty.
+
+        The list is kept in memory and on disk, so a new process reuses a
+        fresh list without calling the API.
+        """
+        cached = self.__dict__.get("_available_voices")
+        if cached is not None and time.monotonic() - cached[0] < self.voices_ttl:
+            return list(cached[1])
+        path = self._voices_cache_path()
+        voices = self._load_voices(path)
+        if voices is not None:
+            return voices
+        voices = fetch()
+        # Failed fetches return [], which is not cached so the next call retries
+        if voices:
+            self._available_voices = (time.monotonic(), tuple(voices))
+            self._store_voices(path, voices)
+        return voices
+
+    def invalidate_voices(self) -> None:
+        """Forget the cached voice list, e.g. after adding a voice"""
+        self._available_voices = None
+        if (path := self._voices_cache_path()) is not None:
+            path.unlink(missing_ok=True)
+
     @abc.abstractmethod
     def generate_speech(
         self, text: str, output_path: str, voice: str, **kwargs
@@ -56,9 +277,36 @@ class TTSProvider(abc.ABC):
         self, text: str, output_path: str, voice: str, **kwargs
     ) -> dict | None:
         """Asynchronous version of speech generation. By default, wraps the sync version"""
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            None, self.generate_speech, text, output_path, voice, **kwargs
+        return await asyncio.to_thread(
+            self.generate_speech, text, output_path, voice, **kwargs
+        )
+
+    async def generate_speech_batch_async(
+        self,
+        items: list[tuple[str, str]],
+        voice: str,
+        max_concurrency: int = 8,
+        **kwargs,
+    ) -> list:
+        """
+        Generate several clips concurrently.
+
+        Args:
+            items: (text, output_path) pairs
+            max_concurrency: Maximum number of requests in flight at once
+
+        Returns:
+            One result per item, in order; failed items produce their
+            exception in place of the result
+        """
+        return await _bounded_gather(
+            (
+                lambda text=text, path=path: self.generate_speech_async(
+                    text, path, voice, **kwargs
+                )
+                for text, path in items
+            ),
+            max_concurrency,
         )
 
     def convert_speech(
@@ -84,12 +332,80 @@ class TTSProvider(abc.ABC):
         raise NotImplementedError("Adding shared voices not supported by this provider")
 
 
+# Start of the hex-encoded audio string in a MiniMaxi T2A response body
+_HEX_AUDIO_FIELD = re.compile(rb'"audio"\s*:\s*"')
+
+
+@functools.lru_cache(maxsize=32)
+def _file_base64_cached(path_str: str, mtime_ns: int, size: int) -> str:
+    with open(path_str, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
+
+
+def _file_base64(path: Union[str, Path]) -> str:
+    """
+    Base64 contents of ``path``, cached per (path, mtime, size) so a voice
+    reference reused across a batch is read and encoded only once.
+    """
+    path_str = os.fspath(path)
+    stat = os.stat(path_str)
+    return _file_base64_cached(path_str, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=64)
+def _minimaxi_settings(
+    voice: str,
+    speed: float,
+    volume: float,
+    pitch: int,
+    emotion: Optional[str],
+    sample_rate: int,
+    bitrate: int,
+    audio_format: str,
+    channel: int,
+) -> bytes:
+    """Serialized voice and audio settings, the tail of a MiniMaxi request body"""
+    voice_setting = {"voice_id": voice, "speed": speed, "vol": volume, "pitch": pitch}
+    if emotion:
+        voice_setting["emotion"] = emotion
+    settings = _json_bytes(
+        {
+            "voice_setting": voice_setting,
+            "audio_setting": {
+                "sample_rate": sample_rate,
+                "bitrate": bitrate,
+                "format": audio_format,
+                "channel": channel,
+            },
+        }
+    )
+    # Drop the opening brace so the tail can follow the per-call fields
+    return settings[1:]
+
+
+def _split_hex_audio(body: bytes) -> tuple[dict, bytes]:
+    """
+    Parse a MiniMaxi T2A response and decode its hex audio.
+
+    The hex span is decoded straight from the response bytes, so the
+    megabytes of audio never become a Python str; only the rest of the JSON
+    is parsed, from bytes as well.
+    """
+    match = _HEX_AUDIO_FIELD.search(body)
+    if match is None:
+        return _json_loads(body), b""
+    start = match.end()
+    end = body.index(b'"', start)
+    audio_data = binascii.unhexlify(memoryview(body)[start:end])
+    return _json_loads(body[:start] + body[end:]), audio_data
+
+
 class MiniMaxiTTSProvider(TTSProvider):
     def __init__(self, api_key: str = None, group_id: str = None):
         self.api_key = api_key or os.getenv("T2A_API_KEY")
         self.group_id = group_id or os.getenv("MINIMAXI_GROUP_ID")
         self.base_url = "https://api.minimaxi.chat/v1/t2a_v2"
-        self.asr_manager = create_asr_manager()
+        self._session = _pooled_session()
         self.available_voices = {
             "Wise_Woman": {
                 "name": "Wise_Woman",
@@ -148,12 +464,14 @@ class MiniMaxiTTSProvider(TTSProvider):
             },
             # Add other voices similarly...
         }
+        # Static, so the list_voices() entries are built only once
+        self._voices_cache = tuple(
+            {"name": k, "voice_id": k, **v} for k, v in self.available_voices.items()
+        )
 
     def list_voices(self) -> list[dict]:
         """Return list of available voices with their details"""
-        return [
-            {"name": k, "voice_id": k, **v} for k, v in self.available_voices.items()
-        ]
+        return list(self._voices_cache)
 
     def generate_speech(
         self,
@@ -185,28 +503,32 @@ class MiniMaxiTTSProvider(TTSProvider):
         ]:
             raise ValueError("Invalid emotion specified")
 
-        # Base payload
-        payload = {
-            "model": "speech-01-turbo",
-            "text": text,
-            "stream": False,
-            "voice_setting": {
-                "voice_id": voice,
-                "speed": speed,
-                "vol": volume,
-                "pitch": int(pitch),  # MiniMaxi API expects pitch as integer
-            },
-            "audio_setting": {
-                "sample_rate": kwargs.get("sample_rate", 32000),
-                "bitrate": kwargs.get("bitrate", 128000),
-                "format": kwargs.get("format", "mp3"),
-                "channel": kwargs.get("channel", 1),
-            },
-        }
-
-        # Add emotion if specified
-        if emotion:
-            payload["voice_setting"]["emotion"] = emotion
+        # Only the text changes between calls with the same settings, so the
+        # settings are serialized once and appended to the per-call fields
+        settings = _minimaxi_settings(
+            voice,
+            speed,
+            volume,
+            int(pitch),  # MiniMaxi API expects pitch as integer
+            emotion,
+            kwargs.get("sample_rate", 32000),
+            kwargs.get("bitrate", 128000),
+            kwargs.get("format", "mp3"),
+            kwargs.get("channel", 1),
+        )
+        # "hex" inlines the audio in the JSON at twice its size; "url" returns
+        # a link to the binary file, which is streamed to output_path
+        output_format = kwargs.get("output_format", "hex")
+        if output_format not in ("hex", "url"):
+            raise ValueError("output_format must be 'hex' or 'url'")
+        body = (
+            b'{"model":"speech-01-turbo","text":'
+            + _json_bytes(text)
+            + b',"stream":false,"output_format":'
+            + _json_bytes(output_format)
+            + b","
+            + settings
+        )
 
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -215,20 +537,33 @@ class MiniMaxiTTSProvider(TTSProvider):
         url = f"{self.base_url}?GroupId={self.group_id}"
 
         try:
-            response = requests.post(url, headers=headers, json=payload, stream=True)
+            # The whole body is parsed from bytes, no streaming or text decode
+            response = self._session.post(url, headers=headers, data=body)
             response.raise_for_status()
 
-            parsed_json = response.json()
+            if output_format == "url":
+                parsed_json, audio_data = _json_loads(response.content), None
+            else:
+                parsed_json, audio_data = _split_hex_audio(response.content)
 
             if parsed_json["base_resp"]["status_code"] != 0:
                 raise TTSError(
                     f"MiniMaxi API error: {parsed_json['base_resp']['status_msg']}"
                 )
 
-            # Convert hex audio to bytes and save
-            audio_data = bytes.fromhex(parsed_json["data"]["audio"])
-            with open(output_path, "wb") as f:
-                f.write(audio_data)
+            if audio_data is None:
+                # Download the binary audio in chunks, never held in memory
+                with self._session.get(
+                    parsed_json["data"]["audio"], stream=True
+                ) as download:
+                    download.raise_for_status()
+                    with open(output_path, "wb") as f:
+                        for chunk in download.iter_content(chunk_size=65536):
+                            f.write(chunk)
+            else:
+                # Save the audio decoded from hex
+                with open(output_path, "wb") as f:
+                    f.write(audio_data)
 
             result = {
                 "status": "success",
@@ -236,22 +571,12 @@ class MiniMaxiTTSProvider(TTSProvider):
                 "trace_id": parsed_json.get("trace_id"),
             }
 
-            # Generate alignment if requested
+            # Generate alignment if requested, transcribing the file just written
             if kwargs.get("return_alignment", False):
-                temp_path = Path(output_path)
-                temp_file = (
-                    temp_path.parent / f"{temp_path.stem}_temp{temp_path.suffix}"
+                asr_result = self.asr_manager.transcribe(
+                    "openai", Path(output_path), language=kwargs.get("language")
                 )
-
-                try:
-                    with open(temp_file, "wb") as f:
-                        f.write(audio_data)
-                    asr_result = self.asr_manager.transcribe(
-                        "openai", temp_file, language=kwargs.get("language")
-                    )
-                    result["alignment"] = asr_result.to_elevenlabs_alignment()
-                finally:
-                    temp_file.unlink(missing_ok=True)
+                result["alignment"] = asr_result.to_elevenlabs_alignment()
 
             return result
 
@@ -261,6 +586,26 @@ class MiniMaxiTTSProvider(TTSProvider):
             raise TTSError(f"MiniMaxi API request failed: {str(e)}")
 
 
+# Realtime TTS instructions by (has context, has speech reference)
+_REALTIME_INSTRUCTIONS = {
+    (has_context, has_reference): (
+        "You are a text-to-speech system."
+        "Your task is to vocalize the provided text below"
+        f"{' respecting the provided context.' if has_context else ' .'}"
+        f"{'Exactly match and clone the voice characteristics from the reference audio.' if has_reference else ''}"
+        "Focus only on speech generation, maintaining natural prosody and pronunciation."
+        # "The text could be a single word, such as 'empty', you should still vocalize it."
+    )
+    for has_context in (False, True)
+    for has_reference in (False, True)
+}
+
+# Static last frame of every realtime TTS request, serialized once
+_REALTIME_RESPONSE_CREATE = _json_text(
+    {"type": "response.create", "response": {"modalities": ["audio", "text"]}}
+)
+
+
 class OpenAIRealtimeTTSProvider(TTSProvider):
     def __init__(self, api_key: Union[str, None] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
@@ -354,14 +699,14 @@ class OpenAIRealtimeTTSProvider(TTSProvider):
                 },
             },
         }
-        self.asr_manager = create_asr_manager()
+        self._voices_cache = tuple(
+            {"name": k, "voice_id": k, **v} for k, v in self.available_voices.items()
+        )
 
     def list_voices(self) -> list[dict]:
         """Return list of available voices with their details"""
-        # Add voice_id field to match ElevenLabs structure
-        return [
-            {"name": k, "voice_id": k, **v} for k, v in self.available_voices.items()
-        ]
+        # voice_id field added to match ElevenLabs structure
+        return list(self._voices_cache)
 
     def generate_speech(
         self, text: str, output_path: str, voice: str = "alloy", **kwargs
@@ -395,27 +740,30 @@ class OpenAIRealtimeTTSProvider(TTSProvider):
                 "OpenAI-Beta": "realtime=v1",
             }
 
+            # The frames are mostly base64 audio: keep permessage-deflate on,
+            # accept large messages and buffer more frames in both directions
+            # (a voice reference can be megabytes)
             async with websockets.connect(
                 uri,
                 additional_headers=headers,
+                compression="deflate",
+                max_size=16 * 1024 * 1024,
+                max_queue=64,
+                write_limit=1024 * 1024,
             ) as websocket:
                 # Build instructions with additional context if provided
 
                 context = kwargs.get("context")
-                instructions = (
-                    "You are a text-to-speech system."
-                    f"Your task is to vocalize the provided text below{' .' if not context else ' respecting the provided context.'}"
-                    f"{'Exactly match and clone the voice characteristics from the reference audio.' if kwargs.get('speech_reference') else ''}"
-                    "Focus only on speech generation, maintaining natural prosody and pronunciation."
-                    # "The text could be a single word, such as 'empty', you should still vocalize it."
-                )
+                instructions = _REALTIME_INSTRUCTIONS[
+                    bool(context), bool(kwargs.get("speech_reference"))
+                ]
                 if context:
                     instructions += f"\nContext:\n{context}\n"
                 # instructions += f"\nThe text to vocalize is:\n{text}\n"
-                # Send a single, comprehensive session update
-                # Send messages in sequence as required by the API
-                await websocket.send(
-                    json.dumps(
+                # Build every control frame first, then send them in a tight
+                # loop in the order the API requires
+                frames = [
+                    _json_text(
                         {
                             "type": "session.update",
                             "session": {
@@ -424,14 +772,14 @@ class OpenAIRealtimeTTSProvider(TTSProvider):
                             },
                         }
                     )
-                )
+                ]
 
                 if voice_ref := kwargs.get("voice_reference"):
-                    with open(voice_ref, "rb") as f:
-                        audio_data = f.read()
+                    # Read off the event loop, the reference can be megabytes
+                    reference_audio = await asyncio.to_thread(_file_base64, voice_ref)
 
-                    await websocket.send(
-                        json.dumps(
+                    frames.append(
+                        _json_text(
                             {
                                 "type": "conversation.item.create",
                                 "item": {
@@ -440,9 +788,7 @@ class OpenAIRealtimeTTSProvider(TTSProvider):
                                     "content": [
                                         {
                                             "type": "input_audio",
-                                            "audio": base64.b64encode(
-                                                audio_data
-                                            ).decode("utf-8"),
+                                            "audio": reference_audio,
                                         }
                                     ],
                                 },
@@ -450,8 +796,8 @@ class OpenAIRealtimeTTSProvider(TTSProvider):
                         )
                     )
 
-                await websocket.send(
-                    json.dumps(
+                frames.append(
+                    _json_text(
                         {
                             "type": "conversation.item.create",
                             "item": {
@@ -467,21 +813,16 @@ class OpenAIRealtimeTTSProvider(TTSProvider):
                         }
                     )
                 )
+                frames.append(_REALTIME_RESPONSE_CREATE)
 
-                await websocket.send(
-                    json.dumps(
-                        {
-                            "type": "response.create",
-                            "response": {
-                                "modalities": ["audio", "text"]
-                            },  # Removed "text" since we only need audio
-                        }
-                    )
-                )
+                for frame in frames:
+                    await websocket.send(frame)
 
-                audio_chunks = []
+                # Deltas are decoded as they arrive into one growing buffer,
+                # so the base64 text is never held for the whole response
+                audio_buffer = bytearray()
                 async for message in websocket:
-                    data = json.loads(message)
+                    data = _json_loads(message)
 
                     if data["type"] == "response.done":
                         if data["response"]["status"] == "failed":
@@ -494,13 +835,13 @@ class OpenAIRealtimeTTSProvider(TTSProvider):
                         break
 
                     if data["type"] == "response.audio.delta":
-                        audio_chunks.append(base64.b64decode(data["delta"]))
+                        audio_buffer += binascii.a2b_base64(data["delta"])
                     elif data["type"] == "response.done":
                         break
                     elif data["type"] == "error":
                         raise TTSError(f"OpenAI Realtime TTS error: {data}")
 
-                audio_data = b"".join(audio_chunks) if audio_chunks else None
+                audio_data = bytes(audio_buffer)
 
                 if not audio_data:
                     raise TTSError(
@@ -548,17 +889,16 @@ class OpenAIRealtimeTTSProvider(TTSProvider):
             raise TTSError("No audio data received from TTS service")
 
         try:
-            audio_int16 = np.frombuffer(audio_data, dtype=np.int16)
-            if len(audio_int16) == 0:
+            if len(audio_data) < 2:
                 raise TTSError("Empty audio data")
 
-            sf.write(
-                output_path,
-                audio_int16,
-                samplerate=24000,
-                format="WAV",
-                subtype="PCM_16",
-            )
+            # The API streams 24 kHz mono little-endian PCM16, which is exactly
+            # the WAV payload: write the header and the bytes as they are
+            with wave.open(output_path, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(24000)
+                wav_file.writeframes(audio_data[: len(audio_data) // 2 * 2])
 
             # Verify the file was written correctly
             if not Path(output_path).exists() or Path(output_path).stat().st_size == 0:
@@ -572,6 +912,8 @@ class OpenAITTSProvider(TTSProvider):
     def __init__(self, api_key: str = None):
         # OpenAI SDK now requires api_key as keyword-only argument
         self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+        # Keeps its own connection pool, reused by every async call
+        self.async_client = AsyncOpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
         self.available_voices = {
             "alloy": {
                 "name": "alloy",
@@ -684,12 +1026,13 @@ class OpenAITTSProvider(TTSProvider):
                 },
             },
         }
+        self._voices_cache = tuple(
+            {"name": k, "voice_id": k, **v} for k, v in self.available_voices.items()
+        )
 
     def list_voices(self) -> list[dict]:
         """Return list of available voices with their details"""
-        return [
-            {"name": k, "voice_id": k, **v} for k, v in self.available_voices.items()
-        ]
+        return list(self._voices_cache)
 
     def generate_speech(
         self,
@@ -718,6 +1061,62 @@ class OpenAITTSProvider(TTSProvider):
         Returns:
             Dictionary with status and any additional information
         """
+        request_params = self._request_params(
+            text, voice, model, instructions, response_format, speed
+        )
+
+        # Generate audio
+        try:
+            response = self.client.audio.speech.create(**request_params)
+            response.stream_to_file(output_path)
+
+            return {
+                "status": "success",
+                "model": model,
+                "voice": voice,
+                "output_format": response_format,
+            }
+
+        except Exception as e:
+            raise self._tts_error(e)
+
+    async def generate_speech_async(
+        self,
+        text: str,
+        output_path: str,
+        voice: str = "alloy",
+        model: str = "gpt-4o-mini-tts",
+        instructions: str = None,
+        response_format: str = "mp3",
+        speed: float = 1.0,
+        **kwargs,
+    ) -> dict | None:
+        """Async generate_speech, streaming the audio to output_path as it arrives"""
+        request_params = self._request_params(
+            text, voice, model, instructions, response_format, speed
+        )
+
+        try:
+            async with self.async_client.audio.speech.with_streaming_response.create(
+                **request_params
+            ) as response:
+                with open(output_path, "wb") as f:
+                    async for chunk in response.iter_bytes(65536):
+                        f.write(chunk)
+
+            return {
+                "status": "success",
+                "model": model,
+                "voice": voice,
+                "output_format": response_format,
+            }
+
+        except Exception as e:
+            raise self._tts_error(e)
+
+    def _request_params(
+        self, text, voice, model, instructions, response_format, speed
+    ) -> dict:
         # Validate parameters
         if speed < 0.5 or speed > 2.0:
             raise ValueError("Speed must be between 0.5 and 2.0")
@@ -737,37 +1136,118 @@ class OpenAITTSProvider(TTSProvider):
         if response_format:
             request_params["response_format"] = response_format
 
-        # Generate audio
-        try:
-            response = self.client.audio.speech.create(**request_params)
-            response.stream_to_file(output_path)
+        return request_params
 
-            return {
-                "status": "success",
-                "model": model,
-                "voice": voice,
-                "output_format": response_format,
-            }
+    def _tts_error(self, e: Exception) -> TTSError:
+        # Handle rate limit errors specifically
+        if "rate limit" in str(e).lower():
+            return TTSRateLimitError(f"OpenAI API rate limit exceeded: {str(e)}")
+        # Handle other errors
+        return TTSError(f"OpenAI TTS generation failed: {str(e)}")
+
+
+def _audio_duration(path: Union[str, Path]) -> float:
+    """Duration in seconds from the file header, without decoding the audio"""
+    return sf.info(str(path)).duration
+
+
+# Resolved once instead of searching PATH on every spawn; None if not installed
+FFMPEG_BIN = shutil.which("ffmpeg")
 
-        except Exception as e:
-            # Handle rate limit errors specifically
-            if "rate limit" in str(e).lower():
-                raise TTSRateLimitError(f"OpenAI API rate limit exceeded: {str(e)}")
-            # Handle other errors
-            raise TTSError(f"OpenAI TTS generation failed: {str(e)}")
+
+def _atempo_filter(speed: float) -> str:
+    """atempo filter chain for ``speed``, split into steps ffmpeg < 4.3 accepts (0.5-2.0)"""
+    steps = []
+    while speed > 2.0:
+        steps.append(2.0)
+        speed /= 2.0
+    while speed < 0.5:
+        steps.append(0.5)
+        speed /= 0.5
+    steps.append(speed)
+    return ",".join(f"atempo={step}" for step in steps)
+
+
+def _shrink_silences(
+    samples: np.ndarray,
+    sample_rate: int,
+    max_duration: float,
+    threshold_db: float = -30.0,
+    min_silence: float = 0.2,
+    min_leave: float = 0.05,
+) -> np.ndarray:
+    """
+    Shorten pauses until the audio fits in ``max_duration`` seconds.
+
+    Silences (10 ms windows below ``threshold_db``) longer than ``min_silence``
+    are cut to half their length, then a quarter, and so on until the audio
+    is short enough or every pause is down to ``min_leave``. Each pause keeps
+    its edges, so speech onsets and decays aren't clipped.
+
+    Args:
+        samples: (frames, channels) float audio
+
+    Returns:
+        The shortened samples
+    """
+    window = max(1, int(sample_rate * 0.01))
+    n_windows = len(samples) // window
+    if n_windows == 0:
+        return samples
+    mono = samples[: n_windows * window].mean(axis=1).reshape(n_windows, window)
+    rms = np.sqrt(np.mean(mono**2, axis=1))
+    silent = rms < 10 ** (threshold_db / 20)
+
+    # Start/end windows of each silent run
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], silent.astype(np.int8), [0]))))
+    starts, ends = edges[0::2] * window, edges[1::2] * window
+    lengths = ends - starts
+    long_runs = lengths >= min_silence * sample_rate
+    starts, lengths = starts[long_runs], lengths[long_runs]
+    if len(lengths) == 0:
+        return samples
+
+    min_keep = int(min_leave * sample_rate)
+    factor, keep = 1.0, lengths
+    while len(samples) - (lengths - keep).sum() > max_duration * sample_rate:
+        factor *= 0.5
+        new_keep = np.maximum((lengths * factor).astype(np.int64), min_keep)
+        new_keep = np.minimum(new_keep, lengths)
+        if np.array_equal(new_keep, keep):  # No improvement
+            break
+        keep = new_keep
+
+    mask = np.ones(len(samples), dtype=bool)
+    for start, length, kept in zip(starts, lengths, keep):
+        cut_start = start + kept // 2
+        mask[cut_start : cut_start + length - kept] = False
+    return samples[mask]
 
 
 class ElevenLabsTTSProvider(TTSProvider):
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv("ELEVENLABS_API_KEY")
+        self._session = _pooled_session()
+        # Sent with every ElevenLabs call made through the session
+        self._session.headers["xi-api-key"] = self.api_key
+        # Pooled client for generate_speech_async, so requests overlap on the loop
+        self._async_client = httpx.AsyncClient(
+            headers={"xi-api-key": self.api_key or ""},
+            timeout=httpx.Timeout(300.0, connect=10.0),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
 
-    def list_voices(self) -> list[dict]:
-        """Return list of available voices with their details"""
+    def list_voices(self, refresh: bool = False) -> list[dict]:
+        """Return list of available voices with their details, refetched if ``refresh``"""
+        if refresh:
+            self.invalidate_voices()
+        return self._cached_voices(self._fetch_voices)
+
+    def _fetch_voices(self) -> list[dict]:
         url = "https://api.elevenlabs.io/v1/voices"
-        headers = {"xi-api-key": self.api_key}
 
         try:
-            response = requests.get(url, headers=headers)
+            response = self._session.get(url)
             response.raise_for_status()
             return response.json()["voices"]
         except Exception as e:
@@ -783,32 +1263,66 @@ class ElevenLabsTTSProvider(TTSProvider):
         output_format: str = "mp3_44100_128",
         **kwargs,
     ) -> dict | None:
-        """Convert speech from one voice to another using ElevenLabs API"""
+        """
+        Convert speech from one voice to another using ElevenLabs API.
+
+        ``input_path`` may also be an http(s) URL (e.g. a presigned S3 link);
+        the download is streamed into the upload without touching the disk.
+        """
         url = f"https://api.elevenlabs.io/v1/speech-to-speech/{voice}"
-        headers = {"xi-api-key": self.api_key}
 
-        # Prepare the audio file
-        with open(input_path, "rb") as f:
-            files = {"audio": f}
+        # Add optional parameters
+        data = {"model_id": model_id, "output_format": output_format}
 
-            # Add optional parameters
-            data = {"model_id": model_id, "output_format": output_format}
+        if str(input_path).startswith(("http://", "https://")):
+            # None drops the session's API key, the source is a third-party host
+            with self._session.get(
+                input_path, headers={"xi-api-key": None}, stream=True
+            ) as source:
+                if source.status_code != 200:
+                    raise TTSError(
+                        f"Could not download {input_path}: {source.status_code}"
+                    )
+                source.raw.decode_content = True
+                filename = os.path.basename(input_path.split("?", 1)[0]) or "audio"
+                # A declared length only holds for a body that is not re-encoded
+                size = None
+                if "Content-Length" in source.headers and not source.headers.get(
+                    "Content-Encoding"
+                ):
+                    size = int(source.headers["Content-Length"])
+                body = _MultipartFile(
+                    "audio", source.raw, data, filename=filename, size=size
+                )
+                return self._speech_to_speech(url, body, output_path)
 
-            # Make the API request
-            response = requests.post(url, headers=headers, files=files, data=data)
+        # The local file is streamed from disk as well
+        return self._speech_to_speech(
+            url, _MultipartFile("audio", input_path, data), output_path
+        )
 
-            if response.status_code != 200:
-                if response.status_code == 429:
-                    raise TTSRateLimitError(
-                        f"Error: {response.status_code}, {response.text}"
-                    )
-                raise TTSError(f"Error: {response.status_code}, {response.text}")
+    def _speech_to_speech(
+        self, url: str, body: _MultipartFile, output_path: str
+    ) -> dict:
+        # Sized bodies go out with a Content-Length, the rest chunked
+        response = self._session.post(
+            url,
+            data=body if body._length is not None else iter(body),
+            headers={"Content-Type": body.content_type},
+        )
 
-            # Save the audio response
-            with open(output_path, "wb") as f:
-                f.write(response.content)
+        if response.status_code != 200:
+            if response.status_code == 429:
+                raise TTSRateLimitError(
+                    f"Error: {response.status_code}, {response.text}"
+                )
+            raise TTSError(f"Error: {response.status_code}, {response.text}")
 
-            return {"status": "success"}
+        # Save the audio response
+        with open(output_path, "wb") as f:
+            f.write(response.content)
+
+        return {"status": "success"}
 
     def generate_speech(
         self,
@@ -819,8 +1333,33 @@ class ElevenLabsTTSProvider(TTSProvider):
         language: str = None,
         **kwargs,
     ) -> None:
+        url, data = self._speech_request(text, voice, model_id, language, kwargs)
+        response = self._session.post(url, json=data)
+        self._raise_for_status(response.status_code, response.text)
+        return self._save_speech(response.content, output_path, kwargs)
+
+    async def generate_speech_async(
+        self,
+        text: str,
+        output_path: str,
+        voice: str,
+        model_id: str = "eleven_multilingual_v2",
+        language: str = None,
+        **kwargs,
+    ) -> dict:
+        """Async generate_speech; the request runs on the loop, decoding off it"""
+        url, data = self._speech_request(text, voice, model_id, language, kwargs)
+        response = await self._async_client.post(url, json=data)
+        self._raise_for_status(response.status_code, response.text)
+        # Decoding, writing and ffmpeg speed changes are blocking work
+        return await asyncio.to_thread(
+            self._save_speech, response.content, output_path, kwargs
+        )
+
+    def _speech_request(
+        self, text: str, voice: str, model_id: str, language: str, kwargs: dict
+    ) -> tuple[str, dict]:
         url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice}/with-timestamps"
-        headers = {"Content-Type": "application/json", "xi-api-key": self.api_key}
 
         # Base data dictionary
         data = {
@@ -839,16 +1378,17 @@ class ElevenLabsTTSProvider(TTSProvider):
         if language:
             data["language"] = language
 
-        response = requests.post(url, json=data, headers=headers)
+        return url, data
 
-        if response.status_code != 200:
-            if response.status_code == 429:
-                raise TTSRateLimitError(
-                    f"Error: {response.status_code}, {response.text}"
-                )
-            raise TTSError(f"Error: {response.status_code}, {response.text}")
+    @staticmethod
+    def _raise_for_status(status_code: int, text: str) -> None:
+        if status_code != 200:
+            if status_code == 429:
+                raise TTSRateLimitError(f"Error: {status_code}, {text}")
+            raise TTSError(f"Error: {status_code}, {text}")
 
-        response_dict = json.loads(response.content.decode("utf-8"))
+    def _save_speech(self, content: bytes, output_path: str, kwargs: dict) -> dict:
+        response_dict = _json_loads(content)
         audio_bytes = base64.b64decode(response_dict["audio_base64"])
 
         # Write audio to output file immediately
@@ -857,18 +1397,14 @@ class ElevenLabsTTSProvider(TTSProvider):
 
         speed = kwargs.get("speed", 1.0)
         if speed != 1.0:
-            # Try FFmpeg processing
-            temp_path = output_path + ".temp"
-            shutil.copy2(output_path, temp_path)  # Make a copy for processing
-
-            if self._process_with_ffmpeg(temp_path, output_path, speed):
-                os.remove(temp_path)  # Clean up temp file
+            # The audio is fully decoded before output_path is rewritten, so it
+            # can be processed in place without a working copy
+            if self._process_with_ffmpeg(output_path, output_path, speed):
                 # Adjust timestamps if they exist
                 if "alignment" in response_dict:
                     self._adjust_timestamps(response_dict["alignment"], speed)
             else:
                 print("FFmpeg processing failed, keeping original audio")
-                os.remove(temp_path)
 
         return response_dict
 
@@ -877,137 +1413,92 @@ class ElevenLabsTTSProvider(TTSProvider):
         if not alignment:
             return
 
-        # Adjust start times
-        if "character_start_times_seconds" in alignment:
-            alignment["character_start_times_seconds"] = [
-                t / speed for t in alignment["character_start_times_seconds"]
-            ]
-
-        # Adjust end times
-        if "character_end_times_seconds" in alignment:
-            alignment["character_end_times_seconds"] = [
-                t / speed for t in alignment["character_end_times_seconds"]
-            ]
+        # Adjust start and end times, vectorized for long alignments
+        for key in ("character_start_times_seconds", "character_end_times_seconds"):
+            if key in alignment:
+                times = np.asarray(alignment[key], dtype=np.float64)
+                alignment[key] = (times / speed).tolist()
 
     def _process_with_ffmpeg(
         self, input_path: str, output_path: str, target_speed: float
     ) -> None:
         """Process audio by progressively reducing silences until target speed is reached"""
-
-        def get_duration(file_path):
-            """Get duration of audio file using ffprobe"""
-            cmd = [
-                "ffprobe",
-                "-v",
-                "error",
-                "-show_entries",
-                "format=duration",
-                "-of",
-                "default=noprint_wrappers=1:nokey=1",
-                file_path,
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            return float(result.stdout.strip())
-
         try:
-            temp_dir = Path(output_path).parent / ".temp"
-            temp_dir.mkdir(exist_ok=True)
-            current_file = temp_dir / "current.wav"
-
-            # Copy input to our working file
-            subprocess.run(
-                ["ffmpeg", "-y", "-i", input_path, str(current_file)],
-                check=True,
-                capture_output=True,
-            )
-
-            original_duration = get_duration(input_path)
+            # The target comes from the header; the samples are only needed to edit
+            original_duration = _audio_duration(input_path)
             target_duration = original_duration / target_speed
-            current_duration = original_duration
-            silence_factor = 0.5  # Start by halving silences
-
-            # print(f"Original duration: {original_duration:.2f}s")
-            # print(f"Target duration: {target_duration:.2f}s")
-
-            # Try progressively stronger silence reduction until we get close to target
-            while current_duration > target_duration * 1.05:  # Allow 5% margin
-                # print(f"\nTrying silence reduction factor: {silence_factor}")
-                temp_output = temp_dir / "temp_output.wav"
-
-                cmd = [
-                    "ffmpeg",
-                    "-y",
-                    "-i",
-                    str(current_file),
-                    "-af",
-                    f"silenceremove=stop_periods=-1:stop_duration=0.2:stop_threshold=-30dB:leave_silence={silence_factor}",
-                    "-acodec",
-                    "pcm_s16le",
-                    str(temp_output),
-                ]
 
-                # print("Running command:", " ".join(cmd))
-                result = subprocess.run(cmd, capture_output=True)
-
-                if result.returncode != 0:
-                    # print("FFmpeg error:", result.stderr.decode())
-                    break
-
-                new_duration = get_duration(temp_output)
-                # print(f"New duration: {new_duration:.2f}s")
-
-                if new_duration >= current_duration:  # No improvement
-                    break
-
-                # Update current file and duration
-                current_file.unlink()
-                temp_output.rename(current_file)
-                current_duration = new_duration
-
-                # Reduce silence more aggressively in next iteration
-                silence_factor *= 0.5
-
-            # If we still need speed adjustment, apply atempo
-            if current_duration > target_duration * 1.05:
-                final_speed = current_duration / target_duration
-                # print(f"\nApplying final speed adjustment: {final_speed:.2f}x")
-
-                cmd = [
-                    "ffmpeg",
-                    "-y",
-                    "-i",
-                    str(current_file),
-                    "-af",
-                    f"atempo={final_speed}",
-                    "-acodec",
-                    "pcm_s16le",
-                    output_path,
-                ]
-
-                # print("Running command:", " ".join(cmd))
-                subprocess.run(cmd, check=True, capture_output=True)
-            else:
-                # Just copy the current file to output
-                subprocess.run(
-                    ["ffmpeg", "-y", "-i", str(current_file), output_path],
-                    check=True,
-                    capture_output=True,
-                )
+            # Already within tolerance: nothing to decode, edit or re-encode
+            if original_duration <= target_duration * 1.05:
+                if os.path.abspath(input_path) != os.path.abspath(output_path):
+                    shutil.copyfile(input_path, output_path)
+                return True
+
+            samples, sample_rate = sf.read(input_path, dtype="float32", always_2d=True)
+
+            # Shrinking silences is done in memory, ffmpeg only runs for atempo
+            samples = _shrink_silences(samples, sample_rate, target_duration * 1.05)
+            current_duration = len(samples) / sample_rate
+
+            # Written next to the output first so a failed encode keeps it intact
+            output = Path(output_path)
+            partial = output.with_suffix(".part" + output.suffix)
+            try:
+                # If we still need speed adjustment, apply atempo
+                if current_duration > target_duration * 1.05:
+                    final_speed = current_duration / target_duration
+                    # The shrunk PCM is piped in, one ffmpeg run and no temp file
+                    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+                    if FFMPEG_BIN is None:
+                        raise TTSError(
+                            "ffmpeg is required for speed changes beyond shortening "
+                            "pauses but was not found on PATH"
+                        )
+                    cmd = [
+                        FFMPEG_BIN,
+                        "-hide_banner",
+                        "-nostats",
+                        "-loglevel",
+                        "error",
+                        "-y",
+                        "-f",
+                        "s16le",
+                        "-ar",
+                        str(sample_rate),
+                        "-ac",
+                        str(samples.shape[1]),
+                        "-i",
+                        "pipe:0",
+                        "-af",
+                        _atempo_filter(final_speed),
+                        "-acodec",
+                        "pcm_s16le",
+                        str(partial),
+                    ]
+                    # Only errors reach stderr, so there is nothing to drain
+                    # on success and the message is at hand on failure
+                    subprocess.run(
+                        cmd,
+                        input=pcm.tobytes(),
+                        check=True,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.PIPE,
+                    )
+                else:
+                    sf.write(partial, samples, sample_rate)
+                os.replace(partial, output)
+            finally:
+                partial.unlink(missing_ok=True)
 
-            # print(f"\nFinal duration: {get_duration(output_path):.2f}s")
             return True
 
+        except subprocess.CalledProcessError as e:
+            print(f"FFmpeg processing failed: {e.stderr.decode(errors='replace')}")
+            return False
         except Exception as e:
             print(f"FFmpeg processing failed: {str(e)}")
             return False
 
-        finally:
-            # Cleanup
-            if temp_dir.exists():
-                import shutil
-
-                shutil.rmtree(temp_dir)
-
     def find_similar_voices(
         self, audio_file: str, similarity_threshold: float = None, top_k: int = None
     ) -> list[dict]:
@@ -1022,10 +1513,6 @@ class ElevenLabsTTSProvider(TTSProvider):
             List of voice dictionaries containing similarity matches
         """
         url = "https://api.elevenlabs.io/v1/similar-voices"
-        headers = {"xi-api-key": self.api_key}
-
-        # Prepare the multipart form data
-        files = {"audio_file": open(audio_file, "rb")}
         data = {}
 
         # Add optional parameters if provided
@@ -1039,19 +1526,22 @@ class ElevenLabsTTSProvider(TTSProvider):
                 raise ValueError("top_k must be between 1 and 100")
             data["top_k"] = top_k
 
+        # The sample is streamed from disk rather than buffered in memory
+        body = _MultipartFile("audio_file", audio_file, data)
+
         try:
-            response = requests.post(url, headers=headers, files=files, data=data)
+            response = self._session.post(
+                url, data=body, headers={"Content-Type": body.content_type}
+            )
             response.raise_for_status()
 
             result = response.json()
             return result.get("voices", [])
 
         except requests.exceptions.RequestException as e:
-            if response.status_code == 429:
+            if e.response is not None and e.response.status_code == 429:
                 raise TTSRateLimitError(f"ElevenLabs API rate limit exceeded: {str(e)}")
             raise TTSError(f"ElevenLabs API request failed: {str(e)}")
-        finally:
-            files["audio_file"].close()
 
     def add_sharing_voice(
         self, public_user_id: str, voice_id: str, new_name: str
@@ -1067,13 +1557,13 @@ class ElevenLabsTTSProvider(TTSProvider):
             dict: Contains the new voice_id of the added voice
         """
         url = f"https://api.elevenlabs.io/v1/voices/add/{public_user_id}/{voice_id}"
-        headers = {"xi-api-key": self.api_key, "Content-Type": "application/json"}
 
         data = {"new_name": new_name}
 
         try:
-            response = requests.post(url, headers=headers, json=data)
+            response = self._session.post(url, json=data)
             response.raise_for_status()
+            self.invalidate_voices()
 
             return response.json()
 
@@ -1089,11 +1579,16 @@ class CartesiaTTSProvider(TTSProvider):
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv("CARTESIA_API_KEY")
         self.client = Cartesia(api_key=self.api_key)
-        self.asr_manager = create_asr_manager()
+        self.async_client = AsyncCartesia(api_key=self.api_key)
         self._available_voices = None  # Cache for available voices
 
-    def list_voices(self) -> list[dict]:
-        """Return list of available voices with their details"""
+    def list_voices(self, refresh: bool = False) -> list[dict]:
+        """Return list of available voices with their details, refetched if ``refresh``"""
+        if refresh:
+            self.invalidate_voices()
+        return self._cached_voices(self._fetch_voices)
+
+    def _fetch_voices(self) -> list[dict]:
         try:
             voices = self.client.voices.list()
 
@@ -1127,66 +1622,92 @@ class CartesiaTTSProvider(TTSProvider):
     ) -> dict | None:
         """Generate speech using Cartesia's TTS API"""
         try:
-            # Prepare voice specification
-            voice_spec = {"mode": "id", "id": voice}
-
-            # Prepare output format
-            output_format = {
-                "sample_rate": kwargs.get("sample_rate", 44100),
-                "encoding": kwargs.get("encoding", "pcm_f32le"),
-                "container": kwargs.get("container", "wav"),
-            }
-
-            # If mp3 format is requested, add bit_rate
-            if output_format["container"] == "mp3":
-                output_format["bit_rate"] = kwargs.get("bit_rate", 128000)
-
             # Generate audio using the SDK
             response_generator = self.client.tts.bytes(
-                model_id=model_id,
-                transcript=text,
-                voice=voice_spec,
-                language=language,
-                output_format=output_format,
+                **self._tts_params(text, voice, model_id, language, kwargs)
             )
 
-            # Collect all audio chunks from the generator
-            audio_chunks = []
-            for chunk in response_generator:
-                audio_chunks.append(chunk)
+            # Write the chunks as they arrive instead of joining them first
+            with open(output_path, "wb") as f:
+                for chunk in response_generator:
+                    f.write(chunk)
 
-            # Combine all chunks into a single bytes object
-            audio_data = b"".join(audio_chunks)
+            return self._speech_result(output_path, language, kwargs)
+
+        except Exception as e:
+            raise self._tts_error(e)
+
+    async def generate_speech_async(
+        self,
+        text: str,
+        output_path: str,
+        voice: str,
+        model_id: str = "sonic-2",
+        language: str = "en",
+        **kwargs,
+    ) -> dict | None:
+        """Async generate_speech using the SDK's async client"""
+        try:
+            stream = self.async_client.tts.bytes(
+                **self._tts_params(text, voice, model_id, language, kwargs)
+            )
+            # Newer SDKs return a coroutine resolving to the chunk iterator
+            if inspect.isawaitable(stream):
+                stream = await stream
 
-            # Save the audio response
             with open(output_path, "wb") as f:
-                f.write(audio_data)
+                async for chunk in stream:
+                    f.write(chunk)
 
-            result = {"status": "success"}
+            return await asyncio.to_thread(
+                self._speech_result, output_path, language, kwargs
+            )
 
-            # Generate alignment if requested
-            if kwargs.get("return_alignment", False):
-                temp_path = Path(output_path)
-                temp_file = (
-                    temp_path.parent / f"{temp_path.stem}_temp{temp_path.suffix}"
-                )
+        except Exception as e:
+            raise self._tts_error(e)
+
+    @staticmethod
+    def _tts_params(
+        text: str, voice: str, model_id: str, language: str, kwargs: dict
+    ) -> dict:
+        # Prepare output format
+        output_format = {
+            "sample_rate": kwargs.get("sample_rate", 44100),
+            "encoding": kwargs.get("encoding", "pcm_f32le"),
+            "container": kwargs.get("container", "wav"),
+        }
 
-                try:
-                    with open(temp_file, "wb") as f:
-                        f.write(audio_data)
-                    asr_result = self.asr_manager.transcribe(
-                        "openai", temp_file, language=language
-                    )
-                    result["alignment"] = asr_result.to_elevenlabs_alignment()
-                finally:
-                    temp_file.unlink(missing_ok=True)
+        # If mp3 format is requested, add bit_rate
+        if output_format["container"] == "mp3":
+            output_format["bit_rate"] = kwargs.get("bit_rate", 128000)
 
-            return result
+        return {
+            "model_id": model_id,
+            "transcript": text,
+            "voice": {"mode": "id", "id": voice},
+            "language": language,
+            "output_format": output_format,
+        }
 
-        except Exception as e:
-            if "rate limit" in str(e).lower():
-                raise TTSRateLimitError(f"Cartesia API rate limit exceeded: {str(e)}")
-            raise TTSError(f"Cartesia TTS generation failed: {str(e)}")
+    def _speech_result(self, output_path: str, language: str, kwargs: dict) -> dict:
+        result = {"status": "success"}
+
+        # Generate alignment if requested, transcribing the file just written
+        if kwargs.get("return_alignment", False):
+            asr_result = self.asr_manager.transcribe(
+                "openai", Path(output_path), language=language
+            )
+            result["alignment"] = asr_result.to_elevenlabs_alignment()
+
+        return result
+
+    @staticmethod
+    def _tts_error(e: Exception) -> TTSError:
+        if isinstance(e, TTSError):
+            return e
+        if "rate limit" in str(e).lower():
+            return TTSRateLimitError(f"Cartesia API rate limit exceeded: {str(e)}")
+        return TTSError(f"Cartesia TTS generation failed: {str(e)}")
 
     def convert_speech(
         self,
@@ -1217,17 +1738,10 @@ class CartesiaTTSProvider(TTSProvider):
             if container == "mp3" and bit_rate:
                 params["output_format_bit_rate"] = bit_rate
 
-            # Convert the audio using the SDK and collect all chunks
-            response_chunks = []
-            for chunk in self.client.voice_changer.bytes(clip=clip, **params):
-                response_chunks.append(chunk)
-
-            # Combine all chunks into a single bytes object
-            audio_data = b"".join(response_chunks)
-
-            # Save the converted audio
+            # Convert the audio using the SDK, streaming it to the output file
             with open(output_path, "wb") as f:
-                f.write(audio_data)
+                for chunk in self.client.voice_changer.bytes(clip=clip, **params):
+                    f.write(chunk)
 
             return {"status": "success"}
 
@@ -1256,7 +1770,6 @@ class GeminiTTSProvider(TTSProvider):
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         self.client = genai.Client(api_key=self.api_key)
-        self.asr_manager = create_asr_manager()
         self.available_voices = {
             "Zephyr": {
                 "name": "Zephyr",
@@ -1590,12 +2103,13 @@ class GeminiTTSProvider(TTSProvider):
                 },
             },
         }
+        self._voices_cache = tuple(
+            {"name": k, "voice_id": k, **v} for k, v in self.available_voices.items()
+        )
 
     def list_voices(self) -> list[dict]:
         """Return list of available voices with their details"""
-        return [
-            {"name": k, "voice_id": k, **v} for k, v in self.available_voices.items()
-        ]
+        return list(self._voices_cache)
 
     def generate_speech(
         self,
@@ -1698,22 +2212,12 @@ class GeminiTTSProvider(TTSProvider):
                 "voice": voice,
             }
 
-            # Generate alignment if requested
+            # Generate alignment if requested, transcribing the file just written
             if kwargs.get("return_alignment", False):
-                temp_path = Path(output_path)
-                temp_file = (
-                    temp_path.parent / f"{temp_path.stem}_temp{temp_path.suffix}"
+                asr_result = self.asr_manager.transcribe(
+                    "openai", Path(output_path), language=kwargs.get("language")
                 )
-
-                try:
-                    with open(temp_file, "wb") as f:
-                        f.write(audio_data)
-                    asr_result = self.asr_manager.transcribe(
-                        "openai", temp_file, language=kwargs.get("language")
-                    )
-                    result["alignment"] = asr_result.to_elevenlabs_alignment()
-                finally:
-                    temp_file.unlink(missing_ok=True)
+                result["alignment"] = asr_result.to_elevenlabs_alignment()
 
             return result
 
@@ -1794,19 +2298,53 @@ class GeminiTTSProvider(TTSProvider):
         return {"bits_per_sample": bits_per_sample, "rate": rate}
 
 
+# HTTP statuses worth retrying; other 4xx (auth, bad parameters) never succeed
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _error_status(e: BaseException) -> Optional[int]:
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    # websockets' legacy InvalidStatusCode carries the status itself
+    return status if status is not None else getattr(e, "status_code", None)
+
+
+def _is_transient_error(e: BaseException) -> bool:
+    """Whether a failed TTS call may succeed when retried"""
+    if isinstance(
+        e,
+        (
+            TTSRateLimitError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+            httpx.TransportError,
+        ),
+    ):
+        return True
+    if isinstance(e, (requests.exceptions.HTTPError, httpx.HTTPStatusError)):
+        return _error_status(e) in _RETRY_STATUSES
+    if isinstance(e, WebSocketException):
+        # A rejected handshake has a status; dropped connections don't
+        status = _error_status(e)
+        return status is None or status in _RETRY_STATUSES
+    return False
+
+
 class TTSManager:
-    def __init__(self):
+    def __init__(self, asr_manager=None):
         self.providers = {}
+        # Handed to every provider added without one of its own; None keeps
+        # the lazily created process-wide ASR manager
+        self.asr_manager = asr_manager
 
     def add_provider(self, name: str, provider: TTSProvider):
+        if self.asr_manager is not None and "_asr_manager" not in vars(provider):
+            provider.asr_manager = self.asr_manager
         self.providers[name] = provider
 
     @retry(
-        retry=(
-            retry_if_exception_type(requests.exceptions.RequestException)
-            | retry_if_exception_type(WebSocketException)
-            | retry_if_exception_type(TTSRateLimitError)
-        ),
+        retry=retry_if_exception(_is_transient_error),
         wait=wait_exponential(multiplier=2, min=2, max=120),
         stop=stop_after_attempt(3),
         reraise=True,
@@ -1821,11 +2359,7 @@ class TTSManager:
         )
 
     @retry(
-        retry=(
-            retry_if_exception_type(requests.exceptions.RequestException)
-            | retry_if_exception_type(WebSocketException)
-            | retry_if_exception_type(TTSRateLimitError)
-        ),
+        retry=retry_if_exception(_is_transient_error),
         wait=wait_exponential(multiplier=2, min=2, max=120),
         stop=stop_after_attempt(3),
         reraise=True,
@@ -1839,10 +2373,35 @@ class TTSManager:
             text, output_path, voice, **kwargs
         )
 
-    def list_voices(self, provider_name: str) -> list[str] | list[dict]:
-        """List available voices for the specified provider"""
+    async def generate_speech_batch_async(
+        self,
+        provider_name: str,
+        items: list[tuple[str, str]],
+        voice: str,
+        max_concurrency: int = 8,
+        **kwargs,
+    ) -> list:
+        """Concurrent generate_speech_async over (text, output_path) pairs, each retried"""
+        if provider_name not in self.providers:
+            raise ValueError(f"Provider '{provider_name}' not found")
+        return await _bounded_gather(
+            (
+                lambda text=text, path=path: self.generate_speech_async(
+                    provider_name, text, path, voice, **kwargs
+                )
+                for text, path in items
+            ),
+            max_concurrency,
+        )
+
+    def list_voices(
+        self, provider_name: str, refresh: bool = False
+    ) -> list[str] | list[dict]:
+        """List available voices for the specified provider, bypassing the cache if ``refresh``"""
         if provider_name not in self.providers:
             raise ValueError(f"Provider '{provider_name}' not found")
+        if refresh:
+            self.providers[provider_name].invalidate_voices()
         return self.providers[provider_name].list_voices()
 
     def test_provider(self, provider_name: str) -> dict:
@@ -1930,11 +2489,7 @@ class TTSManager:
         )
 
     @retry(
-        retry=(
-            retry_if_exception_type(requests.exceptions.RequestException)
-            | retry_if_exception_type(WebSocketException)
-            | retry_if_exception_type(TTSRateLimitError)
-        ),
+        retry=retry_if_exception(_is_transient_error),
         wait=wait_exponential(multiplier=2, min=2, max=120),
         stop=stop_after_attempt(3),
         reraise=True,
@@ -1967,11 +2522,7 @@ class TTSManager:
         )
 
     @retry(
-        retry=(
-            retry_if_exception_type(requests.exceptions.RequestException)
-            | retry_if_exception_type(WebSocketException)
-            | retry_if_exception_type(TTSRateLimitError)
-        ),
+        retry=retry_if_exception(_is_transient_error),
         wait=wait_exponential(multiplier=2, min=2, max=120),
         stop=stop_after_attempt(3),
         reraise=True,
@@ -2051,41 +2602,54 @@ def main():
     # Test each OpenAI voice with the realtime API
     print("\nGenerating samples for each OpenAI voice using realtime API...")
     openai_voices = tts_manager.list_voices("openai_realtime")
-    for voice_info in openai_voices:
-        voice_name = voice_info["name"]
-        print(f"\nGenerating sample for {voice_name}...")
-        print(f"Description: {voice_info['description']}")
-
-        # Test with different emotional contexts
-        contexts = {
-            # "default": "Speak naturally, in your default style.",
-            "excited": "Speak with enthusiasm and excitement, like someone extremelly excited about something.",
-            # "depressed": "Speak in a depressed, monotone tone, like an extremely depressed person.",
-            # "extreme": "Take a random but EXTREME voice, hysteric, old blood-seeking vampire like, weird accent, etc...",
-        }
 
-        for context_name, context_description in contexts.items():
-            context_output = f"tmp/output_realtime_{voice_name}_{context_name}.wav"
-            response = tts_manager.generate_speech(
-                "openai_realtime",
-                text,
-                context_output,
-                voice=voice_name,
-                context=context_description,
-                return_alignment=True,
-            )
+    # Test with different emotional contexts
+    contexts = {
+        # "default": "Speak naturally, in your default style.",
+        "excited": "Speak with enthusiasm and excitement, like someone extremelly excited about something.",
+        # "depressed": "Speak in a depressed, monotone tone, like an extremely depressed person.",
+        # "extreme": "Take a random but EXTREME voice, hysteric, old blood-seeking vampire like, weird accent, etc...",
+    }
+    jobs = [
+        (
+            voice_info["name"],
+            context_name,
+            context_description,
+            f"tmp/output_realtime_{voice_info['name']}_{context_name}.wav",
+        )
+        for voice_info in openai_voices
+        for context_name, context_description in contexts.items()
+    ]
+
+    def generate_sample(job):
+        voice_name, _, context_description, context_output = job
+        # Retried per call by the manager, so one rate limit doesn't stall the rest
+        return tts_manager.generate_speech(
+            "openai_realtime",
+            text,
+            context_output,
+            voice=voice_name,
+            context=context_description,
+            return_alignment=True,
+        )
 
-            print(f"Sample with context {context_name} saved to {context_output}")
+    # The samples are independent network calls, so they run side by side
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(generate_sample, jobs))
 
-            if response and "alignment" in response:
-                print("\nOriginal timestamps:")
-                for i, char in enumerate(response["alignment"]["characters"]):
-                    start = response["alignment"]["character_start_times_seconds"][i]
-                    end = response["alignment"]["character_end_times_seconds"][i]
-                    if char not in [" ", "\n"]:  # Skip whitespace for readability
-                        print(f"Character '{char}': {start:.3f}s - {end:.3f}s")
+    for (voice_name, context_name, _, context_output), response in zip(jobs, responses):
+        print(
+            f"\nSample for {voice_name} with context {context_name} saved to {context_output}"
+        )
+
+        if response and "alignment" in response:
+            print("\nOriginal timestamps:")
+            for i, char in enumerate(response["alignment"]["characters"]):
+                start = response["alignment"]["character_start_times_seconds"][i]
+                end = response["alignment"]["character_end_times_seconds"][i]
+                if char not in [" ", "\n"]:  # Skip whitespace for readability
+                    print(f"Character '{char}': {start:.3f}s - {end:.3f}s")
 
-        break
     # Test with different speeds and print timestamps
 
     speeds = []  # [1.02]  # , 1.5, 2.0]
@@ -1,4 +1,8 @@
-from .yaml_fix import yaml_extract_validate_repair
+from .yaml_fix import (
+    yaml_extract_validate_repair,
+    yaml_extract_validate_repair_async,
+    yaml_extract_validate_repair_batch,
+)
 from .yaml_utils import find_yaml, pydantic_to_yaml, pydantic_to_yaml_example
 
 __all__ = [
@@ -6,4 +10,6 @@ __all__ = [
     "find_yaml",
     "pydantic_to_yaml",
     "yaml_extract_validate_repair",
+    "yaml_extract_validate_repair_async",
+    "yaml_extract_validate_repair_batch",
 ]
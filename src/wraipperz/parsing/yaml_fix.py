@@ -1,96 +1,26 @@
-from typing import Type, TypeVar
+import functools
+import re
+import string
+from typing import List, Optional, Sequence, Tuple, Type, TypeVar
 
 import yaml
 from pydantic import BaseModel, ValidationError
 
 # Import from the llm module - adjust path as needed
-from wraipperz.api.llm import call_ai
+from wraipperz.api.llm import call_ai, call_ai_async
 from wraipperz.api.messages import MessageBuilder
 
 from .yaml_utils import find_yaml, pydantic_to_yaml_example
 
-T = TypeVar("T", bound=BaseModel)
-
-
-def yaml_extract_validate_repair(
-    model: str,
-    text: str,
-    model_class: Type[T],
-    max_retries: int = 3,
-) -> T:
-    """
-    Extract YAML from text, validate it against a Pydantic model, and heal if needed.
-
-    This function will:
-    1. Extract YAML content from the input text using find_yaml()
-    2. Parse the YAML using yaml.safe_load()
-    3. Validate against the provided Pydantic model class
-    4. If validation fails, use AI to heal the YAML (up to max_retries times)
-
-    Args:
-        text: Input text containing YAML (possibly in ```yaml blocks)
-        model_class: Pydantic model class to validate against
-        max_retries: Maximum number of AI healing attempts (default: 3)
-        ai_model: AI model to use for healing (default: Claude 3.5 Sonnet)
-
-    Returns:
-        Validated instance of the Pydantic model
-
-    Raises:
-        ValueError: If YAML cannot be extracted, parsed, or validated after all retries
-    """
-    # Step 1: Extract YAML content
-    yaml_content = find_yaml(text)
-
-    # Keep track of the current YAML content for healing
-    current_yaml = yaml_content
-    last_error = None
-
-    for attempt in range(max_retries + 1):
-        try:
-            if not current_yaml:
-                raise ValueError(
-                    "No YAML content found in the provided text, probably wrong YAML block usage/format"
-                )
-
-            # Step 2: Parse YAML
-            yaml_data = yaml.safe_load(current_yaml)
-
-            # Step 3: Validate with Pydantic
-            validated_model = model_class.model_validate(yaml_data)
-            return validated_model
-
-        except yaml.YAMLError as e:
-            last_error = e
-            error_type = "YAML parsing error"
-            error_message = str(e)
-
-        except ValidationError as e:
-            last_error = e
-            error_type = "Pydantic validation error"
-            error_message = e.json(indent=2)
-
-        except ValueError as e:
-            last_error = e
-            error_type = "ValueError"
-            error_message = str(e)
-
-        except Exception as e:
-            last_error = e
-            error_type = "Unexpected error"
-            error_message = str(e)
-
-        # If this was the last attempt, raise the error
-        if attempt == max_retries:
-            raise ValueError(
-                f"Failed to validate YAML after {max_retries} healing attempts. "
-                f"Last error: {error_type}: {error_message}"
-            ) from last_error
+# libyaml's C loader parses several times faster than the pure-Python one
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
 
-        # Use AI to heal the YAML
-        print(f"Attempt {attempt + 1}/{max_retries}: Using AI to heal YAML...")
+T = TypeVar("T", bound=BaseModel)
 
-        YAML_FIXING_GUIDE = """
+YAML_FIXING_GUIDE = """
 1. **Quote these ALWAYS:**
    - Strings containing `: ` (colon-space)
    - Strings containing quotes (`"` or `'`)
@@ -120,47 +50,387 @@ def yaml_extract_validate_repair(
 **Remember:** Unquoted special characters are interpreted as YAML syntax, not string content!
 """
 
-        # Create the healing prompt
-        healing_prompt = f"""You are a YAML healing expert. The following YAML has an error and needs to be fixed.
+# Built once; only the error, the schema example and the YAML vary per attempt
+_HEALING_PROMPT = string.Template(
+    """You are a YAML healing expert. The following YAML has an error and needs to be fixed.
 
-**Error Type:** {error_type}
+**Error Type:** $error_type
 **Error Message:**
-{error_message}
+$error_message
 
 **Expected Pydantic Model Schema:**
 ```yaml
-{pydantic_to_yaml_example(model_class)}
+$schema_example
 ```
 
 **Current YAML (with errors):**
 ```yaml
-{current_yaml}
+$current_yaml
 ```
 
 Guidelines:
 - Make sure to follow correct YAML template and usage:
-{YAML_FIXING_GUIDE}
+"""
+    + YAML_FIXING_GUIDE.replace("$", "$$")
+    + """
 
 Please fix the YAML to match the expected schema. Return the corrected YAML in a ```yaml code block.
 """
+)
+
+
+# Batched variant: one _BATCH_HEALING_ITEM section per invalid document
+_BATCH_HEALING_PROMPT = string.Template(
+    """You are a YAML healing expert. Each item below contains YAML with an error and needs to be fixed.
+
+$items
+Guidelines:
+- Make sure to follow correct YAML template and usage:
+"""
+    + YAML_FIXING_GUIDE.replace("$", "$$")
+    + """
+
+Please fix the YAML of every item to match its expected schema. For each item, write its `### ITEM_<n>` heading on its own line followed by the corrected YAML in a ```yaml code block.
+"""
+)
+
+_BATCH_HEALING_ITEM = string.Template(
+    """### ITEM_$index
+
+**Error Type:** $error_type
+**Error Message:**
+$error_message
+
+**Expected Pydantic Model Schema:**
+```yaml
+$schema_example
+```
+
+**Current YAML (with errors):**
+```yaml
+$current_yaml
+```
+"""
+)
+
+_BATCH_ITEM_HEADING = re.compile(r"^###\s*ITEM_(\d+)\s*$", re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=128)
+def _schema_example(model_class: Type[BaseModel]) -> str:
+    """pydantic_to_yaml_example() result, computed once per model class"""
+    return pydantic_to_yaml_example(model_class)
+
+
+# Splits a block YAML line into indentation, "- " marker, "key: " and value
+_YAML_LINE = re.compile(
+    r"^(?P<prefix>(?P<indent>\s*)(?:- +)*(?:[^\s'\"#{\[&*!|>%@`-][^:#]*?:(?: +|$))?)"
+    r"(?P<value>.*?)\s*$"
+)
+_LEADING_TABS = re.compile(r"^\t+", re.MULTILINE)
+_BLOCK_SCALAR = re.compile(r"^[|>][-+0-9]*$")
+
+
+def _load_yaml(text: str):
+    """yaml.safe_load() through the C loader when PyYAML was built with libyaml"""
+    return yaml.load(text, Loader=_SafeLoader)
+
+
+def _quote_if_invalid(value: str) -> str:
+    """``value`` as is when it is a valid YAML scalar, single-quoted otherwise"""
+    if not value or value[0] in "[{&*!|>#":
+        return value
+    try:
+        _load_yaml(f"k: {value}")
+        return value
+    except yaml.YAMLError:
+        return "'" + value.replace("'", "''") + "'"
+
+
+def _local_yaml_repair(yaml_text: str) -> Optional[str]:
+    """
+    Deterministic fixes for the common mistakes listed in YAML_FIXING_GUIDE.
+
+    Strips a BOM, turns indentation tabs into spaces and single-quotes any
+    scalar that does not parse on its own (unquoted ": ", text after a closing
+    quote, leading @ or `). Block scalar contents are left untouched.
+
+    Returns:
+        The repaired YAML, or None if nothing needed changing
+    """
+    text = _LEADING_TABS.sub(
+        lambda m: "  " * len(m.group()), yaml_text.lstrip("\ufeff")
+    )
+    lines = []
+    block_indent = None
+    for line in text.split("\n"):
+        indent = len(line) - len(line.lstrip())
+        if block_indent is not None:
+            if not line.strip() or indent > block_indent:
+                lines.append(line)
+                continue
+            block_indent = None
+        match = _YAML_LINE.match(line)
+        if match is None or line.lstrip().startswith(("#", "---", "...")):
+            lines.append(line)
+            continue
+        value = match["value"]
+        if _BLOCK_SCALAR.match(value):
+            block_indent = indent
+            lines.append(line)
+            continue
+        lines.append(match["prefix"] + _quote_if_invalid(value))
+    repaired = "\n".join(lines)
+    return repaired if repaired != yaml_text else None
+
+
+def _validate_yaml(
+    yaml_text: Optional[str], model_class: Type[T]
+) -> Tuple[Optional[T], Optional[Tuple[str, str, Exception]]]:
+    """
+    Parse and validate one YAML document, trying _local_yaml_repair() on parse errors.
+
+    Returns:
+        (instance, None) on success, or (None, (error_type, error_message, error))
+        describing the failure for a healing prompt
+    """
+    try:
+        if not yaml_text:
+            raise ValueError(
+                "No YAML content found in the provided text, probably wrong YAML block usage/format"
+            )
+
+        # Parse YAML, then validate with Pydantic
+        yaml_data = _load_yaml(yaml_text)
+        return model_class.model_validate(yaml_data), None
+
+    except yaml.YAMLError as e:
+        # Formulaic mistakes are fixed locally, without an AI round-trip
+        repaired = _local_yaml_repair(yaml_text)
+        if repaired is not None:
+            try:
+                return model_class.model_validate(_load_yaml(repaired)), None
+            except (yaml.YAMLError, ValidationError):
+                pass
+        return None, ("YAML parsing error", str(e), e)
+
+    except ValidationError as e:
+        return None, ("Pydantic validation error", e.json(indent=2), e)
+
+    except ValueError as e:
+        return None, ("ValueError", str(e), e)
+
+    except Exception as e:
+        return None, ("Unexpected error", str(e), e)
+
+
+def _healing_steps(text: str, model_class: Type[T], max_retries: int):
+    """
+    Validate/heal loop shared by the sync and async yaml_extract_validate_repair.
+
+    Yields the messages of each healing request and expects the AI response
+    text to be sent back (None if the call failed). The validated model is
+    the generator's return value.
+    """
+    # Step 1: Extract YAML content
+    yaml_content = find_yaml(text)
+
+    # Keep track of the current YAML content for healing
+    current_yaml = yaml_content
+
+    for attempt in range(max_retries + 1):
+        # Steps 2-4: Parse, validate and try the local fixes
+        validated_model, failure = _validate_yaml(current_yaml, model_class)
+        if failure is None:
+            return validated_model
+        error_type, error_message, last_error = failure
+
+        # If this was the last attempt, raise the error
+        if attempt == max_retries:
+            raise ValueError(
+                f"Failed to validate YAML after {max_retries} healing attempts. "
+                f"Last error: {error_type}: {error_message}"
+            ) from last_error
+
+        # Use AI to heal the YAML
+        print(f"Attempt {attempt + 1}/{max_retries}: Using AI to heal YAML...")
+
+        # Create the healing prompt
+        healing_prompt = _HEALING_PROMPT.substitute(
+            error_type=error_type,
+            error_message=error_message,
+            schema_example=_schema_example(model_class),
+            current_yaml=current_yaml,
+        )
+
+        response = yield MessageBuilder().add_system(healing_prompt).build()
+
+        # Extract the healed YAML from the response
+        healed_yaml = find_yaml(response) if response is not None else None
+        if healed_yaml:
+            current_yaml = healed_yaml
+
+    # This should never be reached due to the raise in the loop
+    raise ValueError("Unexpected error in YAML validation and healing process")
+
+
+def yaml_extract_validate_repair(
+    model: str,
+    text: str,
+    model_class: Type[T],
+    max_retries: int = 3,
+) -> T:
+    """
+    Extract YAML from text, validate it against a Pydantic model, and heal if needed.
+
+    This function will:
+    1. Extract YAML content from the input text using find_yaml()
+    2. Parse the YAML with the safe loader (libyaml's C version when available)
+    3. Validate against the provided Pydantic model class
+    4. If parsing fails, try the local fixes of _local_yaml_repair() first
+    5. If validation still fails, use AI to heal the YAML (up to max_retries times)
+
+    Args:
+        text: Input text containing YAML (possibly in ```yaml blocks)
+        model_class: Pydantic model class to validate against
+        max_retries: Maximum number of AI healing attempts (default: 3)
+        ai_model: AI model to use for healing (default: Claude 3.5 Sonnet)
+
+    Returns:
+        Validated instance of the Pydantic model
+
+    Raises:
+        ValueError: If YAML cannot be extracted, parsed, or validated after all retries
+    """
+    steps = _healing_steps(text, model_class, max_retries)
+    try:
+        messages = next(steps)
+        while True:
+            try:
+                # Call AI to heal the YAML
+                response, _ = call_ai(
+                    model=model, messages=messages, temperature=0, max_tokens=40000
+                )
+            except Exception as ai_error:
+                print(f"AI healing failed: {ai_error}")
+                # Continue with the original error
+                response = None
+            messages = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+
+async def yaml_extract_validate_repair_async(
+    model: str,
+    text: str,
+    model_class: Type[T],
+    max_retries: int = 3,
+) -> T:
+    """
+    Async version of yaml_extract_validate_repair(), healing through call_ai_async.
+
+    Several documents can be healed concurrently with asyncio.gather().
+    """
+    steps = _healing_steps(text, model_class, max_retries)
+    try:
+        messages = next(steps)
+        while True:
+            try:
+                response, _ = await call_ai_async(
+                    model=model, messages=messages, temperature=0, max_tokens=40000
+                )
+            except Exception as ai_error:
+                print(f"AI healing failed: {ai_error}")
+                response = None
+            messages = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+
+def yaml_extract_validate_repair_batch(
+    model: str,
+    items: Sequence[Tuple[str, Type[BaseModel]]],
+    max_retries: int = 3,
+) -> List[BaseModel]:
+    """
+    yaml_extract_validate_repair() for several texts, healing them in one AI call.
+
+    Every document is extracted, validated and locally repaired on its own.
+    The ones still invalid are sent together in a single healing prompt, one
+    ``### ITEM_<n>`` section each, and the response is split back per item.
+    Only the items that still fail are sent again on the next attempt.
+
+    Args:
+        items: (text, model_class) pairs, validated independently
+        max_retries: Maximum number of batched AI healing attempts (default: 3)
+
+    Returns:
+        Validated model instances, in the order of ``items``
+
+    Raises:
+        ValueError: If any item cannot be validated after all retries
+    """
+    current_yaml = [find_yaml(text) for text, _ in items]
+    results: List[Optional[BaseModel]] = [None] * len(items)
+    failures = {}
+
+    for attempt in range(max_retries + 1):
+        for index in [i for i in range(len(items)) if results[i] is None]:
+            results[index], failure = _validate_yaml(
+                current_yaml[index], items[index][1]
+            )
+            if failure is None:
+                failures.pop(index, None)
+            else:
+                failures[index] = failure
+        if not failures:
+            return results
+
+        if attempt == max_retries:
+            index, (error_type, error_message, last_error) = next(
+                iter(failures.items())
+            )
+            raise ValueError(
+                f"Failed to validate YAML for items {sorted(failures)} after "
+                f"{max_retries} healing attempts. Item {index} last error: "
+                f"{error_type}: {error_message}"
+            ) from last_error
+
+        print(
+            f"Attempt {attempt + 1}/{max_retries}: Using AI to heal "
+            f"{len(failures)} YAML documents..."
+        )
+
+        healing_prompt = _BATCH_HEALING_PROMPT.substitute(
+            items="\n".join(
+                _BATCH_HEALING_ITEM.substitute(
+                    index=index,
+                    error_type=error_type,
+                    error_message=error_message,
+                    schema_example=_schema_example(items[index][1]),
+                    current_yaml=current_yaml[index],
+                )
+                for index, (error_type, error_message, _) in failures.items()
+            )
+        )
 
         messages = MessageBuilder().add_system(healing_prompt).build()
 
         try:
-            # Call AI to heal the YAML
             response, _ = call_ai(
                 model=model, messages=messages, temperature=0, max_tokens=40000
             )
-
-            # Extract the healed YAML from the response
-            healed_yaml = find_yaml(response)
-            if healed_yaml:
-                current_yaml = healed_yaml
-
         except Exception as ai_error:
             print(f"AI healing failed: {ai_error}")
-            # Continue with the original error
             continue
 
+        # re.split() alternates section text and the captured item number
+        sections = _BATCH_ITEM_HEADING.split(response)
+        for number, section in zip(sections[1::2], sections[2::2]):
+            index = int(number)
+            healed_yaml = find_yaml(section)
+            if index in failures and healed_yaml:
+                current_yaml[index] = healed_yaml
+
     # This should never be reached due to the raise in the loop
     raise ValueError("Unexpected error in YAML validation and healing process")
@@ -0,0 +1,34 @@
+from wraipperz.api.asr import ASRResult
+
+
+def test_to_elevenlabs_alignment_splits_words_into_characters():
+    result = ASRResult(
+        text="hi you",
+        words=[
+            {"word": "hi", "start": 0.0, "end": 0.5},
+            {"word": "you", "start": 0.75, "end": 1.5},
+        ],
+        duration=1.5,
+    )
+
+    alignment = result.to_elevenlabs_alignment()
+
+    assert alignment["characters"] == ["h", "i", " ", "y", "o", "u"]
+    assert alignment["character_start_times_seconds"] == [
+        0.0,
+        0.25,
+        0.5,
+        0.75,
+        1.0,
+        1.25,
+    ]
+    assert alignment["character_end_times_seconds"] == [0.25, 0.5, 0.75, 1.0, 1.25, 1.5]
+
+
+def test_to_elevenlabs_alignment_without_words():
+    alignment = ASRResult(text="", words=[], duration=0.0).to_elevenlabs_alignment()
+    assert alignment == {
+        "characters": [],
+        "character_start_times_seconds": [],
+        "character_end_times_seconds": [],
+    }
@@ -0,0 +1,211 @@
+import asyncio
+
+from wraipperz.api.cache import ResponseCache, cached_response, make_cache_key
+from wraipperz.api.semantic_cache import SemanticCache
+
+TEXT_MESSAGES = [{"role": "user", "content": "What's 1+1?"}]
+
+IMAGE_MESSAGES = [
+    {
+        "role": "user",
+        "content": [{"type": "image_url", "image_url": {"url": "image.png"}}],
+    }
+]
+
+
+class CountingManager:
+    def __init__(self):
+        self.calls = 0
+
+    def call_ai(self, messages, temperature, max_tokens, model, **kwargs):
+        self.calls += 1
+        return f"answer {self.calls}", 0.5
+
+    async def call_ai_async(self, messages, temperature, max_tokens, model, **kwargs):
+        return self.call_ai(messages, temperature, max_tokens, model, **kwargs)
+
+
+def _make_cached_call(cache):
+    @cached_response(cache)
+    def call(ai_manager, messages, temperature, max_tokens, model, **kwargs):
+        return ai_manager.call_ai(messages, temperature, max_tokens, model, **kwargs)
+
+    return call
+
+
+def test_cache_key_only_for_deterministic_text():
+    assert make_cache_key("openai/gpt-4o", TEXT_MESSAGES, 0, 100, {}) is not None
+    assert make_cache_key("openai/gpt-4o", TEXT_MESSAGES, 0.7, 100, {}) is None
+    assert make_cache_key("openai/gpt-4o", IMAGE_MESSAGES, 0, 100, {}) is None
+    assert (
+        make_cache_key("openai/gpt-4o", TEXT_MESSAGES, 0, 100, {"x": object()}) is None
+    )
+
+
+def test_cached_response_hits_and_bypass():
+    manager = CountingManager()
+    call = _make_cached_call(ResponseCache())
+
+    assert call(manager, TEXT_MESSAGES, 0, 100, "openai/gpt-4o") == ("answer 1", 0.5)
+    assert call(manager, TEXT_MESSAGES, 0, 100, "openai/gpt-4o") == ("answer 1", 0.0)
+    assert manager.calls == 1
+
+    call(manager, TEXT_MESSAGES, 0, 100, "openai/gpt-4o", nocache=True)
+    call(manager, TEXT_MESSAGES, 0.5, 100, "openai/gpt-4o")
+    assert manager.calls == 3
+
+
+def test_cached_response_async():
+    manager = CountingManager()
+    cache = ResponseCache()
+
+    @cached_response(cache)
+    async def call(ai_manager, messages, temperature, max_tokens, model, **kwargs):
+        return await ai_manager.call_ai_async(
+            messages, temperature, max_tokens, model, **kwargs
+        )
+
+    async def run():
+        await call(manager, TEXT_MESSAGES, 0, 100, "openai/gpt-4o")
+        return await call(manager, TEXT_MESSAGES, 0, 100, "openai/gpt-4o")
+
+    assert asyncio.run(run()) == ("answer 1", 0.0)
+    assert manager.calls == 1
+
+
+def test_concurrent_identical_calls_share_one_request():
+    manager = CountingManager()
+    cache = ResponseCache()
+
+    class SlowManager:
+        async def call_ai_async(self, *args, **kwargs):
+            await asyncio.sleep(0.01)
+            return manager.call_ai(*args, **kwargs)
+
+    @cached_response(cache)
+    async def call(ai_manager, messages, temperature, max_tokens, model, **kwargs):
+        return await ai_manager.call_ai_async(
+            messages, temperature, max_tokens, model, **kwargs
+        )
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                call(SlowManager(), TEXT_MESSAGES, 0, 100, "openai/gpt-4o")
+                for _ in range(3)
+            )
+        )
+
+    results = asyncio.run(run())
+    assert manager.calls == 1
+    assert sorted(results, key=lambda r: -r[1]) == [
+        ("answer 1", 0.5),
+        ("answer 1", 0.0),
+        ("answer 1", 0.0),
+    ]
+
+
+def test_single_flight_followers_see_the_failure():
+    cache = ResponseCache()
+    calls = []
+
+    @cached_response(cache)
+    async def call(ai_manager, messages, temperature, max_tokens, model, **kwargs):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(
+            call(None, TEXT_MESSAGES, 0, 100, "openai/gpt-4o"),
+            call(None, TEXT_MESSAGES, 0, 100, "openai/gpt-4o"),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(cache) == 0
+
+
+def test_response_cache_lru_eviction_and_ttl():
+    cache = ResponseCache(maxsize=2, ttl=None)
+    cache.set(b"a", "1")
+    cache.set(b"b", "2")
+    cache.get(b"a")
+    cache.set(b"c", "3")
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == "1"
+
+    expired = ResponseCache(ttl=-1)
+    expired.set(b"a", "1")
+    assert expired.get(b"a") is None
+
+
+def test_module_call_ai_exposes_cache_clear():
+    from wraipperz.api.llm import call_ai, call_ai_async
+
+    assert callable(call_ai.cache_clear)
+    assert call_ai_async.cache_clear == call_ai.cache_clear
+
+
+def _bag_of_words(text):
+    vocabulary = ["what", "is", "1+1", "one", "plus", "capital", "france"]
+    words = text.lower().replace("?", "").replace("'s", " is").split()
+    return [float(word in words) for word in vocabulary]
+
+
+def test_semantic_cache_matches_paraphrase_in_same_context(tmp_path):
+    cache = SemanticCache(
+        embed_fn=_bag_of_words, threshold=0.8, path=str(tmp_path / "cache.db")
+    )
+    cache.set("openai/gpt-4o", TEXT_MESSAGES, 100, {}, "2")
+
+    paraphrase = [{"role": "user", "content": "what is 1+1"}]
+    assert cache.get("openai/gpt-4o", paraphrase, 100, {}) == "2"
+
+    other_topic = [{"role": "user", "content": "What is the capital of France?"}]
+    assert cache.get("openai/gpt-4o", other_topic, 100, {}) is None
+    assert cache.get("openai/gpt-4o-mini", paraphrase, 100, {}) is None
+    with_system = [{"role": "system", "content": "Be terse."}] + paraphrase
+    assert cache.get("openai/gpt-4o", with_system, 100, {}) is None
+
+    reloaded = SemanticCache(embed_fn=_bag_of_words, path=str(tmp_path / "cache.db"))
+    assert len(reloaded) == 1
+    assert reloaded.get("openai/gpt-4o", paraphrase, 100, {}) == "2"
+
+
+def test_semantic_cache_evicts_oldest_across_contexts_and_file(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SemanticCache(embed_fn=_bag_of_words, threshold=0.8, maxsize=3, path=path)
+    for index in range(40):
+        # Every other entry in its own context, enough to grow the buffer
+        cache.set(f"model-{index % 2}", TEXT_MESSAGES, 100, {}, str(index))
+    assert len(cache) == 3
+    assert cache.get("model-0", TEXT_MESSAGES, 100, {}) == "38"
+
+    rows = cache._db.execute("SELECT response FROM entries ORDER BY rowid").fetchall()
+    assert [row[0] for row in rows] == ["37", "38", "39"]
+
+    reloaded = SemanticCache(embed_fn=_bag_of_words, maxsize=2, path=path)
+    assert len(reloaded) == 2
+    assert reloaded._db.execute("SELECT COUNT(*) FROM entries").fetchone() == (2,)
+
+
+def test_cached_response_consults_semantic_cache_on_request():
+    manager = CountingManager()
+    semantic = SemanticCache(embed_fn=_bag_of_words, threshold=0.8)
+
+    @cached_response(ResponseCache(), semantic)
+    def call(ai_manager, messages, temperature, max_tokens, model, **kwargs):
+        assert "semantic_cache" not in kwargs
+        return ai_manager.call_ai(messages, temperature, max_tokens, model, **kwargs)
+
+    paraphrase = [{"role": "user", "content": "what is 1+1"}]
+    other_paraphrase = [{"role": "user", "content": "What is 1+1"}]
+    call(manager, TEXT_MESSAGES, 0, 100, "openai/gpt-4o", semantic_cache=True)
+    assert call(manager, paraphrase, 0, 100, "openai/gpt-4o") == ("answer 2", 0.5)
+    assert call(
+        manager, other_paraphrase, 0, 100, "openai/gpt-4o", semantic_cache=True
+    ) == ("answer 1", 0.0)
+    assert manager.calls == 2
@@ -0,0 +1,110 @@
+import httpx
+import pytest
+from openai import APIConnectionError, BadRequestError
+
+from wraipperz.api.circuit_breaker import CircuitBreaker
+from wraipperz.api.llm import AIManager, LMStudioProvider
+
+TEXT_MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("wraipperz.api.circuit_breaker.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker("test", threshold=2, cooldown=10)
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+    now[0] = 11
+    assert breaker.allow_request()  # the single probe
+    assert not breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 22
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_open_breaker_routes_to_fallback():
+    class DownProvider(LMStudioProvider):
+        calls = 0
+
+        def call_ai(self, messages, temperature, max_tokens, model=None, **kwargs):
+            self.calls += 1
+            raise APIConnectionError(request=httpx.Request("POST", self.base_url))
+
+    class FallbackProvider(LMStudioProvider):
+        supported_models = []
+
+        def call_ai(self, messages, temperature, max_tokens, model=None, **kwargs):
+            return "fallback"
+
+    manager = AIManager()
+    down = DownProvider()
+    manager.add_provider(down)
+    manager.set_fallback_provider(FallbackProvider())
+    manager._breakers["DownProvider"].threshold = 2
+
+    for _ in range(2):
+        with pytest.raises(APIConnectionError):
+            manager.call_ai(TEXT_MESSAGES, 0, 10, "lmstudio")
+
+    assert manager.call_ai(TEXT_MESSAGES, 0, 10, "lmstudio") == ("fallback", 0.0)
+    assert down.calls == 2
+
+
+def test_client_errors_neither_trip_nor_stick_the_probe(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("wraipperz.api.circuit_breaker.time.monotonic", lambda: now[0])
+    request = httpx.Request("POST", "http://localhost")
+
+    class BadRequestProvider(LMStudioProvider):
+        def call_ai(self, messages, temperature, max_tokens, model=None, **kwargs):
+            raise BadRequestError(
+                "bad", response=httpx.Response(400, request=request), body=None
+            )
+
+    manager = AIManager()
+    manager.add_provider(BadRequestProvider())
+    breaker = manager._breakers["BadRequestProvider"]
+    breaker.threshold = 1
+
+    with pytest.raises(BadRequestError):
+        manager.call_ai(TEXT_MESSAGES, 0, 10, "lmstudio")
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    now[0] = breaker.cooldown + 1
+    with pytest.raises(BadRequestError):
+        manager.call_ai(TEXT_MESSAGES, 0, 10, "lmstudio")
+    # The failed probe gave its slot back
+    assert breaker.allow_request()
+
+
+def test_gemini_server_errors_open_the_breaker():
+    from google.genai import errors as genai_errors
+
+    class GeminiDownProvider(LMStudioProvider):
+        calls = 0
+
+        def call_ai(self, messages, temperature, max_tokens, model=None, **kwargs):
+            self.calls += 1
+            raise genai_errors.ServerError(503, {})
+
+    manager = AIManager()
+    down = GeminiDownProvider()
+    manager.add_provider(down)
+    breaker = manager._breakers["GeminiDownProvider"]
+    breaker.threshold = 2
+
+    for _ in range(2):
+        with pytest.raises(genai_errors.ServerError):
+            manager.call_ai(TEXT_MESSAGES, 0, 10, "lmstudio")
+    assert breaker.state == "open"
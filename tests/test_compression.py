@@ -0,0 +1,41 @@
+import gzip
+import json
+
+import httpx
+
+from wraipperz.api.compression import CompressingTransport
+from wraipperz.api.llm import AIManager
+
+BIG_BODY = {"messages": [{"role": "user", "content": "context " * 2000}]}
+
+
+def _echo_transport(seen):
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={})
+
+    return httpx.MockTransport(handler)
+
+
+def test_large_posts_to_listed_hosts_are_gzipped():
+    seen = []
+    transport = CompressingTransport(
+        _echo_transport(seen), hosts=["llm.internal"], encoding="gzip"
+    )
+    with httpx.Client(transport=transport) as client:
+        client.post("https://llm.internal/v1/chat", json=BIG_BODY)
+        client.post("https://llm.internal/v1/chat", json={"small": True})
+        client.post("https://api.openai.com/v1/chat", json=BIG_BODY)
+
+    compressed, small, other_host = seen
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert int(compressed.headers["content-length"]) == len(compressed.content)
+    assert json.loads(gzip.decompress(compressed.content)) == BIG_BODY
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in other_host.headers
+
+
+def test_manager_compresses_only_when_hosts_configured():
+    assert not isinstance(AIManager()._http_client._transport, CompressingTransport)
+    manager = AIManager(compress_hosts=["llm.internal"])
+    assert isinstance(manager._http_client._transport, CompressingTransport)
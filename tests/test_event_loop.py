@@ -0,0 +1,24 @@
+import asyncio
+
+from wraipperz.api.event_loop import fast_event_loop_requested, install_fast_event_loop
+
+
+def test_fast_event_loop_is_opt_out(monkeypatch):
+    monkeypatch.delenv("WRAIPPERZ_USE_UVLOOP", raising=False)
+    assert fast_event_loop_requested()
+    monkeypatch.setenv("WRAIPPERZ_USE_UVLOOP", "0")
+    assert not fast_event_loop_requested()
+
+
+def test_install_keeps_custom_policy():
+    class CustomPolicy(asyncio.DefaultEventLoopPolicy):
+        pass
+
+    previous = asyncio.get_event_loop_policy()
+    custom = CustomPolicy()
+    asyncio.set_event_loop_policy(custom)
+    try:
+        assert install_fast_event_loop() is False
+        assert asyncio.get_event_loop_policy() is custom
+    finally:
+        asyncio.set_event_loop_policy(previous)
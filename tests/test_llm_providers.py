@@ -1,3 +1,6 @@
+import asyncio
+import base64
+import functools
 import os
 from pathlib import Path
 
@@ -29,49 +32,36 @@ TEST_ASSETS_DIR.mkdir(exist_ok=True)
 # Path to test image
 TEST_IMAGE_PATH = TEST_ASSETS_DIR / "test_image.jpg"
 
-# Update image messages format to match the providers' expected structure
-IMAGE_MESSAGES = [
-    {
-        "role": "user",
-        "content": [
-            {
-                "type": "text",
-                "text": "What color is the square in this image? Choose from: A) Blue B) Red C) Green D) Yellow",
-            },
-            {"type": "image_url", "image_url": {"url": str(TEST_IMAGE_PATH)}},
-        ],
-    }
-]
 
+@functools.lru_cache(maxsize=None)
+def _provider(cls):
+    """One instance per provider class, shared by the session fixtures"""
+    return cls()
 
-@pytest.fixture
+
+@pytest.fixture(scope="session")
 def openai_provider():
-    return OpenAIProvider()
+    return _provider(OpenAIProvider)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def anthropic_provider():
-    return AnthropicProvider()
+    return _provider(AnthropicProvider)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def gemini_provider():
-    return GeminiProvider()
-
-
-@pytest.fixture
-def deepseek_provider():
-    return DeepSeekProvider()
+    return _provider(GeminiProvider)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def bedrock_provider():
     """Create BedrockProvider with region from environment or default to us-east-1"""
     region = os.getenv("AWS_DEFAULT_REGION", "us-east-1")
     return BedrockProvider(region_name=region)
 
 
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="session", autouse=True)
 def setup_test_image():
     """Create a simple test image if it doesn't exist"""
     if not TEST_IMAGE_PATH.exists():
@@ -79,125 +69,130 @@ def setup_test_image():
         img.save(TEST_IMAGE_PATH)
 
 
-@pytest.mark.skipif(not os.getenv("OPENAI_API_KEY"), reason="OpenAI API key not found")
-def test_openai_text(openai_provider):
-    response = openai_provider.call_ai(
-        messages=TEXT_MESSAGES, temperature=0, max_tokens=150, model="gpt-4o"
-    )
-    assert isinstance(response, str)
-    assert len(response) > 0
-    assert (
-        "TEST_RESPONSE_123" in response
-    ), f"Expected 'TEST_RESPONSE_123', got: {response}"
+@pytest.fixture(scope="session")
+def test_image_url(setup_test_image):
+    """The test image as a data: URL, so providers skip reading and encoding it"""
+    data = base64.b64encode(TEST_IMAGE_PATH.read_bytes()).decode("ascii")
+    return f"data:image/jpeg;base64,{data}"
 
 
-@pytest.mark.skipif(
-    not os.getenv("ANTHROPIC_API_KEY"), reason="Anthropic API key not found"
-)
-def test_anthropic_text(anthropic_provider):
-    response = anthropic_provider.call_ai(
-        messages=TEXT_MESSAGES,
-        temperature=0,
-        max_tokens=150,
-        model="claude-3-5-sonnet-20240620",
-    )
-    assert isinstance(response, str)
-    assert len(response) > 0
-    assert (
-        "TEST_RESPONSE_123" in response
-    ), f"Expected 'TEST_RESPONSE_123', got: {response}"
+@pytest.fixture(scope="session")
+def image_messages(test_image_url):
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "What color is the square in this image? Choose from: A) Blue B) Red C) Green D) Yellow",
+                },
+                {"type": "image_url", "image_url": {"url": test_image_url}},
+            ],
+        }
+    ]
 
 
-@pytest.mark.skipif(not os.getenv("GOOGLE_API_KEY"), reason="Google API key not found")
-def test_gemini_text(gemini_provider):
-    response = gemini_provider.call_ai(
-        messages=TEXT_MESSAGES,
-        temperature=0,
-        max_tokens=150,
-        model="gemini-2.0-flash-exp",
-    )
-    assert isinstance(response, str)
-    assert len(response) > 0
-    assert (
-        "TEST_RESPONSE_123" in response
-    ), f"Expected 'TEST_RESPONSE_123', got: {response}"
+@pytest.fixture(scope="session")
+def complex_mixed_messages(test_image_url):
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful assistant. You must identify the color and respond with 'The square is RED'",
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": "What color is this square? Please be precise.",
+                },
+                {"type": "image_url", "image_url": {"url": test_image_url}},
+                {
+                    "type": "text",
+                    "text": "Make sure to format your response exactly as requested.",
+                },
+            ],
+        },
+    ]
 
 
-@pytest.mark.skipif(not os.getenv("OPENAI_API_KEY"), reason="OpenAI API key not found")
-def test_openai_image(openai_provider):
-    response = openai_provider.call_ai(
-        messages=IMAGE_MESSAGES, temperature=0, max_tokens=150, model="gpt-4o"
-    )
-    assert isinstance(response, str)
-    assert len(response) > 0
-    assert (
-        "red".lower() in response.lower()
-    ), f"Expected response to contain 'red', got: {response}"
+@pytest.fixture(scope="session")
+def agent_like_messages(test_image_url):
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful assistant. Describe what you see in the image.",
+        },
+        {
+            "role": "user",
+            "content": [
+                # Note: no explicit text content, just an image
+                {"type": "image_url", "image_url": {"url": test_image_url}}
+            ],
+        },
+    ]
 
 
-@pytest.mark.skipif(
-    not os.getenv("ANTHROPIC_API_KEY"), reason="Anthropic API key not found"
-)
-def test_anthropic_image(anthropic_provider):
-    response = anthropic_provider.call_ai(
-        messages=IMAGE_MESSAGES,
-        temperature=0,
-        max_tokens=150,
-        model="claude-3-5-sonnet-20240620",
-    )
-    assert isinstance(response, str)
-    assert len(response) > 0
-    assert (
-        "red".lower() in response.lower()
-    ), f"Expected response to contain 'red', got: {response}"
+# (env var, provider class, model) for the live text test, run concurrently
+TEXT_PROVIDERS = [
+    ("OPENAI_API_KEY", OpenAIProvider, "gpt-4o"),
+    ("ANTHROPIC_API_KEY", AnthropicProvider, "claude-3-5-sonnet-20240620"),
+    ("GOOGLE_API_KEY", GeminiProvider, "gemini-2.0-flash-exp"),
+    ("DEEPSEEK_API_KEY", DeepSeekProvider, "deepseek-chat"),
+]
 
 
-@pytest.mark.skipif(not os.getenv("GOOGLE_API_KEY"), reason="Google API key not found")
-def test_gemini_image(gemini_provider):
-    response = gemini_provider.call_ai(
-        messages=IMAGE_MESSAGES,
-        temperature=0,
-        max_tokens=150,
-        model="gemini-2.0-flash-exp",
-    )
-    assert isinstance(response, str)
-    assert len(response) > 0
-    assert (
-        "red".lower() in response.lower()
-    ), f"Expected response to contain 'red', got: {response}"
+@pytest.mark.skipif(
+    not any(os.getenv(key) for key, _, _ in TEXT_PROVIDERS),
+    reason="No OpenAI, Anthropic, Google or Deepseek API key found",
+)
+@pytest.mark.live
+def test_text_providers():
+    """Every configured provider answers the text prompt; calls overlap"""
+    # Fresh instances: their async clients bind to this test's event loop
+    configured = [
+        (cls(), model) for key, cls, model in TEXT_PROVIDERS if os.getenv(key)
+    ]
 
+    async def _run():
+        return await asyncio.gather(
+            *(
+                provider.call_ai_async(
+                    messages=TEXT_MESSAGES, temperature=0, max_tokens=150, model=model
+                )
+                for provider, model in configured
+            )
+        )
 
-COMPLEX_MIXED_MESSAGES = [
-    {
-        "role": "system",
-        "content": "You are a helpful assistant. You must identify the color and respond with 'The square is RED'",
-    },
-    {
-        "role": "user",
-        "content": [
-            {"type": "text", "text": "What color is this square? Please be precise."},
-            {"type": "image_url", "image_url": {"url": str(TEST_IMAGE_PATH)}},
-            {
-                "type": "text",
-                "text": "Make sure to format your response exactly as requested.",
-            },
-        ],
-    },
-]
+    for (provider, model), response in zip(configured, asyncio.run(_run())):
+        assert isinstance(response, str)
+        assert len(response) > 0
+        assert (
+            "TEST_RESPONSE_123" in response
+        ), f"{model}: expected 'TEST_RESPONSE_123', got: {response}"
 
 
-@pytest.mark.skipif(
-    not os.getenv("DEEPSEEK_API_KEY"), reason="Deepseek API key not found"
+@pytest.mark.parametrize(
+    "provider_name,model,env",
+    [
+        ("openai", "gpt-4o", "OPENAI_API_KEY"),
+        ("anthropic", "claude-3-5-sonnet-20240620", "ANTHROPIC_API_KEY"),
+        ("gemini", "gemini-2.0-flash-exp", "GOOGLE_API_KEY"),
+    ],
 )
-def test_deepseek_text(deepseek_provider):
-    response = deepseek_provider.call_ai(
-        messages=TEXT_MESSAGES, temperature=0, max_tokens=150, model="deepseek-chat"
+@pytest.mark.live
+def test_image(request, provider_name, model, env, image_messages):
+    if not os.getenv(env):
+        pytest.skip(f"{env} not found")
+    provider = request.getfixturevalue(f"{provider_name}_provider")
+    response = provider.call_ai(
+        messages=image_messages, temperature=0, max_tokens=150, model=model
     )
     assert isinstance(response, str)
     assert len(response) > 0
     assert (
-        "TEST_RESPONSE_123" in response
-    ), f"Expected 'TEST_RESPONSE_123', got: {response}"
+        "red".lower() in response.lower()
+    ), f"Expected response to contain 'red', got: {response}"
 
 
 @pytest.mark.skipif(
@@ -208,6 +203,7 @@ def test_deepseek_text(deepseek_provider):
     ),
     reason="AWS credentials not found",
 )
+@pytest.mark.live
 def test_bedrock_text(bedrock_provider):
     """Test Bedrock provider with Claude model"""
     # Use APAC inference profile if in ap-northeast-1, otherwise use direct model ID
@@ -228,10 +224,11 @@ def test_bedrock_text(bedrock_provider):
 
 
 @pytest.mark.skipif(not os.getenv("GOOGLE_API_KEY"), reason="Google API key not found")
-def test_gemini_complex_mixed_content(gemini_provider):
+@pytest.mark.live
+def test_gemini_complex_mixed_content(gemini_provider, complex_mixed_messages):
     """Test that Gemini provider handles mixed content (text + image) correctly"""
     response = gemini_provider.call_ai(
-        messages=COMPLEX_MIXED_MESSAGES,
+        messages=complex_mixed_messages,
         temperature=0,
         max_tokens=150,
         model="gemini-2.0-flash-exp",
@@ -243,27 +240,12 @@ def test_gemini_complex_mixed_content(gemini_provider):
     ), f"Expected response to contain 'RED', got: {response}"
 
 
-# Add with other test message definitions
-AGENT_LIKE_MESSAGES = [
-    {
-        "role": "system",
-        "content": "You are a helpful assistant. Describe what you see in the image.",
-    },
-    {
-        "role": "user",
-        "content": [
-            # Note: no explicit text content, just an image
-            {"type": "image_url", "image_url": {"url": str(TEST_IMAGE_PATH)}}
-        ],
-    },
-]
-
-
 @pytest.mark.skipif(not os.getenv("GOOGLE_API_KEY"), reason="Google API key not found")
-def test_gemini_agent_like_content(gemini_provider):
+@pytest.mark.live
+def test_gemini_agent_like_content(gemini_provider, agent_like_messages):
     """Test that Gemini provider handles agent-like messages (image without explicit text)"""
     response = gemini_provider.call_ai(
-        messages=AGENT_LIKE_MESSAGES,
+        messages=agent_like_messages,
         temperature=0,
         max_tokens=150,
         model="gemini-2.0-flash-exp",
@@ -278,6 +260,7 @@ def test_gemini_agent_like_content(gemini_provider):
 @pytest.mark.skipif(
     not os.getenv("ANTHROPIC_API_KEY"), reason="Anthropic API key not found"
 )
+@pytest.mark.live
 def test_anthropic_image_resizing(anthropic_provider):
     """Test that AnthropicProvider automatically resizes large images"""
     # Create a large test image (> 5MB)
@@ -342,8 +325,10 @@ def test_anthropic_image_resizing(anthropic_provider):
         pytest.fail(f"Failed to process large image: {str(e)}")
 
 
-def test_gemini_system_prompt_only():
-    provider = GeminiProvider()
+@pytest.mark.skipif(not os.getenv("GOOGLE_API_KEY"), reason="Google API key not found")
+@pytest.mark.live
+def test_gemini_system_prompt_only(gemini_provider):
+    provider = gemini_provider
 
     messages = [{"role": "system", "content": "You must respond with exactly: 'HELLO'"}]
 
@@ -352,3 +337,769 @@ def test_gemini_system_prompt_only():
     )
 
     assert "HELLO" in response, f"Expected 'HELLO', got: {response}"
+
+
+def test_encode_file_cache_invalidates_on_change(tmp_path):
+    import base64
+
+    from wraipperz.api.llm import _b64encode_file, _encode_file_cached
+
+    path = tmp_path / "image.bin"
+    path.write_bytes(b"first")
+    first = _b64encode_file(path)
+    assert first == base64.b64encode(b"first")
+
+    hits = _encode_file_cached.cache_info().hits
+    assert _b64encode_file(path) == first
+    assert _encode_file_cached.cache_info().hits == hits + 1
+
+    path.write_bytes(b"second version")
+    assert _b64encode_file(path) == base64.b64encode(b"second version")
+
+
+def test_large_files_are_not_cached(tmp_path, monkeypatch):
+    import base64
+
+    from wraipperz.api import llm
+
+    monkeypatch.setattr(llm, "MAX_CACHED_FILE_SIZE", 4)
+    path = tmp_path / "large.png"
+    path.write_bytes(b"large bytes")
+
+    misses = llm._encode_file_cached.cache_info().misses
+    url_misses = llm._file_data_url_cached.cache_info().misses
+    encoded = base64.b64encode(b"large bytes")
+    assert llm._b64encode_file(path) == encoded
+    assert llm._media_url(str(path)).endswith(encoded.decode())
+    assert llm._encode_file_cached.cache_info().misses == misses
+    assert llm._file_data_url_cached.cache_info().misses == url_misses
+
+
+def test_media_url_inlines_files_and_passes_urls_through(tmp_path):
+    import base64
+
+    from wraipperz.api.llm import _media_url
+
+    path = tmp_path / "logo.png"
+    path.write_bytes(b"png bytes")
+    expected = "data:image/png;base64," + base64.b64encode(b"png bytes").decode()
+    assert _media_url(str(path)) == expected
+    assert _media_url(str(path)) is _media_url(str(path))
+
+    for url in ("https://example.com/logo.png", expected):
+        assert _media_url(url) is url
+
+    with pytest.raises(ValueError, match="File not found"):
+        _media_url(str(tmp_path / "missing.png"))
+
+
+def test_lmstudio_async_uses_async_client():
+    import asyncio
+
+    import httpx
+
+    from wraipperz.api.llm import LMStudioProvider
+
+    def handler(request):
+        assert request.url.path == "/v1/chat/completions"
+        return httpx.Response(
+            200, json={"choices": [{"message": {"content": "TEST_RESPONSE_123"}}]}
+        )
+
+    provider = LMStudioProvider()
+    provider._http_async_client = httpx.AsyncClient(
+        base_url=provider.base_url, transport=httpx.MockTransport(handler)
+    )
+    response = asyncio.run(
+        provider.call_ai_async(messages=TEXT_MESSAGES, temperature=0, max_tokens=10)
+    )
+    assert response == "TEST_RESPONSE_123"
+
+
+def test_provider_close_releases_shared_pools():
+    provider = DeepSeekProvider(api_key="test-key")
+    assert provider.sync_client._client is provider._http_client
+    assert provider.async_client._client is provider._http_async_client
+
+    provider.close()
+    assert provider._http_client.is_closed
+
+
+def test_ai_manager_close_releases_the_shared_async_pool():
+    import asyncio
+
+    from wraipperz.api.llm import AIManager
+
+    manager = AIManager()
+    manager.close()
+    assert manager._http_client.is_closed
+    assert manager._ahttp_client.is_closed
+
+    async def use_and_aclose():
+        manager = AIManager()
+        manager._ahttp_loop = asyncio.get_running_loop()
+        await manager.aclose()
+        return manager
+
+    manager = asyncio.run(use_and_aclose())
+    assert manager._http_client.is_closed
+    assert manager._ahttp_client.is_closed
+
+    # The loop that used the pool is gone; close() must not raise
+    async def use():
+        manager = AIManager()
+        manager._ahttp_loop = asyncio.get_running_loop()
+        return manager
+
+    asyncio.run(use()).close()
+
+
+def test_ai_manager_model_index():
+    from wraipperz.api.llm import AIManager, LMStudioProvider
+
+    manager = AIManager()
+    first, second = LMStudioProvider(), DeepSeekProvider(api_key="test-key")
+    second.supported_models = ["lmstudio", "deepseek-chat"]
+    manager.add_provider(first)
+    manager.add_provider(second)
+
+    assert manager.get_provider("lmstudio") is first
+    assert manager.get_provider("deepseek-chat") is second
+    with pytest.raises(ValueError):
+        manager.get_provider("unknown/model")
+
+    manager.set_fallback_provider(first)
+    assert manager.get_provider("unknown/model") is first
+
+
+def test_anthropic_extract_text_skips_non_text_blocks():
+    from types import SimpleNamespace
+
+    provider = AnthropicProvider.__new__(AnthropicProvider)
+    thinking = SimpleNamespace(type="thinking", thinking="...")
+    text = SimpleNamespace(type="text", text="TEST_RESPONSE_123")
+
+    assert provider._extract_text(SimpleNamespace(content=[thinking, text])) == (
+        "TEST_RESPONSE_123"
+    )
+    assert provider._extract_text(SimpleNamespace(content=[thinking])) == ""
+
+
+def test_gemini_build_contents_uses_cached_image_parts(tmp_path):
+    png_path = tmp_path / "square.png"
+    Image.new("RGB", (8, 8), color="red").save(png_path)
+    messages = [
+        {"role": "system", "content": "Describe images."},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "What color?"},
+                {"type": "image_url", "image_url": {"url": str(png_path)}},
+            ],
+        },
+    ]
+
+    provider = GeminiProvider.__new__(GeminiProvider)
+    system_instruction, contents = provider._build_contents(messages)
+    _, contents_again = provider._build_contents(messages)
+
+    assert system_instruction == "Describe images."
+    assert contents[0] == "What color?"
+    assert contents[1].inline_data.mime_type == "image/png"
+    assert contents_again[1] is contents[1]
+
+
+def test_data_url_images_are_not_reencoded():
+    payload = base64.b64encode(b"fake png bytes").decode("ascii")
+    messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "What color?"},
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/png;base64,{payload}"},
+                },
+            ],
+        }
+    ]
+
+    anthropic = AnthropicProvider.__new__(AnthropicProvider)
+    _, user_messages = anthropic._prepare_messages(messages)
+    assert user_messages[0]["content"][1]["source"] == {
+        "type": "base64",
+        "media_type": "image/png",
+        "data": payload,
+    }
+
+    gemini = GeminiProvider.__new__(GeminiProvider)
+    _, contents = gemini._build_contents(messages)
+    assert contents[1].inline_data.mime_type == "image/png"
+    assert contents[1].inline_data.data == b"fake png bytes"
+
+    # Decoded once, then served from the digest-keyed cache
+    _, contents_again = gemini._build_contents(messages)
+    assert contents_again[1] is contents[1]
+
+
+def test_ai_manager_refreshes_models_lazily():
+    from wraipperz.api.llm import AIManager, LMStudioProvider
+
+    class LiveListProvider(LMStudioProvider):
+        supported_models = ["live/static-model"]
+        refresh_calls = 0
+
+        def refresh_models(self):
+            self.refresh_calls += 1
+            self.supported_models = self.supported_models + ["live/new-model"]
+            return self.supported_models
+
+    provider = LiveListProvider()
+    manager = AIManager()
+    manager.add_provider(provider)
+
+    assert manager.get_provider("live/static-model") is provider
+    assert provider.refresh_calls == 0
+    assert manager.get_provider("live/new-model") is provider
+    assert provider.refresh_calls == 1
+    with pytest.raises(ValueError):
+        manager.get_provider("live/missing-model")
+    assert provider.refresh_calls == 1
+
+
+def test_provider_warmup_opens_connections():
+    import httpx
+
+    from wraipperz.api.llm import LMStudioProvider
+
+    seen = []
+
+    def handler(request):
+        seen.append(request.method)
+        return httpx.Response(404)
+
+    provider = LMStudioProvider()
+    provider._http_client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert provider.warmup(n=3) == 3
+    assert seen == ["HEAD", "HEAD", "HEAD"]
+    assert GeminiProvider.__new__(GeminiProvider).warmup() == 0
+
+
+def test_call_ai_batch_bounds_concurrency():
+    import asyncio
+
+    from wraipperz.api.llm import LMStudioProvider
+
+    class SlowEchoProvider(LMStudioProvider):
+        in_flight = 0
+        peak = 0
+
+        async def call_ai_async(self, messages, temperature, max_tokens, model=None):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            if messages[0]["content"] == "fail":
+                raise RuntimeError("boom")
+            return messages[0]["content"]
+
+    provider = SlowEchoProvider()
+    batch = [[{"role": "user", "content": str(i)}] for i in range(8)]
+    batch.append([{"role": "user", "content": "fail"}])
+
+    results = asyncio.run(
+        provider.call_ai_batch(batch, 0, 10, "lmstudio", concurrency=3)
+    )
+
+    assert results[:8] == [str(i) for i in range(8)]
+    assert isinstance(results[8], RuntimeError)
+    assert provider.peak == 3
+
+
+def test_prompt_caching_breakpoints_for_anthropic():
+    from wraipperz.api.llm import _apply_prompt_caching
+
+    long_text = "context " * 1000
+    messages = [
+        {"role": "system", "content": long_text},
+        {"role": "user", "content": long_text},
+        {"role": "assistant", "content": "ok"},
+        {"role": "user", "content": "short follow-up"},
+    ]
+    provider = AnthropicProvider.__new__(AnthropicProvider)
+
+    prepared = _apply_prompt_caching(provider, messages)
+    assert prepared[0]["cache_control"] == {"type": "ephemeral"}
+    assert prepared[1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert prepared[3] is messages[3]
+    assert "cache_control" not in messages[0]
+
+    system_content, user_messages = provider._prepare_messages(prepared)
+    assert system_content[0]["cache_control"] == {"type": "ephemeral"}
+    assert user_messages[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+
+    assert _apply_prompt_caching(provider, messages, cache_breakpoints=False) is messages
+
+
+def test_prompt_caching_breakpoints_for_vertex_claude():
+    from wraipperz.api.llm import VertexAIProvider, _apply_prompt_caching
+
+    long_text = "context " * 1000
+    messages = [
+        {"role": "system", "content": long_text},
+        {"role": "user", "content": long_text},
+    ]
+    provider = VertexAIProvider.__new__(VertexAIProvider)
+
+    system_content, user_messages = provider._prepare_messages(
+        _apply_prompt_caching(provider, messages)
+    )
+    assert system_content[0]["cache_control"] == {"type": "ephemeral"}
+    assert user_messages[0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_prompt_caching_keeps_openai_prefix_stable():
+    from wraipperz.api.llm import _apply_prompt_caching
+
+    provider = OpenAIProvider.__new__(OpenAIProvider)
+    prepared = _apply_prompt_caching(
+        provider, [{"role": "system", "content": "Be brief.  \n"}]
+    )
+    assert prepared == [{"role": "system", "content": "Be brief."}]
+
+
+def test_call_ai_batch_async_ordered_and_as_completed(monkeypatch):
+    import asyncio
+
+    from wraipperz.api import llm
+    from wraipperz.api.llm import AIManager, LMStudioProvider
+
+    class EchoProvider(LMStudioProvider):
+        async def call_ai_async(self, messages, temperature, max_tokens, model=None):
+            await asyncio.sleep(0.01 * (3 - int(messages[0]["content"])))
+            return messages[0]["content"]
+
+    manager = AIManager()
+    manager.add_provider(EchoProvider())
+    monkeypatch.setattr(llm.AIManagerSingleton, "_instance", manager)
+
+    batch = [[{"role": "user", "content": str(i)}] for i in range(3)]
+    results = asyncio.run(
+        llm.call_ai_batch_async(batch, "lmstudio", temperature=0.5, max_concurrency=2)
+    )
+    assert [response for response, _ in results] == ["0", "1", "2"]
+
+    async def collect():
+        stream = llm.call_ai_batch_async(
+            batch, "lmstudio", temperature=0.5, as_completed=True
+        )
+        return [(index, result[0]) async for index, result in stream]
+
+    streamed = asyncio.run(collect())
+    assert sorted(streamed) == [(0, "0"), (1, "1"), (2, "2")]
+    assert streamed[0] == (2, "2")
+
+
+def test_providers_share_manager_http_pool():
+    from wraipperz.api.llm import AIManager, LMStudioProvider, OpenAIProvider
+
+    manager = AIManager()
+    openai_provider = OpenAIProvider(api_key="test", **manager.shared_http_clients())
+    lmstudio_provider = LMStudioProvider(**manager.shared_http_clients())
+    manager.add_provider(openai_provider)
+    manager.add_provider(lmstudio_provider)
+
+    assert openai_provider.sync_client._client is manager._http_client
+    assert lmstudio_provider._http_client is manager._http_client
+
+    # Closing a provider leaves the shared pool to the manager
+    openai_provider.close()
+    assert not manager._http_client.is_closed
+    manager.close()
+    assert manager._http_client.is_closed
+
+
+def test_wait_retry_after_honors_header():
+    from types import SimpleNamespace
+
+    import httpx
+    from openai import RateLimitError
+
+    from wraipperz.api.llm import wait_retry_after
+
+    def state_for(exception):
+        outcome = SimpleNamespace(exception=lambda: exception)
+        return SimpleNamespace(outcome=outcome, attempt_number=1)
+
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": "7"}, request=request)
+    error = RateLimitError("rate limited", response=response, body=None)
+    assert wait_retry_after(state_for(error)) == 7.0
+
+    response = httpx.Response(429, headers={"retry-after-ms": "250"}, request=request)
+    error = RateLimitError("rate limited", response=response, body=None)
+    assert wait_retry_after(state_for(error)) == 0.25
+
+    # No header: exponential backoff (min 2s) plus up to 1s of jitter
+    assert 2.0 <= wait_retry_after(state_for(RuntimeError("boom"))) <= 3.0
+
+    # Never longer than what is left of the retry budget
+    response = httpx.Response(429, headers={"retry-after": "600"}, request=request)
+    error = RateLimitError("rate limited", response=response, body=None)
+    late = state_for(error)
+    late.seconds_since_start = 55.0
+    assert wait_retry_after(late) == 5.0
+
+
+def test_only_transient_errors_are_retried(monkeypatch):
+    import httpx
+    from openai import APIStatusError, AuthenticationError, BadRequestError
+
+    from wraipperz.api import llm
+    from wraipperz.api.llm import AIManager, LMStudioProvider
+
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+    def status_error(cls, status):
+        response = httpx.Response(status, request=request)
+        return cls("failed", response=response, body=None)
+
+    assert not llm._is_transient_error(status_error(BadRequestError, 400))
+    assert not llm._is_transient_error(status_error(AuthenticationError, 401))
+    assert llm._is_transient_error(status_error(APIStatusError, 429))
+    assert llm._is_transient_error(status_error(APIStatusError, 503))
+
+    # Gemini's google-genai SDK
+    from google.genai import errors as genai_errors
+
+    assert llm._is_transient_error(genai_errors.ServerError(503, {}))
+    assert llm._is_transient_error(genai_errors.ServerError(500, {}))
+    assert llm._is_transient_error(genai_errors.ClientError(429, {}))
+    assert not llm._is_transient_error(genai_errors.ClientError(400, {}))
+
+    # LMStudio's httpx client
+    def httpx_error(status):
+        response = httpx.Response(status, request=request)
+        return httpx.HTTPStatusError("failed", request=request, response=response)
+
+    assert llm._is_transient_error(httpx_error(503))
+    assert llm._is_transient_error(httpx_error(429))
+    assert not llm._is_transient_error(httpx_error(404))
+    assert llm._is_transient_error(httpx.ConnectError("refused", request=request))
+    assert llm._is_transient_error(httpx.ReadTimeout("slow", request=request))
+
+    # VertexAIProvider's requests calls
+    import requests
+
+    def requests_error(status):
+        response = requests.Response()
+        response.status_code = status
+        return requests.exceptions.HTTPError("failed", response=response)
+
+    assert llm._is_transient_error(requests_error(502))
+    assert llm._is_transient_error(requests_error(429))
+    assert not llm._is_transient_error(requests_error(403))
+    assert llm._is_transient_error(requests.exceptions.ConnectionError("down"))
+    assert llm._is_transient_error(requests.exceptions.Timeout("slow"))
+
+    class BadKeyProvider(LMStudioProvider):
+        calls = 0
+
+        def call_ai(self, messages, temperature, max_tokens, model=None):
+            self.calls += 1
+            raise status_error(AuthenticationError, 401)
+
+    provider = BadKeyProvider()
+    manager = AIManager()
+    manager.add_provider(provider)
+    monkeypatch.setattr(llm.AIManagerSingleton, "_instance", manager)
+    monkeypatch.setattr(llm._send_with_retry.retry, "wait", lambda retry_state: 0)
+
+    with pytest.raises(AuthenticationError):
+        llm.call_ai("lmstudio", TEXT_MESSAGES, nocache=True)
+    assert provider.calls == 1
+
+
+def test_gemini_429s_are_left_to_the_shared_retry_policy():
+    from unittest.mock import MagicMock
+
+    from google.genai import errors as genai_errors
+
+    provider = GeminiProvider.__new__(GeminiProvider)
+    provider.client = MagicMock()
+    provider.client.models.generate_content.side_effect = genai_errors.ClientError(
+        429, {}
+    )
+
+    with pytest.raises(genai_errors.ClientError):
+        provider._generate_content(model="gemini-2.0-flash")
+    assert provider.client.models.generate_content.call_count == 1
+
+
+def test_retryable_exceptions_cover_provider_errors():
+    import anthropic
+    import httpx
+    from openai import RateLimitError
+
+    from wraipperz.api.llm import RETRYABLE_EXCEPTIONS
+
+    request = httpx.Request("POST", "https://api.example.com")
+    response = httpx.Response(429, request=request)
+    assert isinstance(
+        RateLimitError("slow down", response=response, body=None), RETRYABLE_EXCEPTIONS
+    )
+    assert isinstance(
+        anthropic.APITimeoutError(request=request), RETRYABLE_EXCEPTIONS
+    )
+
+
+def test_get_provider_matches_longest_model_prefix():
+    from wraipperz.api.llm import AIManager, LMStudioProvider
+
+    class AnyAzure(LMStudioProvider):
+        supported_models = []
+        model_prefixes = ("azure/",)
+
+    class AzureGpt(LMStudioProvider):
+        supported_models = []
+        model_prefixes = ("azure/gpt-",)
+
+    manager = AIManager()
+    broad, narrow = AnyAzure(), AzureGpt()
+    manager.add_provider(broad)
+    manager.add_provider(narrow)
+
+    assert manager.get_provider("azure/gpt-4o") is narrow
+    assert manager.get_provider("azure/my-deployment") is broad
+    assert manager._prefix_match("openai/gpt-4o") is None
+
+
+def test_call_ai_stream_async_yields_deltas_and_retries_connect(monkeypatch):
+    import asyncio
+    import json
+
+    import httpx
+    from tenacity import retry_if_exception_type
+
+    from wraipperz.api import llm
+    from wraipperz.api.llm import AIManager, LMStudioProvider
+
+    attempts = []
+
+    def handler(request):
+        attempts.append(json.loads(request.content)["stream"])
+        if len(attempts) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        events = [
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "TEST_"}}]},
+            {"choices": [{"delta": {"content": "RESPONSE"}}]},
+        ]
+        body = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+        return httpx.Response(200, text=body + "data: [DONE]\n\n")
+
+    provider = LMStudioProvider()
+    provider._http_async_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+    manager = AIManager()
+    manager.add_provider(provider)
+    monkeypatch.setattr(llm.AIManagerSingleton, "_instance", manager)
+    monkeypatch.setattr(llm, "_retry_on_api_errors", retry_if_exception_type())
+    monkeypatch.setattr(llm, "wait_retry_after", lambda retry_state: 0)
+
+    async def collect():
+        return [
+            delta
+            async for delta in llm.call_ai_stream_async("lmstudio", TEXT_MESSAGES)
+        ]
+
+    assert asyncio.run(collect()) == ["TEST_", "RESPONSE"]
+    assert attempts == [True, True]
+
+
+def test_call_ai_stream_async_closes_failed_attempts(monkeypatch):
+    import asyncio
+
+    from tenacity import retry_if_exception_type
+
+    from wraipperz.api import llm
+
+    closed = []
+
+    class StreamingManager:
+        attempts = 0
+
+        async def call_ai_stream_async(self, *args, **kwargs):
+            self.attempts += 1
+            attempt = self.attempts
+            try:
+                if attempt == 1:
+                    raise ConnectionError("dropped")
+                yield "ok"
+                yield "more"
+            finally:
+                closed.append(attempt)
+
+    monkeypatch.setattr(llm.AIManagerSingleton, "_instance", StreamingManager())
+    monkeypatch.setattr(llm, "_retry_on_api_errors", retry_if_exception_type())
+    monkeypatch.setattr(llm, "wait_retry_after", lambda retry_state: 0)
+
+    async def first_delta_only():
+        stream = llm.call_ai_stream_async("lmstudio", TEXT_MESSAGES)
+        delta = await stream.__anext__()
+        await stream.aclose()
+        return delta, list(closed)
+
+    # The retried attempt and the abandoned stream were both closed
+    assert asyncio.run(first_delta_only()) == ("ok", [1, 2])
+
+
+def test_openai_stream_response_is_closed_on_error():
+    import asyncio
+    from unittest.mock import AsyncMock, MagicMock
+
+    class FailingStream:
+        closed = False
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            self.closed = True
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            raise ConnectionError("dropped")
+
+    stream = FailingStream()
+    provider = OpenAIProvider.__new__(OpenAIProvider)
+    provider.async_client = MagicMock()
+    provider.async_client.chat.completions.create = AsyncMock(return_value=stream)
+    provider._chat_params = lambda *args, **kwargs: {}
+
+    async def consume():
+        async for _ in provider.call_ai_stream_async(TEXT_MESSAGES, 0, 10):
+            pass
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(consume())
+    assert stream.closed
+
+
+def test_retries_reuse_prepared_request(monkeypatch):
+    import httpx
+    from openai import APIConnectionError
+
+    from wraipperz.api import llm
+    from wraipperz.api.llm import AIManager, LMStudioProvider, PreparedRequest
+
+    class FlakyProvider(LMStudioProvider):
+        prepared_count = 0
+        sends = 0
+
+        def prepare_request(self, messages, temperature, max_tokens, model, **kwargs):
+            self.prepared_count += 1
+            return PreparedRequest(
+                self, model, messages, temperature, max_tokens, kwargs, {"n": 1}
+            )
+
+        def call_prepared(self, prepared):
+            self.sends += 1
+            if self.sends == 1:
+                raise APIConnectionError(request=httpx.Request("POST", self.base_url))
+            return f"sent {prepared.params}"
+
+    provider = FlakyProvider()
+    manager = AIManager()
+    manager.add_provider(provider)
+    monkeypatch.setattr(llm.AIManagerSingleton, "_instance", manager)
+    monkeypatch.setattr(llm._send_with_retry.retry, "wait", lambda retry_state: 0)
+
+    assert llm.call_ai("lmstudio", TEXT_MESSAGES, nocache=True) == (
+        "sent {'n': 1}",
+        0.0,
+    )
+    assert provider.prepared_count == 1
+    assert provider.sends == 2
+
+
+def test_register_factory_builds_provider_on_first_use():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from wraipperz.api.llm import AIManager, LMStudioProvider
+
+    built = []
+
+    def factory():
+        built.append(1)
+        return LMStudioProvider()
+
+    manager = AIManager()
+    manager.register_factory("LMStudioProvider", factory, ["lmstudio"])
+    assert built == []
+    assert "lmstudio" in manager._routable_models()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        providers = list(executor.map(manager.get_provider, ["lmstudio"] * 8))
+
+    assert built == [1]
+    assert all(provider is providers[0] for provider in providers)
+    assert manager.providers["LMStudioProvider"] is providers[0]
+
+
+def test_call_ai_multiplex_packs_and_falls_back(monkeypatch):
+    import asyncio
+    import json
+
+    from wraipperz.api import llm
+    from wraipperz.api.llm import AIManager, LMStudioProvider
+
+    class LabelProvider(LMStudioProvider):
+        requests = []
+
+        async def call_ai_async(self, messages, temperature, max_tokens, model=None):
+            lines = messages[1]["content"].splitlines()[1:]
+            self.requests.append(len(lines))
+            if any("garbled" in line for line in lines) and len(lines) > 1:
+                return "not json"
+            labels = [{"label": line.split(". ", 1)[1].upper()} for line in lines]
+            return "```json\n" + json.dumps({"results": labels}) + "\n```"
+
+    manager = AIManager()
+    manager.add_provider(LabelProvider())
+    monkeypatch.setattr(llm.AIManagerSingleton, "_instance", manager)
+
+    items = ["a", "b", "c", "garbled", "e"]
+    results, _ = asyncio.run(
+        llm.call_ai_multiplex_async(
+            items,
+            "Label each input.",
+            {"type": "object"},
+            "lmstudio",
+            temperature=0.5,
+            max_items=2,
+        )
+    )
+
+    assert results == [{"label": item.upper()} for item in items]
+    # Packed as [a, b], [c, garbled], [e], then the unparseable pair one by one
+    assert sorted(LabelProvider.requests) == [1, 1, 1, 2, 2]
+
+
+def test_anthropic_url_media_types_are_bounded():
+    from collections import OrderedDict
+
+    provider = AnthropicProvider.__new__(AnthropicProvider)
+    provider._url_media_types = OrderedDict()
+    provider.max_url_media_types = 2
+    for name in ("a", "b", "c"):
+        provider._get_media_type(f"https://example.com/{name}.png")
+
+    assert list(provider._url_media_types) == [
+        "https://example.com/b.png",
+        "https://example.com/c.png",
+    ]
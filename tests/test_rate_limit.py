@@ -0,0 +1,86 @@
+import asyncio
+
+from wraipperz.api.llm import AIManager, LMStudioProvider
+from wraipperz.api.rate_limit import RateLimiter, TokenBucket
+
+TEXT_MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def test_bucket_waits_for_refill(monkeypatch):
+    now = [0.0]
+    sleeps = []
+    monkeypatch.setattr("wraipperz.api.rate_limit.time.monotonic", lambda: now[0])
+    monkeypatch.setattr("wraipperz.api.rate_limit.time.sleep", sleeps.append)
+    bucket = TokenBucket(capacity=2, refill_per_sec=1)
+
+    bucket.acquire()
+    bucket.acquire()
+    assert sleeps == []
+    # Reserved in arrival order: the 3rd waits 1s, the 4th 2s
+    bucket.acquire()
+    bucket.acquire()
+    assert sleeps == [1.0, 2.0]
+
+    now[0] = 10
+    bucket.acquire()
+    assert sleeps == [1.0, 2.0]
+
+
+def test_async_bucket_waits_for_refill(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr("wraipperz.api.rate_limit.time.monotonic", lambda: 0.0)
+    monkeypatch.setattr("wraipperz.api.rate_limit.asyncio.sleep", fake_sleep)
+    bucket = TokenBucket(capacity=100, refill_per_sec=10)
+
+    asyncio.run(bucket.acquire_async(150))
+    assert sleeps == [5.0]
+
+
+def test_cancelled_waiter_refunds_its_tokens(monkeypatch):
+    monkeypatch.setattr("wraipperz.api.rate_limit.time.monotonic", lambda: 0.0)
+    limiter = RateLimiter(rpm=60, tpm=600)
+
+    async def _run():
+        limiter.tokens.tokens = 0
+        waiter = asyncio.ensure_future(limiter.acquire_async(100))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(_run())
+    assert limiter.tokens.tokens == 0
+    assert limiter.requests.tokens == 60
+
+
+def test_limiter_from_env(monkeypatch):
+    monkeypatch.delenv("OPENAI_RPM", raising=False)
+    monkeypatch.delenv("OPENAI_TPM", raising=False)
+    assert RateLimiter.from_env("OpenAIProvider") is None
+
+    monkeypatch.setenv("OPENAI_RPM", "500")
+    monkeypatch.setenv("OPENAI_TPM", "90000")
+    limiter = RateLimiter.from_env("OpenAIProvider")
+    assert limiter.requests.capacity == 500
+    assert limiter.tokens.refill_per_sec == 1500
+
+
+def test_manager_acquires_before_dispatch(monkeypatch):
+    class EchoProvider(LMStudioProvider):
+        def call_ai(self, messages, temperature, max_tokens, model=None, **kwargs):
+            return "ok"
+
+    monkeypatch.setenv("ECHO_TPM", "1000")
+    manager = AIManager()
+    manager.add_provider(EchoProvider())
+    acquired = []
+    monkeypatch.setattr(manager._limiters["EchoProvider"], "acquire", acquired.append)
+
+    assert manager.call_ai(TEXT_MESSAGES, 0, 10, "lmstudio") == ("ok", 0.0)
+    assert acquired == [1 + 10]
@@ -0,0 +1,49 @@
+import pytest
+
+from wraipperz.api.router import ModelRouter
+
+SHORT = [{"role": "user", "content": "Is this review positive? 'Loved it!'"}]
+CODE = [{"role": "user", "content": "Fix this:\n```python\nprint(1\n```"}]
+
+
+def test_short_prompt_routes_to_cheapest_fast_model():
+    router = ModelRouter()
+    assert router.route(SHORT) == "gemini/gemini-2.0-flash-lite"
+    assert (
+        router.route(SHORT, available_models=["openai/gpt-4o-mini", "openai/gpt-4.1"])
+        == "openai/gpt-4o-mini"
+    )
+
+
+def test_code_and_quality_escalate_tier():
+    router = ModelRouter()
+    available = ["openai/gpt-4o-mini", "openai/gpt-4.1", "openai/gpt-5.1"]
+    assert router.route(CODE, available_models=available) == "openai/gpt-4.1"
+    assert router.route(SHORT, "best", available_models=available) == "openai/gpt-5.1"
+    # No fast model registered: escalate rather than fail
+    assert router.route(SHORT, available_models=["openai/gpt-4.1"]) == "openai/gpt-4.1"
+
+
+def test_structured_outputs_and_media_filter_candidates():
+    router = ModelRouter()
+    available = [
+        "deepseek-chat",
+        "anthropic/claude-3-5-haiku-20241022",
+        "openai/gpt-4o",
+    ]
+    assert (
+        router.route(SHORT, available_models=available, structured=True)
+        == "openai/gpt-4o"
+    )
+    image = [
+        {
+            "role": "user",
+            "content": [{"type": "image_url", "image_url": {"url": "cat.png"}}],
+        }
+    ]
+    assert (
+        router.route(image, available_models=available)
+        == "anthropic/claude-3-5-haiku-20241022"
+    )
+    with pytest.raises(ValueError):
+        router.route(SHORT, available_models=["lmstudio"])
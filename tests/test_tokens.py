@@ -0,0 +1,28 @@
+import pytest
+
+from wraipperz.api.tokens import check_context_window, context_window, count_tokens
+
+MESSAGES = [
+    {"role": "system", "content": "You are terse."},
+    {"role": "user", "content": [{"type": "text", "text": "Hello there"}]},
+]
+
+
+def test_count_tokens_counts_text_parts():
+    assert count_tokens(MESSAGES, "openai/gpt-4o") > 0
+    assert count_tokens([], "openai/gpt-4o") == 0
+
+
+def test_context_window_uses_longest_prefix():
+    assert context_window("openai/gpt-4o-mini") == 128000
+    assert context_window("openai/gpt-4.1-mini-2025-04-14") == 1047576
+    assert context_window("lmstudio") is None
+
+
+def test_check_context_window_rejects_oversized_prompts():
+    check_context_window(MESSAGES, "openai/gpt-4o", 4096)
+    check_context_window(MESSAGES, "lmstudio", 10**9)
+
+    huge = [{"role": "user", "content": "word " * 200000}]
+    with pytest.raises(ValueError, match="context window"):
+        check_context_window(huge, "openai/gpt-4o", 4096)
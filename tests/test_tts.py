@@ -1,10 +1,13 @@
 # AI GENERATED CODE BEWARE
+import asyncio
+import json
 import os
 import tempfile
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+import requests
 
 from wraipperz.api.tts import (
     CartesiaTTSProvider,
@@ -13,6 +16,7 @@ from wraipperz.api.tts import (
     MiniMaxiTTSProvider,
     OpenAIRealtimeTTSProvider,
     OpenAITTSProvider,
+    TTSError,
     TTSManager,
     TTSProvider,
     TTSRateLimitError,
@@ -69,6 +73,14 @@ class MockTTSProvider(TTSProvider):
         return {"status": "success", "voice_id": voice_id, "name": new_name}
 
 
+@pytest.fixture(autouse=True)
+def voice_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep persisted voice lists out of the user's cache directory"""
+    directory = tmp_path_factory.mktemp("voices")
+    monkeypatch.setenv("WRAIPPERZ_VOICE_CACHE_DIR", str(directory))
+    return directory
+
+
 @pytest.fixture
 def mock_provider():
     return MockTTSProvider()
@@ -450,3 +462,723 @@ def test_retry_mechanism():
     # Clean up
     if TEST_OUTPUT_PATH.exists():
         TEST_OUTPUT_PATH.unlink()
+
+
+def http_error(status):
+    return requests.exceptions.HTTPError(response=MagicMock(status_code=status))
+
+
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (TTSRateLimitError("busy"), True),
+        (requests.exceptions.ConnectionError("reset"), True),
+        (requests.exceptions.ReadTimeout("slow"), True),
+        (http_error(503), True),
+        (http_error(429), True),
+        (http_error(401), False),
+        (http_error(422), False),
+        (requests.exceptions.InvalidURL("bad"), False),
+        (TTSError("bad voice"), False),
+        (ValueError("bad speed"), False),
+    ],
+)
+def test_only_transient_errors_are_retried(error, transient):
+    from wraipperz.api.tts import _is_transient_error
+
+    assert _is_transient_error(error) is transient
+
+
+def test_client_errors_fail_fast():
+    class UnauthorizedProvider(MockTTSProvider):
+        def generate_speech(self, text, output_path, voice, **kwargs):
+            self.calls = getattr(self, "calls", 0) + 1
+            raise http_error(401)
+
+    manager = TTSManager()
+    provider = UnauthorizedProvider()
+    manager.add_provider("unauthorized", provider)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        manager.generate_speech("unauthorized", "Hi", "out.wav", voice="v")
+    assert provider.calls == 1
+
+
+def test_minimaxi_decodes_hex_audio(tmp_path):
+    """MiniMaxi hex audio is decoded without going through the JSON parser"""
+    body = (
+        b'{"data": {"audio": "' + b"ID3 audio".hex().encode() + b'", "status": 2},'
+        b' "trace_id": "abc", "base_resp": {"status_code": 0, "status_msg": ""}}'
+    )
+
+    class FakeResponse:
+        content = body
+
+        def raise_for_status(self):
+            pass
+
+    output_path = tmp_path / "speech.mp3"
+    provider = MiniMaxiTTSProvider(api_key="key", group_id="group")
+    provider.asr_manager = MagicMock()
+    with patch("wraipperz.api.tts.requests.Session.post", return_value=FakeResponse()):
+        result = provider.generate_speech(
+            "Hello", str(output_path), return_alignment=True
+        )
+
+    assert output_path.read_bytes() == b"ID3 audio"
+    assert result["trace_id"] == "abc"
+    # Alignment transcribes the output file itself, no temporary copy
+    transcribe = provider.asr_manager.transcribe
+    assert transcribe.call_args.args[:2] == ("openai", output_path)
+    assert list(tmp_path.iterdir()) == [output_path]
+
+
+def test_minimaxi_request_body(tmp_path):
+    """The cached settings tail joins the per-call fields into valid JSON"""
+    body = (
+        b'{"data": {"audio": "00"}, "base_resp": {"status_code": 0, "status_msg": ""}}'
+    )
+    response = MagicMock(content=body)
+    provider = MiniMaxiTTSProvider(api_key="key", group_id="group")
+    with patch(
+        "wraipperz.api.tts.requests.Session.post", return_value=response
+    ) as post:
+        for text in ('Say "hi"', "Again"):
+            provider.generate_speech(
+                text, str(tmp_path / "speech.mp3"), speed=1.5, emotion="happy"
+            )
+
+    first, second = (json.loads(call.kwargs["data"]) for call in post.call_args_list)
+    assert first == {
+        "model": "speech-01-turbo",
+        "text": 'Say "hi"',
+        "stream": False,
+        "output_format": "hex",
+        "voice_setting": {
+            "voice_id": "Calm_Woman",
+            "speed": 1.5,
+            "vol": 1.0,
+            "pitch": 0,
+            "emotion": "happy",
+        },
+        "audio_setting": {
+            "sample_rate": 32000,
+            "bitrate": 128000,
+            "format": "mp3",
+            "channel": 1,
+        },
+    }
+    assert second["text"] == "Again"
+    assert second["voice_setting"] == first["voice_setting"]
+
+
+def test_minimaxi_url_output_is_streamed_to_file(tmp_path):
+    """With output_format="url" the binary audio is downloaded in chunks"""
+    response = MagicMock(
+        content=b'{"data": {"audio": "https://cdn.example/a.mp3"},'
+        b' "base_resp": {"status_code": 0, "status_msg": ""}}'
+    )
+    download = MagicMock()
+    download.__enter__.return_value = download
+    download.iter_content.return_value = iter([b"ID3", b" audio"])
+
+    output_path = tmp_path / "speech.mp3"
+    provider = MiniMaxiTTSProvider(api_key="key", group_id="group")
+    with (
+        patch("wraipperz.api.tts.requests.Session.post", return_value=response) as post,
+        patch("wraipperz.api.tts.requests.Session.get", return_value=download) as get,
+    ):
+        provider.generate_speech("Hello", str(output_path), output_format="url")
+
+    assert json.loads(post.call_args.kwargs["data"])["output_format"] == "url"
+    get.assert_called_once_with("https://cdn.example/a.mp3", stream=True)
+    assert output_path.read_bytes() == b"ID3 audio"
+
+
+def test_cartesia_alignment_transcribes_the_output_file(tmp_path):
+    """Alignment reads the written output, no second copy of the audio"""
+    output_path = tmp_path / "speech.wav"
+    provider = CartesiaTTSProvider(api_key="key")
+    provider.client = MagicMock()
+    provider.client.tts.bytes.return_value = iter([b"RIFF", b" audio"])
+    provider.asr_manager = MagicMock()
+
+    provider.generate_speech("Hello", str(output_path), "voice", return_alignment=True)
+
+    assert output_path.read_bytes() == b"RIFF audio"
+    transcribe = provider.asr_manager.transcribe
+    assert transcribe.call_args.args[:2] == ("openai", output_path)
+    assert list(tmp_path.iterdir()) == [output_path]
+
+
+def test_cartesia_convert_speech_streams_chunks_to_file(tmp_path):
+    input_path = tmp_path / "input.wav"
+    input_path.write_bytes(b"RIFF input")
+    output_path = tmp_path / "converted.wav"
+    provider = CartesiaTTSProvider(api_key="key")
+    provider.client = MagicMock()
+    provider.client.voice_changer.bytes.return_value = iter([b"RIFF", b" converted"])
+
+    assert provider.convert_speech(str(input_path), str(output_path), "voice") == {
+        "status": "success"
+    }
+    assert output_path.read_bytes() == b"RIFF converted"
+    assert provider.client.voice_changer.bytes.call_args.kwargs["clip"] == b"RIFF input"
+
+
+def test_elevenlabs_generate_speech_async_uses_the_async_client(tmp_path):
+    import base64
+
+    body = json.dumps(
+        {"audio_base64": base64.b64encode(b"ID3 audio").decode(), "alignment": None}
+    ).encode()
+    response = MagicMock(status_code=200, content=body, text="")
+    output_path = tmp_path / "speech.mp3"
+
+    provider = ElevenLabsTTSProvider(api_key="key")
+    with (
+        patch(
+            "wraipperz.api.tts.httpx.AsyncClient.post",
+            new=AsyncMock(return_value=response),
+        ) as post,
+        patch("wraipperz.api.tts.requests.Session.post") as sync_post,
+    ):
+        result = asyncio.run(
+            provider.generate_speech_async(
+                "Hello", str(output_path), "v1", language="en"
+            )
+        )
+
+    sync_post.assert_not_called()
+    url = post.call_args.args[0]
+    assert url == "https://api.elevenlabs.io/v1/text-to-speech/v1/with-timestamps"
+    assert post.call_args.kwargs["json"]["language"] == "en"
+    assert output_path.read_bytes() == b"ID3 audio"
+    assert result["audio_base64"]
+
+
+def test_elevenlabs_generate_speech_async_maps_rate_limits(tmp_path):
+    response = MagicMock(status_code=429, content=b"", text="slow down")
+    provider = ElevenLabsTTSProvider(api_key="key")
+    with patch(
+        "wraipperz.api.tts.httpx.AsyncClient.post", new=AsyncMock(return_value=response)
+    ):
+        with pytest.raises(TTSRateLimitError):
+            asyncio.run(
+                provider.generate_speech_async("Hello", str(tmp_path / "a.mp3"), "v1")
+            )
+
+
+def test_cartesia_generate_speech_async_streams_from_the_async_client(tmp_path):
+    async def chunks():
+        yield b"RIFF"
+        yield b" audio"
+
+    output_path = tmp_path / "speech.wav"
+    provider = CartesiaTTSProvider(api_key="key")
+    provider.async_client = MagicMock()
+    provider.async_client.tts.bytes = AsyncMock(return_value=chunks())
+
+    result = asyncio.run(
+        provider.generate_speech_async("Hello", str(output_path), "voice")
+    )
+
+    assert result == {"status": "success"}
+    assert output_path.read_bytes() == b"RIFF audio"
+    params = provider.async_client.tts.bytes.call_args.kwargs
+    assert params["voice"] == {"mode": "id", "id": "voice"}
+    assert params["output_format"]["container"] == "wav"
+
+
+class FakeRealtimeSocket:
+    """Stands in for the realtime websocket: records sends, replays frames"""
+
+    def __init__(self, frames):
+        self.sent = []
+        self.frames = frames
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    def __aiter__(self):
+        return self._replay()
+
+    async def _replay(self):
+        for frame in self.frames:
+            yield frame
+
+
+@pytest.mark.parametrize("chunks", [[b"abc", b"def"], [b"ab", b"cdef", b"g"]])
+def test_openai_realtime_joins_audio_deltas(chunks):
+    """Audio deltas decode to the same bytes whether or not they are padded"""
+    import base64
+    import json
+
+    frames = [
+        json.dumps(
+            {"type": "response.audio.delta", "delta": base64.b64encode(c).decode()}
+        )
+        for c in chunks
+    ]
+    frames.append(json.dumps({"type": "response.done", "response": {"status": "ok"}}))
+    socket = FakeRealtimeSocket(frames)
+
+    provider = OpenAIRealtimeTTSProvider(api_key="key")
+    with patch("wraipperz.api.tts.websockets.connect", return_value=socket):
+        result = asyncio.run(provider._generate_speech_internal("Hello", "alloy"))
+
+    assert result["audio_data"] == b"".join(chunks)
+    assert [json.loads(m)["type"] for m in socket.sent] == [
+        "session.update",
+        "conversation.item.create",
+        "response.create",
+    ]
+
+
+def test_openai_realtime_voice_reference_is_encoded_once(tmp_path):
+    """The reference audio is read and base64-encoded once per file version"""
+    import base64
+
+    reference = tmp_path / "reference.wav"
+    reference.write_bytes(b"RIFF reference")
+    provider = OpenAIRealtimeTTSProvider(api_key="key")
+    done = json.dumps({"type": "response.done", "response": {"status": "ok"}})
+
+    def reference_frames():
+        socket = FakeRealtimeSocket(
+            [
+                json.dumps(
+                    {
+                        "type": "response.audio.delta",
+                        "delta": base64.b64encode(b"pcm").decode(),
+                    }
+                ),
+                done,
+            ]
+        )
+        with patch("wraipperz.api.tts.websockets.connect", return_value=socket):
+            asyncio.run(
+                provider._generate_speech_internal(
+                    "Hello", "alloy", voice_reference=str(reference)
+                )
+            )
+        item = json.loads(socket.sent[1])["item"]
+        return item["content"][0]["audio"]
+
+    with patch("wraipperz.api.tts.open", wraps=open) as opened:
+        assert reference_frames() == base64.b64encode(b"RIFF reference").decode()
+        assert reference_frames() == base64.b64encode(b"RIFF reference").decode()
+        assert opened.call_count == 1
+
+        reference.write_bytes(b"RIFF changed reference")
+        assert (
+            reference_frames() == base64.b64encode(b"RIFF changed reference").decode()
+        )
+        assert opened.call_count == 2
+
+
+def test_openai_realtime_save_to_wav(tmp_path):
+    """Raw PCM16 is written as a 24 kHz mono WAV"""
+    import wave
+
+    provider = OpenAIRealtimeTTSProvider(api_key="key")
+    pcm = bytes(range(200))
+    output_path = tmp_path / "speech.wav"
+    provider._save_to_wav(pcm, output_path)
+
+    with wave.open(str(output_path), "rb") as wav_file:
+        assert wav_file.getnchannels() == 1
+        assert wav_file.getsampwidth() == 2
+        assert wav_file.getframerate() == 24000
+        assert wav_file.readframes(wav_file.getnframes()) == pcm
+
+
+def test_elevenlabs_adjust_timestamps():
+    """Alignment times are scaled by the speed factor and stay plain lists"""
+    alignment = {
+        "characters": ["h", "i"],
+        "character_start_times_seconds": [0.0, 0.5],
+        "character_end_times_seconds": [0.5, 1.0],
+    }
+    ElevenLabsTTSProvider(api_key="key")._adjust_timestamps(alignment, 2.0)
+
+    assert alignment["character_start_times_seconds"] == [0.0, 0.25]
+    assert alignment["character_end_times_seconds"] == [0.25, 0.5]
+    assert type(alignment["character_end_times_seconds"][0]) is float
+
+
+def test_openai_provider_generate_speech_async_streams_to_file(tmp_path):
+    """The async path streams the response body to disk chunk by chunk"""
+
+    class FakeStreamingResponse:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def iter_bytes(self, chunk_size):
+            for chunk in (b"ID3", b" audio"):
+                yield chunk
+
+    provider = OpenAITTSProvider(api_key="key")
+    provider.async_client = MagicMock()
+    create = provider.async_client.audio.speech.with_streaming_response.create
+    create.return_value = FakeStreamingResponse()
+
+    output_path = tmp_path / "speech.mp3"
+    result = asyncio.run(
+        provider.generate_speech_async("Hello", str(output_path), voice="coral")
+    )
+
+    assert output_path.read_bytes() == b"ID3 audio"
+    assert result["voice"] == "coral"
+    assert create.call_args.kwargs["input"] == "Hello"
+
+
+def test_generate_speech_batch_async_bounds_concurrency(tmp_path):
+    """Batch generation runs items concurrently, in order, errors in place"""
+    import threading
+    import time
+
+    class SlowProvider(MockTTSProvider):
+        in_flight = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def generate_speech(self, text, output_path, voice, **kwargs):
+            with self.lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            time.sleep(0.02)
+            with self.lock:
+                self.in_flight -= 1
+            if text == "fail":
+                raise TTSRateLimitError("busy")
+            return super().generate_speech(text, output_path, voice, **kwargs)
+
+    provider = SlowProvider()
+    items = [(f"clip {i}", str(tmp_path / f"{i}.mp3")) for i in range(6)]
+    items.append(("fail", str(tmp_path / "fail.mp3")))
+
+    results = asyncio.run(
+        provider.generate_speech_batch_async(
+            items, "voice", max_concurrency=3, speed=1.2
+        )
+    )
+
+    assert [r["status"] for r in results[:6]] == ["success"] * 6
+    assert isinstance(results[6], TTSRateLimitError)
+    assert provider.peak == 3
+    assert provider.last_kwargs == {"speed": 1.2}
+
+
+def test_shrink_silences_halves_pauses_until_short_enough():
+    """Pauses shrink in place, speech is kept intact"""
+    import numpy as np
+
+    from wraipperz.api.tts import _shrink_silences
+
+    sample_rate = 1000
+    tone = np.full(1000, 0.5, dtype=np.float32)
+    pause = np.zeros(1000, dtype=np.float32)
+    samples = np.concatenate([tone, pause, tone])[:, None]
+
+    shrunk = _shrink_silences(samples, sample_rate, max_duration=2.5)
+    assert len(shrunk) == 2500
+    assert (shrunk[:, 0] == 0.5).sum() == 2000
+
+    # Already short enough, or no pause long enough to shrink
+    assert len(_shrink_silences(samples, sample_rate, max_duration=3.0)) == 3000
+    assert len(_shrink_silences(tone[:, None], sample_rate, max_duration=0.5)) == 1000
+
+
+def test_atempo_filter_chains_steps_outside_the_legacy_range():
+    from wraipperz.api.tts import _atempo_filter
+
+    assert _atempo_filter(1.5) == "atempo=1.5"
+    assert _atempo_filter(3.0) == "atempo=2.0,atempo=1.5"
+    assert _atempo_filter(0.25) == "atempo=0.5,atempo=0.5"
+
+
+def test_audio_duration_reads_the_header(tmp_path):
+    import numpy as np
+    import soundfile as sf
+
+    from wraipperz.api.tts import _audio_duration
+
+    path = tmp_path / "speech.wav"
+    sf.write(path, np.zeros(12000, dtype=np.float32), 8000)
+    with patch("wraipperz.api.tts.sf.read") as read:
+        assert _audio_duration(path) == 1.5
+    read.assert_not_called()
+
+
+def test_process_with_ffmpeg_skips_clips_within_tolerance(tmp_path):
+    """A clip already close enough to the target is neither decoded nor rewritten"""
+    import numpy as np
+    import soundfile as sf
+
+    path = tmp_path / "speech.wav"
+    sf.write(path, np.full(8000, 0.5, dtype=np.float32), 8000)
+    original = path.read_bytes()
+    copy = tmp_path / "copy.wav"
+
+    provider = ElevenLabsTTSProvider(api_key="key")
+    with (
+        patch("wraipperz.api.tts.sf.read") as read,
+        patch("wraipperz.api.tts.subprocess.run") as run,
+    ):
+        assert provider._process_with_ffmpeg(str(path), str(path), 1.03)
+        assert provider._process_with_ffmpeg(str(path), str(copy), 0.8)
+
+    read.assert_not_called()
+    run.assert_not_called()
+    assert path.read_bytes() == original
+    assert copy.read_bytes() == original
+
+
+def test_process_with_ffmpeg_pipes_pcm_to_a_single_atempo_run(tmp_path):
+    """Speech without pauses goes through one ffmpeg call fed from stdin"""
+    import numpy as np
+    import soundfile as sf
+
+    sample_rate = 8000
+    path = tmp_path / "speech.wav"
+    sf.write(path, np.full(sample_rate * 2, 0.5, dtype=np.float32), sample_rate)
+
+    def fake_ffmpeg(cmd, input, **kwargs):
+        Path(cmd[-1]).write_bytes(b"RIFF sped up")
+
+    provider = ElevenLabsTTSProvider(api_key="key")
+    with (
+        patch("wraipperz.api.tts.FFMPEG_BIN", "/opt/bin/ffmpeg"),
+        patch("wraipperz.api.tts.subprocess.run", side_effect=fake_ffmpeg) as run,
+    ):
+        assert provider._process_with_ffmpeg(str(path), str(path), 2.0)
+
+    run.assert_called_once()
+    cmd = run.call_args.args[0]
+    assert cmd[0] == "/opt/bin/ffmpeg"
+    assert cmd[cmd.index("-i") + 1] == "pipe:0"
+    assert "atempo=2.0" in cmd
+    assert len(run.call_args.kwargs["input"]) == sample_rate * 2 * 2
+    assert path.read_bytes() == b"RIFF sped up"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_elevenlabs_voice_list_is_cached():
+    """Voices are fetched once per TTL and refetched after adding a voice"""
+    voices = MagicMock()
+    voices.json.return_value = {"voices": [{"name": "Rachel", "voice_id": "v1"}]}
+    provider = ElevenLabsTTSProvider(api_key="key")
+
+    with (
+        patch("wraipperz.api.tts.requests.Session.get", return_value=voices) as get,
+        patch("wraipperz.api.tts.requests.Session.post"),
+    ):
+        assert provider.list_voices() == [{"name": "Rachel", "voice_id": "v1"}]
+        assert provider.list_voices() == [{"name": "Rachel", "voice_id": "v1"}]
+        assert get.call_count == 1
+
+        provider.add_sharing_voice("user", "v2", "Shared")
+        provider.list_voices()
+        assert get.call_count == 2
+
+        provider.voices_ttl = 0
+        provider.list_voices()
+        assert get.call_count == 3
+
+
+def test_elevenlabs_session_sends_the_api_key():
+    """The key lives on the pooled session, and requests strips it when overridden"""
+    provider = ElevenLabsTTSProvider(api_key="key")
+    prepared = provider._session.prepare_request(
+        requests.Request("GET", "https://api.elevenlabs.io/v1/voices")
+    )
+    assert prepared.headers["xi-api-key"] == "key"
+
+    prepared = provider._session.prepare_request(
+        requests.Request(
+            "GET", "https://bucket.example/a.mp3", headers={"xi-api-key": None}
+        )
+    )
+    assert "xi-api-key" not in prepared.headers
+
+
+def test_find_similar_voices_streams_a_sized_multipart_body(tmp_path):
+    """The sample is sent as a streamed body with an exact Content-Length"""
+    from email.parser import BytesParser
+
+    sample = tmp_path / "sample.mp3"
+    sample.write_bytes(b"ID3" + bytes(range(256)) * 1000)
+    response = MagicMock()
+    response.json.return_value = {"voices": [{"voice_id": "v1"}]}
+
+    provider = ElevenLabsTTSProvider(api_key="key")
+    with patch(
+        "wraipperz.api.tts.requests.Session.post", return_value=response
+    ) as post:
+        assert provider.find_similar_voices(str(sample), top_k=5) == [
+            {"voice_id": "v1"}
+        ]
+
+    body = post.call_args.kwargs["data"]
+    headers = post.call_args.kwargs["headers"]
+    prepared = provider._session.prepare_request(
+        requests.Request(
+            "POST", "https://api.elevenlabs.io", data=body, headers=headers
+        )
+    )
+    raw = b"".join(body)
+    assert prepared.headers["Content-Length"] == str(len(raw))
+    assert "Transfer-Encoding" not in prepared.headers
+
+    message = BytesParser().parsebytes(
+        b"Content-Type: " + headers["Content-Type"].encode() + b"\r\n\r\n" + raw
+    )
+    top_k, audio = message.get_payload()
+    assert top_k.get_param("name", header="content-disposition") == "top_k"
+    assert top_k.get_payload() == "5"
+    assert audio.get_filename() == "sample.mp3"
+    assert audio.get_content_type() == "audio/mpeg"
+    assert audio.get_payload(decode=True) == sample.read_bytes()
+
+
+def test_find_similar_voices_connection_error_is_a_tts_error(tmp_path):
+    sample = tmp_path / "sample.mp3"
+    sample.write_bytes(b"ID3")
+    provider = ElevenLabsTTSProvider(api_key="key")
+    with patch(
+        "wraipperz.api.tts.requests.Session.post",
+        side_effect=requests.exceptions.ConnectionError("down"),
+    ):
+        with pytest.raises(TTSError):
+            provider.find_similar_voices(str(sample))
+
+
+def test_elevenlabs_convert_speech_streams_url_input(tmp_path):
+    """A URL input is uploaded from the download stream, not a local file"""
+    import io
+    from email.parser import BytesParser
+
+    source = MagicMock(
+        status_code=200, raw=io.BytesIO(b"ID3 source"), headers={"Content-Length": "10"}
+    )
+    source.__enter__.return_value = source
+    converted = MagicMock(status_code=200, content=b"ID3 converted")
+    output_path = tmp_path / "converted.mp3"
+
+    provider = ElevenLabsTTSProvider(api_key="key")
+    with (
+        patch("wraipperz.api.tts.requests.Session.get", return_value=source) as get,
+        patch(
+            "wraipperz.api.tts.requests.Session.post", return_value=converted
+        ) as post,
+    ):
+        provider.convert_speech(
+            "https://bucket.example/in.mp3?X-Amz-Signature=abc",
+            str(output_path),
+            voice="v1",
+        )
+
+    # The ElevenLabs key is not sent to the source host
+    get.assert_called_once_with(
+        "https://bucket.example/in.mp3?X-Amz-Signature=abc",
+        headers={"xi-api-key": None},
+        stream=True,
+    )
+    # The download is read chunk by chunk into a sized multipart body
+    body = post.call_args.kwargs["data"]
+    raw = b"".join(body)
+    assert len(body) == len(raw)
+    message = BytesParser().parsebytes(
+        b"Content-Type: " + body.content_type.encode() + b"\r\n\r\n" + raw
+    )
+    audio = message.get_payload()[-1]
+    assert audio.get_filename() == "in.mp3"
+    assert audio.get_payload(decode=True) == b"ID3 source"
+    assert output_path.read_bytes() == b"ID3 converted"
+
+
+def test_voice_list_is_persisted_per_api_key(voice_cache_dir):
+    """A new provider with the same key reads the list from disk"""
+    voices = MagicMock()
+    voices.json.return_value = {"voices": [{"name": "Rachel", "voice_id": "v1"}]}
+
+    with patch("wraipperz.api.tts.requests.Session.get", return_value=voices) as get:
+        ElevenLabsTTSProvider(api_key="key").list_voices()
+        assert len(list(voice_cache_dir.iterdir())) == 1
+
+        warm = ElevenLabsTTSProvider(api_key="key")
+        assert warm.list_voices() == [{"name": "Rachel", "voice_id": "v1"}]
+        assert get.call_count == 1
+
+        ElevenLabsTTSProvider(api_key="other key").list_voices()
+        assert get.call_count == 2
+
+        warm.list_voices(refresh=True)
+        assert get.call_count == 3
+
+
+def test_failed_voice_fetch_is_not_cached():
+    provider = ElevenLabsTTSProvider(api_key="key")
+    with patch(
+        "wraipperz.api.tts.requests.Session.get", side_effect=ConnectionError
+    ) as get:
+        assert provider.list_voices() == []
+        assert provider.list_voices() == []
+    assert get.call_count == 2
+
+
+def test_process_with_ffmpeg_without_ffmpeg_keeps_the_audio(tmp_path, capsys):
+    import numpy as np
+    import soundfile as sf
+
+    path = tmp_path / "speech.wav"
+    sf.write(path, np.full(16000, 0.5, dtype=np.float32), 8000)
+    original = path.read_bytes()
+
+    provider = ElevenLabsTTSProvider(api_key="key")
+    with (
+        patch("wraipperz.api.tts.FFMPEG_BIN", None),
+        patch("wraipperz.api.tts.subprocess.run") as run,
+    ):
+        assert not provider._process_with_ffmpeg(str(path), str(path), 2.0)
+
+    run.assert_not_called()
+    assert "ffmpeg is required" in capsys.readouterr().out
+    assert path.read_bytes() == original
+
+
+def test_asr_manager_is_created_lazily_and_shared():
+    """Providers don't build an ASR manager until alignment needs one"""
+    with patch("wraipperz.api.tts.create_asr_manager") as create_asr_manager:
+        first = MiniMaxiTTSProvider(api_key="key", group_id="group")
+        second = OpenAIRealtimeTTSProvider(api_key="key")
+        create_asr_manager.assert_not_called()
+
+        with patch("wraipperz.api.tts._asr_manager", None):
+            assert first.asr_manager is second.asr_manager
+        create_asr_manager.assert_called_once()
+
+
+def test_tts_manager_hands_its_asr_manager_to_providers():
+    """Providers added to a manager share its ASR manager unless they have one"""
+    shared, own = MagicMock(), MagicMock()
+    manager = TTSManager(asr_manager=shared)
+    first = MiniMaxiTTSProvider(api_key="key", group_id="group")
+    second = OpenAIRealtimeTTSProvider(api_key="key")
+    second.asr_manager = own
+
+    manager.add_provider("minimaxi", first)
+    manager.add_provider("openai_realtime", second)
+
+    assert first.asr_manager is shared
+    assert second.asr_manager is own